@@ -0,0 +1,88 @@
+# coding: utf-8
+"""
+Compares the hydration (from_es) and serialization (to_dict) of the
+compiled per class codecs against the generic code path
+
+    $ python benchmarks/hydration.py
+"""
+from __future__ import print_function
+
+import timeit
+import warnings
+
+from esengine import Document, StringField, IntegerField, FloatField
+from esengine import BooleanField, DateField
+
+warnings.simplefilter('ignore')
+
+HITS = 1000
+
+
+class Compiled(Document):
+    _index = 'bench'
+    _doctype = 'bench'
+    title = StringField()
+    body = StringField()
+    tags = StringField(multi=True)
+    views = IntegerField()
+    rating = FloatField()
+    published = BooleanField()
+    created_at = DateField()
+    author = StringField()
+    category = StringField()
+    likes = IntegerField()
+
+
+class Generic(Compiled):
+    # overriding __init__ disables the compiled codecs
+    def __init__(self, *args, **kwargs):
+        super(Generic, self).__init__(*args, **kwargs)
+
+
+def make_hits():
+    return [
+        {
+            '_id': str(i),
+            '_score': 1.0,
+            '_source': {
+                'title': 'title %d' % i,
+                'body': 'body %d' % i,
+                'tags': ['a', 'b', 'c'],
+                'views': i,
+                'rating': 4.5,
+                'published': True,
+                'created_at': '2016-01-01T10:00:00',
+                'author': 'author',
+                'category': 'category',
+                'likes': i * 2,
+            }
+        }
+        for i in range(HITS)
+    ]
+
+
+def bench(model, hits, number=20):
+    hydrate = timeit.timeit(
+        lambda: [model.from_es(hit) for hit in hits], number=number
+    ) / number
+    docs = [model.from_es(hit) for hit in hits]
+    serialize = timeit.timeit(
+        lambda: [doc.to_dict() for doc in docs], number=number
+    ) / number
+    return hydrate, serialize
+
+
+def main():
+    hits = make_hits()
+    generic = bench(Generic, hits)
+    compiled = bench(Compiled, hits)
+    print('{} hits, 10 fields'.format(HITS))
+    for label, i in (('from_es', 0), ('to_dict', 1)):
+        print('{:8} generic {:7.2f} ms  compiled {:7.2f} ms  {:4.1f}x'.format(
+            label, generic[i] * 1000, compiled[i] * 1000,
+            generic[i] / compiled[i]
+        ))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+# coding: utf-8
+"""
+Compares the memory used by documents loaded from E.S hits stored in
+the default per instance __dict__ against compact (_slots = True)
+documents, and the time to hydrate them
+
+    $ python benchmarks/memory.py
+"""
+from __future__ import print_function
+
+import gc
+import timeit
+import tracemalloc
+import warnings
+
+from esengine import Document, StringField, IntegerField, FloatField
+from esengine import BooleanField
+
+warnings.simplefilter('ignore')
+
+HITS = 100000
+
+
+class Default(Document):
+    _index = 'bench'
+    _doctype = 'bench'
+    title = StringField()
+    author = StringField()
+    views = IntegerField()
+    rating = FloatField()
+    published = BooleanField()
+    likes = IntegerField()
+
+
+class Compact(Default):
+    _slots = True
+
+
+def make_hits():
+    return [
+        {
+            '_id': str(i),
+            '_score': 1.0,
+            '_source': {
+                'title': 'title %d' % i,
+                'author': 'author',
+                'views': i,
+                'rating': 4.5,
+                'published': True,
+                'likes': i * 2,
+            }
+        }
+        for i in range(HITS)
+    ]
+
+
+def measure(model, hits):
+    model.from_es(hits[0])  # compiles the codecs
+    gc.collect()
+    tracemalloc.start()
+    docs = [model.from_es(hit) for hit in hits]
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del docs
+    gc.collect()
+    hydrate = timeit.timeit(
+        lambda: [model.from_es(hit) for hit in hits], number=3
+    ) / 3
+    return size, hydrate
+
+
+def main():
+    hits = make_hits()
+    default = measure(Default, hits)
+    compact = measure(Compact, hits)
+    print('{} hits, 6 fields'.format(HITS))
+    print('__dict__ {:7.2f} MB {:7.2f} ms'.format(
+        default[0] / 2.0 ** 20, default[1] * 1000
+    ))
+    print('slots    {:7.2f} MB {:7.2f} ms  {:.0%} less memory'.format(
+        compact[0] / 2.0 ** 20, compact[1] * 1000,
+        1 - float(compact[0]) / default[0]
+    ))
+
+
+if __name__ == '__main__':
+    main()
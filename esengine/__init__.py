@@ -7,3 +7,7 @@ from esengine.fields import *  # noqa
 from esengine.exceptions import *  # noqa
 from esengine.utils.payload import Payload, Query, Filter, Aggregate, Suggester  # noqa
 from esengine.utils.pagination import Pagination  # noqa
+from esengine.utils.bulk import BulkWriter  # noqa
+from esengine.utils.cache import DocumentCache, SearchCache, CacheBackend  # noqa
+from esengine.utils.singleflight import SingleFlight  # noqa
+from esengine.utils.multisearch import MultiSearch  # noqa
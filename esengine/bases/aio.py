@@ -0,0 +1,387 @@
+# coding: utf-8
+"""
+asyncio API of Document and ResultSet (python >= 3.6)
+
+The async methods take an async client (e.g: AsyncElasticsearch) through
+the same es parameter, _es attribute and get_es of the sync methods,
+request params and hydration (from_es, build_result) are shared with the
+sync path so both build the same documents.
+"""
+import asyncio
+from functools import partial
+
+from esengine.utils.aio import async_bulk, async_scroll_pages
+from esengine.utils.cache import fingerprint
+
+
+async def _read_through(cache, key, fetch):
+    """
+    Async version of BaseCache._read_through
+    :param cache: DocumentCache or SearchCache instance
+    :param key: key of the response in the cache backend
+    :param fetch: callable returning an awaitable of the response
+    :return: E.S response
+    """
+    resp = cache._lookup(key)
+    if resp is None:
+        resp = await fetch()
+        cache._store(key, resp)
+    return resp
+
+
+class AsyncDocumentMixin(object):
+    """
+    Async counterparts of the Document transport methods
+
+    >>> class Person(Document):
+    ...     _es = AsyncElasticsearch()
+    >>> person = await Person.aget(id=123)
+    >>> person.name = 'Gonzo'
+    >>> await person.asave()
+    >>> async for person in Person.ascan():
+    ...     process(person)
+
+    Gets and searches are read through the _cache and _search_cache of
+    the class and coalesced by its _single_flight, _batch_window is not
+    used (see Document.loader)
+    """
+    __slots__ = ()
+
+    @classmethod
+    async def arefresh(cls, es=None):
+        """
+        Async version of refresh
+        :param es: async ES client
+        :return: ES Metadata
+        """
+        return await cls.get_es(es).indices.refresh()
+
+    async def asave(self, es=None, partial=False):
+        """
+        Async version of save
+        :param es: async ES client or None (if implemented a default in
+        Model)
+        :param partial: If True update only the changed fields
+        :return: Es meta data
+        """
+        if partial and self._dirty is not None:
+            return await self.asave_changes(es=es)
+        saved_document = await self.get_es(es).index(**self._index_params())
+        return self._saved(saved_document)
+
+    async def asave_changes(self, es=None, meta=None):
+        """
+        Async version of save_changes
+        :param es: async ES client or None (if implemented a default in
+        Model)
+        :param meta: Extra values to be passed to client
+        :return: Update result or None
+        """
+        changes = self.changes()
+        if changes:
+            updated_data = await self.aupdate_by_id(
+                self.id, body={'doc': changes}, es=es, meta=meta
+            )
+            self._changes_saved(changes)
+            return updated_data
+
+    async def aupdate(self, body=None, es=None, meta=None, **kwargs):
+        """
+        Async version of update
+        :return: Update result
+        """
+        body = body or {}
+        body.update(kwargs)
+        updated_data = await self.aupdate_by_id(
+            self.id, body=body, es=es, meta=meta
+        )
+        self._updated(body)
+        return updated_data
+
+    @classmethod
+    async def aupdate_by_id(cls, doc_id, body=None, es=None, meta=None,
+                            **kwargs):
+        """
+        Async version of update_by_id
+        :return: Update result
+        """
+        params = cls._update_params(doc_id, body, meta, **kwargs)
+        updated_data = await cls.get_es(es).update(**params)
+        cls._invalidate([doc_id])
+        return updated_data
+
+    async def adelete(self, es=None):
+        """
+        Async version of delete
+        :param es: async ES client or None (if implemented a default in
+        Model)
+        :return: ES meta data
+        """
+        deleted = await self.get_es(es).delete(**self._delete_params())
+        self._invalidate([self.id])
+        return deleted
+
+    @classmethod
+    async def acreate(cls, es=None, **kwargs):
+        """
+        Async version of create
+        :return: Instance of the Document created
+        """
+        instance = cls(**kwargs)
+        await instance.asave(es)
+        return instance
+
+    @classmethod
+    async def aexists(cls, id, es=None, **kwargs):  # noqa
+        """
+        Async version of exists
+        :return: True or False
+        """
+        return await cls.get_es(es).exists(
+            index=cls._index,
+            doc_type=cls._doctype,
+            id=id,
+            **kwargs
+        )
+
+    @classmethod
+    async def aget(cls, id, es=None, **kwargs):  # noqa
+        """
+        Async version of get
+        :param id: The _id or _uid of the object
+        :param es: async ES client or None (if implemented a default in
+        Model)
+        :param kwargs: extra key=value to be passed to es client
+        :return: A single Doc object
+        """
+        es = cls.get_es(es)
+        params = dict(index=cls._index, doc_type=cls._doctype, id=id,
+                      **kwargs)
+        fetch = partial(cls._asend, 'get', es, params)
+        if cls._cache is not None and not kwargs:
+            res = await _read_through(cls._cache, cls._cache.key(cls, id),
+                                      fetch)
+        else:
+            res = await fetch()
+        return cls.from_es(res)
+
+    @classmethod
+    async def aget_many(cls, ids, fields=None, es=None, chunk_size=1000,
+                        **kwargs):
+        """
+        Async version of get_many
+        :return: list of Doc objects or None
+        """
+        params, unloaded = cls._projection(only=fields)
+        kwargs.update(params)
+        es = cls.get_es(es)
+        ids = list(ids)
+        docs = []
+        for start in range(0, len(ids), chunk_size):
+            resp = await es.mget(index=cls._index,
+                                 doc_type=cls._doctype,
+                                 body={'ids': ids[start:start + chunk_size]},
+                                 **kwargs)
+            docs.extend(
+                cls.from_es(doc, unloaded=unloaded)
+                if doc.get('found') else None
+                for doc in resp['docs']
+            )
+        return docs
+
+    @classmethod
+    async def _asend(cls, method, es, params):
+        """
+        Async version of _send, identical concurrent requests of the
+        event loop share a single call if the class has a _single_flight
+        """
+        fetch = partial(getattr(es, method), **params)
+        if cls._single_flight is None:
+            return await fetch()
+        key = (id(es), method, fingerprint(params))
+        return await cls._single_flight.do_async(key, fetch)
+
+    @classmethod
+    async def _arequest(cls, method, es, params):
+        """
+        Async version of _request
+        """
+        fetch = partial(cls._asend, method, es, params)
+        if cls._search_cache is None:
+            return await fetch()
+        key = cls._search_cache.key(cls, method, params)
+        return await _read_through(cls._search_cache, key, fetch)
+
+    @classmethod
+    async def acount(cls, _method='filter', *args, **kwargs):
+        """
+        Async version of count
+        :param _method: filter or search
+        :return: Integer count
+        """
+        kwargs['perform_count'] = True
+        return await getattr(cls, 'a' + _method)(*args, **kwargs)
+
+    @classmethod
+    async def afilter(cls, es=None, ids=None, size=None, perform_count=False,
+                      only=None, exclude=None, **filters):
+        """
+        Async version of filter, fields not fetched (see only and
+        exclude) are not loaded on access
+        :return: ResultSet or Integer count
+        """
+        es = cls.get_es(es)
+        query, size = cls._filter_query(ids, size, filters)
+
+        if perform_count:
+            resp = await cls._arequest('count', es, cls._search_args(query))
+            return resp['count']
+
+        search_args = cls._search_args(query, only, exclude)
+        if size:
+            search_args['size'] = size
+        resp = await cls._arequest('search', es, search_args)
+        return cls.build_result(resp, es=es, query=query, size=size,
+                                only=only, exclude=exclude)
+
+    @classmethod
+    async def asearch(cls, query, es=None, perform_count=False, only=None,
+                      exclude=None, **kwargs):
+        """
+        Async version of search, fields not fetched (see only and
+        exclude) are not loaded on access
+        :return: ResultSet or Integer count
+        """
+        query = cls._query_dict(query)
+        es = cls.get_es(es)
+
+        if perform_count:
+            search_args = cls._search_args(query, **kwargs)
+            resp = await cls._arequest('count', es, search_args)
+            return resp['count']
+
+        search_args = cls._search_args(query, only, exclude, **kwargs)
+        return cls.build_result(
+            await cls._arequest('search', es, search_args),
+            es=es,
+            query=query,
+            size=kwargs.get('size'),
+            only=only,
+            exclude=exclude
+        )
+
+    @classmethod
+    async def ascan(cls, query=None, page_size=100, scroll='5m', es=None,
+                    prefetch=True, **kwargs):
+        """
+        Async version of scan, the next page is fetched by a task while
+        the current one is consumed
+
+        >>> async for doc in Document.ascan({"query": {"match_all": {}}}):
+        ...     process(doc)
+
+        The scroll context is cleared when the iteration ends or the
+        generator is closed (await aclose() after a break)
+
+        :param kwargs: <see scan parameters>
+        :return: async generator of Doc objects
+        """
+        if query is None:
+            query = {"query": {"match_all": {}}}
+        pages = async_scroll_pages(
+            cls.get_es(es),
+            index=cls._index,
+            doc_type=cls._doctype,
+            body=cls._query_dict(query),
+            page_size=page_size,
+            scroll=scroll,
+            prefetch=prefetch,
+            **kwargs
+        )
+        try:
+            async for hits in pages:
+                for hit in hits:
+                    yield cls.from_es(hit)
+        finally:
+            await pages.aclose()
+
+    @classmethod
+    async def asave_all(cls, docs, es=None, **kwargs):
+        """
+        Async version of save_all, documents are serialized and sent one
+        chunk at a time (see utils.aio.async_bulk)
+        :param docs: Iterator of Document instances
+        :param es: async ES client or None (if implemented a default in
+        Model)
+        :param kwargs: Extra params to be passed to async_bulk
+        :return: BulkResult
+        """
+        build = partial(cls._bulk_action, 'index')
+        sent = partial(cls._bulk_sent, None)
+        return await async_bulk(cls.get_es(es), map(build, docs), sent=sent,
+                                **kwargs)
+
+    @classmethod
+    async def aupdate_all(cls, docs, es=None, meta=None, doc_as_upsert=False,
+                          **kwargs):
+        """
+        Async version of update_all
+        :return: BulkResult
+        """
+        docs, build, tracked = cls._update_actions(docs, kwargs,
+                                                   doc_as_upsert)
+        return await async_bulk(cls.get_es(es), map(build, docs),
+                                sent=partial(cls._bulk_sent, tracked),
+                                **meta if meta else {})
+
+    @classmethod
+    async def adelete_all(cls, docs, es=None, **kwargs):
+        """
+        Async version of delete_all
+        :return: BulkResult
+        """
+        build = partial(cls._bulk_action, 'delete')
+        sent = partial(cls._bulk_sent, None)
+        return await async_bulk(cls.get_es(es), map(build, docs), sent=sent,
+                                **kwargs)
+
+
+class AsyncResultSetMixin(object):
+    """
+    Async counterparts of the ResultSet transport methods, the results
+    of the async methods of Document keep their async client
+    """
+    __slots__ = ()
+
+    async def areload(self, sleep=1):
+        """
+        Async version of reload
+        """
+        await asyncio.sleep(sleep)
+        resp = await self._es.search(**self._reload_params())
+        return self._reloaded(resp)
+
+    async def aupdate(self, meta=None, **kwargs):
+        """
+        Async version of update
+        :return: BulkResult
+        """
+        if kwargs:
+            actions = self._actions('update', doc=kwargs)
+            try:
+                return await async_bulk(self._es, actions,
+                                        **meta if meta else {})
+            finally:
+                self._invalidate()
+
+    async def adelete(self, meta=None, **kwargs):
+        """
+        Async version of delete
+        :return: BulkResult
+        """
+        actions = self._actions('delete')
+        try:
+            return await async_bulk(self._es, actions,
+                                    **meta if meta else {})
+        finally:
+            self._invalidate()
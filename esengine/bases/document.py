@@ -1,15 +1,36 @@
 from esengine.bases.py3 import *  # noqa
+from esengine.bases.metaclass import ModelMetaclass, compile_codecs
 from esengine.fields import StringField
-from esengine.exceptions import ValidationError
+from esengine.exceptions import ValidationError, UnloadedField
 
 import warnings
-from six import iteritems
+from six import iteritems, get_unbound_function
+
+# _dirty of the documents tracking changes not changed yet, shared so
+# loading a document does not allocate a set (see __setattr__)
+UNCHANGED = frozenset()
 
 
 class BaseDocument(object):
+    __slots__ = ()
     _strict = False
     _validators = None
     _query_fields = None
+    # if True from_es keeps the raw _source and decode each field only
+    # when it is read for the first time
+    _lazy = False
+    # if True the metaclass stores the fields of the instances in
+    # __slots__ instead of a __dict__, compact documents use less memory
+    # when many are loaded but take no attributes other than the fields
+    # and are never lazy
+    _slots = False
+    # set of fields changed since the document was loaded or saved
+    # None when changes are not tracked (documents not loaded from E.S)
+    _dirty = None
+    # fields not loaded by a query using only/exclude (partial document)
+    # and the callable loading them on first access, None if complete
+    _unloaded = None
+    _loader = None
 
     def _initialize_defaults_fields(self, ignore=None):
         ignore = ignore or []
@@ -50,6 +71,61 @@ class BaseDocument(object):
         if field_instance and not self._strict:
             value = field_instance.from_dict(value)
         super(BaseDocument, self).__setattr__(key, value)
+        if field_instance:
+            dirty = self._dirty
+            if dirty is not None:
+                if dirty is UNCHANGED:
+                    dirty = self._dirty = set()
+                dirty.add(key)
+            if self._unloaded:
+                self._unloaded.discard(key)
+
+    @property
+    def dirty_fields(self):
+        """
+        Names of the fields changed since the document was loaded from
+        E.S or saved, in place changes (e.g: list.append) are not tracked
+        :return: set
+        """
+        return set(self._dirty or ())
+
+    def track_changes(self):
+        """
+        Starts (or restarts) tracking the changed fields
+        """
+        self._dirty = UNCHANGED
+
+    def changes(self, validate=True):
+        """
+        Transform the changed fields to a dict to be sent to E.S, they
+        are still changed until saved (see save_changes)
+        :param validate: If should validate before transform
+        :return: dict (empty if nothing changed)
+        """
+        if not self._dirty:
+            return {}
+        return self.to_dict(validate=validate, only=self._dirty)
+
+    def pop_changes(self, validate=True):
+        """
+        Transform the changed fields to a dict to be sent to E.S
+        and restart tracking
+        :param validate: If should validate before transform
+        :return: dict (empty if nothing changed)
+        """
+        changes = self.changes(validate=validate)
+        self.track_changes()
+        return changes
+
+    def _changes_saved(self, fields):
+        """
+        The changes of fields were written to E.S, they are no longer
+        changed (the others still are)
+        :param fields: names of the saved fields
+        """
+        if self._dirty:
+            dirty = self._dirty.difference(fields)
+            self._dirty = dirty or UNCHANGED
 
     def to_dict(self, validate=True, only=None, exclude=None):
         """
@@ -59,6 +135,11 @@ class BaseDocument(object):
         :param exclude: fields to exclude from dict
         :return: dict
         """
+        if not only and not exclude:
+            codecs = self._codecs()
+            if codecs:
+                return codecs['to_dict'](self, validate=validate)
+
         if validate:
             self.validate()
 
@@ -82,6 +163,26 @@ class BaseDocument(object):
             for field_name, field_instance in iteritems(fields)
         }
 
+    @classmethod
+    def _codecs(cls):
+        """
+        The specialized from_dict and to_dict functions generated once
+        per class (see metaclass.compile_codecs), None if the class
+        customizes __init__ or __setattr__ (generic code is used)
+        :return: dict or None
+        """
+        codecs = cls.__dict__.get('_compiled_codecs')
+        if codecs is None or (codecs and codecs['fields'] is not cls._fields):
+            codecs = (
+                isinstance(cls, ModelMetaclass) and
+                get_unbound_function(cls.__init__) is BaseDocument.__init__ and
+                get_unbound_function(cls.__setattr__) is
+                BaseDocument.__setattr__ and
+                compile_codecs(cls)
+            )
+            cls._compiled_codecs = codecs
+        return codecs or None
+
     @classmethod
     def from_dict(cls, dct):
         """
@@ -89,6 +190,9 @@ class BaseDocument(object):
         :param dct: Result from E.S (hits, source as dict)
         :return: Instance of Document
         """
+        codecs = cls._codecs()
+        if codecs:
+            return codecs['from_dict'](dct)
         params = {}
         for field_name, field_instance in iteritems(cls._fields):
             serialized = dct.get(field_name)
@@ -97,20 +201,147 @@ class BaseDocument(object):
         return cls(**params)
 
     @classmethod
-    def from_es(cls, hit):
+    def from_es(cls, hit, lazy=None, unloaded=None, loader=None):
         """
         Takes E.S hit element containing
         [u'_score', u'_type', u'_id', u'_source', u'_index']
 
+        If lazy the instance keeps a reference to the raw _source and
+        each field is decoded when read for the first time, use it when
+        only a few fields of wide documents are read
+
+        If the _source was filtered (see only and exclude of search) the
+        fields not loaded are left unset and reading them calls
+        loader(instance) to load them or raises UnloadedField
+
         :param hit: E.S hit
+        :param lazy: decode fields on first access (default cls._lazy)
+        :param unloaded: names of the fields not present in _source
+        :param loader: callable loading the unloaded fields of instance
         :return: Document instance
         """
-        instance = cls.from_dict(dct=hit.get('_source', {}))
+        source = hit.get('_source', {})
+        if lazy is None:
+            lazy = cls._lazy
+        if lazy and not cls._slots and cls._codecs():
+            instance = cls.__new__(cls)
+            instance.__dict__['_lazy_source'] = source
+        else:
+            instance = cls.from_dict(dct=source)
         instance._id = instance.id = hit.get('_id')
-        instance._score = hit.get('_score')
-        instance._query_fields = hit.get('fields', None)
+        set_attribute = object.__setattr__
+        set_attribute(instance, '_score', hit.get('_score'))
+        set_attribute(instance, '_query_fields', hit.get('fields', None))
+        set_attribute(instance, '_dirty', UNCHANGED)
+        if unloaded:
+            for field_name in unloaded:
+                try:
+                    object.__delattr__(instance, field_name)
+                except AttributeError:
+                    pass
+            set_attribute(instance, '_unloaded', set(unloaded))
+            set_attribute(instance, '_loader', loader)
         return instance
 
+    @classmethod
+    def _projection(cls, only=None, exclude=None):
+        """
+        Source filtering of a query loading only some fields
+        :param only: names of the fields to be loaded
+        :param exclude: names of the fields not to be loaded
+        :return: (search params, set of unloaded fields or None)
+        """
+        if not only and not exclude:
+            return {}, None
+        for field_name in list(only or ()) + list(exclude or ()):
+            if field_name not in cls._fields:
+                raise KeyError('`{}` is an invalid field'.format(field_name))
+        if only:
+            params = {'_source_include': list(only)}
+            unloaded = set(cls._fields) - set(only)
+        else:
+            params = {'_source_exclude': list(exclude)}
+            unloaded = set(exclude)
+        # id is always loaded from the hit _id
+        unloaded.discard('id')
+        return params, unloaded or None
+
+    @property
+    def unloaded_fields(self):
+        """
+        Names of the fields not loaded by the query (see only and
+        exclude of search), empty for complete documents
+        :return: set
+        """
+        return set(self._unloaded or ())
+
+    def _loaded_dict(self, validate=True, only=None, exclude=None):
+        """
+        Same as to_dict leaving out the fields not loaded by the query
+        instead of raising UnloadedField (or loading them)
+        :param validate: If should validate before transform
+        :param only: if specified only those fields will be included
+        :param exclude: fields to exclude from dict
+        :return: dict
+        """
+        unloaded = self._unloaded
+        if unloaded:
+            if only:
+                only = [name for name in only if name not in unloaded]
+                if not only:
+                    return {}
+            else:
+                exclude = set(exclude or ()) | unloaded
+        return self.to_dict(validate=validate, only=only, exclude=exclude)
+
+    def _load_field(self, field_name):
+        """
+        Reads a field not loaded by the query, the loader of the
+        document loads it (see from_es) else UnloadedField is raised
+        :param field_name: name of the field
+        :return: value
+        """
+        if self._loader is None:
+            raise UnloadedField(field_name)
+        self._loader(self)
+        if self._unloaded and field_name in self._unloaded:
+            raise UnloadedField(field_name)
+        return getattr(self, field_name)
+
+    def _load_source(self, source):
+        """
+        Decodes the unloaded fields from a raw _source (the complement
+        of the one the document was loaded from), changes are not
+        tracked as the values are the ones stored in E.S
+        :param source: dict
+        """
+        for field_name in self._unloaded or ():
+            object.__setattr__(
+                self, field_name, self._decode_field(field_name, source)
+            )
+        object.__setattr__(self, '_unloaded', None)
+        object.__setattr__(self, '_loader', None)
+
+    def _decode_lazy(self, field_name):
+        """
+        Decodes a field from the raw _source of a lazy document
+        (see from_es) and stores its value in the instance
+        :param field_name: name of the field
+        :return: decoded value
+        """
+        value = self._decode_field(field_name, self._lazy_source)
+        self.__dict__[field_name] = value
+        return value
+
+    def _decode_field(self, field_name, source):
+        field_instance = self._fields[field_name]
+        serialized = source.get(field_name)
+        value = field_instance.from_dict(serialized)
+        if serialized is None and value is not None:
+            # defaults are decoded twice as in __init__
+            value = field_instance.from_dict(value)
+        return value
+
     def validate(self):
         if self._validators:
             for validator in self._validators:
@@ -31,6 +31,23 @@ class BaseField(object):
         for key, value in kwargs.items():
             setattr(self, key, value)
 
+    def __get__(self, instance, owner):
+        """
+        Fields are non-data descriptors: values stored in the instance
+        __dict__ take precedence, this is called only for fields not
+        decoded yet of lazy documents or not loaded by the query of
+        partial documents (see BaseDocument.from_es)
+        """
+        if instance is None:
+            return self
+        values = instance.__dict__
+        unloaded = values.get('_unloaded')
+        if unloaded and self._field_name in unloaded:
+            return instance._load_field(self._field_name)
+        if values.get('_lazy_source') is None:
+            return self
+        return instance._decode_lazy(self._field_name)
+
     def validate_field_type(self, value):
         if value is not None:
             if not isinstance(value, self._type):
@@ -1,8 +1,54 @@
+import warnings
+from types import MemberDescriptorType
+
 from esengine.fields import StringField
 from esengine.bases.field import BaseField
 
 from six import iteritems
 
+# instance attributes other than the fields kept by compact documents
+SLOT_ATTRIBUTES = ('_id', '_score', '_query_fields', '_dirty', '_unloaded',
+                   '_loader')
+
+
+def _unset_slot(self, key):
+    """
+    __getattr__ of compact documents, slots not assigned yet read
+    the class attributes (e.g: _dirty is None) as __dict__ instances do
+    and fields not loaded by the query are loaded (see BaseField.__get__)
+    """
+    if key in self._fields:
+        unloaded = self._unloaded
+        if unloaded and key in unloaded:
+            return self._load_field(key)
+    for klass in type(self).__mro__:
+        value = klass.__dict__.get(key, _unset_slot)
+        if value is not _unset_slot and \
+                not isinstance(value, MemberDescriptorType):
+            return value
+    raise AttributeError(
+        '{!r} object has no attribute {!r}'.format(type(self).__name__, key)
+    )
+
+
+def _make_slots(bases, attrs):
+    """
+    Turns the fields of a compact document class into __slots__, the
+    field instances are kept only in _fields so each value is stored in
+    a slot of the instance instead of a per instance __dict__
+    """
+    inherited = set()
+    for base in bases:
+        for klass in base.__mro__:
+            inherited.update(klass.__dict__.get('__slots__', ()))
+    slots = []
+    for key in SLOT_ATTRIBUTES + tuple(attrs['_fields']):
+        attrs.pop(key, None)
+        if key not in inherited and key not in slots:
+            slots.append(key)
+    attrs['__slots__'] = tuple(slots)
+    attrs.setdefault('__getattr__', _unset_slot)
+
 
 class ModelMetaclass(type):
 
@@ -15,6 +61,9 @@ class ModelMetaclass(type):
                 break
 
         for base in bases:
+            if getattr(base, '_slots', False):
+                # fields of compact bases are not class attributes
+                attrs['_fields'].update(base._fields)
             for key, value in iteritems(base.__dict__):
                 if isinstance(value, BaseField):
                     value._field_name = key
@@ -24,7 +73,100 @@ class ModelMetaclass(type):
             if isinstance(value, BaseField):
                 value._field_name = key
                 attrs['_fields'][key] = value
+
+        slotted = attrs.get(
+            '_slots', any(getattr(base, '_slots', False) for base in bases)
+        )
+        if slotted and '__slots__' not in attrs:
+            _make_slots(bases, attrs)
         cls = type.__new__(mcls, name, bases, attrs)
         if any(x.__name__ == 'EmbeddedDocument' for x in bases):
             cls._type = cls
         return cls
+
+
+def _compile(name, lines, namespace):
+    source = '\n'.join(lines)
+    code = compile(source, '<esengine {}>'.format(name), 'exec')
+    exec(code, namespace)
+    return namespace[name]
+
+
+def compile_codecs(cls):
+    """
+    Generates, once per Document class, specialized functions to
+    hydrate and serialize its instances, the loops over cls._fields are
+    unrolled in generated code:
+
+    - from_dict(source): each value is decoded only once and written
+      straight to the instance __dict__ or slot (the same result of
+      cls(**params) without its per instance class checks and its
+      second from_dict of each value), missing values get the default
+    - to_dict(instance, validate): serializes all fields
+
+    The class level checks of BaseDocument.__init__ are done here.
+
+    :param cls: Document class
+    :return: dict having fields, from_dict and to_dict
+    """
+    name = cls.__name__
+    if not hasattr(cls, '_doctype'):
+        raise ValueError('{} have no _doctype attribute'.format(name))
+    if not hasattr(cls, '_index'):
+        raise ValueError('{} have no _index attribute'.format(name))
+    id_field = cls._fields.get('id')
+    if id_field and not isinstance(id_field, StringField):
+        warnings.warn(
+            'To avoid mapping problems, '
+            'it is recommended to define the id field as a StringField'
+        )
+
+    namespace = {'cls': cls, 'new': cls.__new__}
+    from_dict = [
+        'def from_dict(source):',
+        '    get = source.get',
+        '    instance = new(cls)',
+    ]
+    if any(not isinstance(getattr(cls, field_name, None), MemberDescriptorType)
+           for field_name in cls._fields):
+        from_dict.append('    values = instance.__dict__')
+    to_dict = [
+        'def to_dict(instance, validate=True):',
+        '    if validate:',
+        '        instance.validate()',
+        '    return {',
+    ]
+    for i, (field_name, field) in enumerate(iteritems(cls._fields)):
+        namespace['decode_%d' % i] = field.from_dict
+        namespace['encode_%d' % i] = field.to_dict
+        if field.from_dict(None) is None:
+            missing = 'None'
+        else:
+            # non None defaults keep being decoded twice as in __init__
+            # so each instance gets its own copy of mutable defaults
+            namespace['default_%d' % i] = field.from_dict
+            missing = 'default_{0}(default_{0}(None))'.format(i)
+        descriptor = getattr(cls, field_name, None)
+        if isinstance(descriptor, MemberDescriptorType):
+            namespace['set_%d' % i] = descriptor.__set__
+            store = 'set_{}(instance, {{}})'.format(i)
+        else:
+            store = 'values[{!r}] = {{}}'.format(field_name)
+        from_dict.extend([
+            '    value = get({!r})'.format(field_name),
+            '    ' + store.format(
+                '{} if value is None else decode_{}(value)'.format(missing, i)
+            ),
+        ])
+        to_dict.append(
+            '        {0!r}: encode_{1}(instance.{0}, validate=validate),'
+            .format(field_name, i)
+        )
+    from_dict.append('    return instance')
+    to_dict.append('    }')
+
+    return {
+        'fields': cls._fields,
+        'from_dict': _compile('from_dict', from_dict, namespace),
+        'to_dict': _compile('to_dict', to_dict, namespace),
+    }
@@ -6,3 +6,6 @@ if _IS_PY3:
     unicode = str
     long = int
     basestring = str
+
+# async / await syntax used by the asyncio API (see bases/aio.py)
+_HAS_ASYNC = sys.version_info >= (3, 6)
@@ -3,13 +3,26 @@ import time
 import elasticsearch.helpers as eh
 from six import text_type
 
+from esengine.bases.py3 import _HAS_ASYNC
+from esengine.utils.columns import to_columns
+
+if _HAS_ASYNC:
+    from esengine.bases.aio import AsyncResultSetMixin
+else:  # pragma: no cover
+    AsyncResultSetMixin = object
+
 HITS = 'hits'
 
 
-class ResultSet(object):
+class ResultSet(AsyncResultSetMixin):
     def __init__(self, resp, model, query=None,
-                 size=None, es=None, meta=None):
+                 size=None, es=None, meta=None, only=None, exclude=None,
+                 deferred=False):
         self._model = model
+        # source filtering of the query (see Document.search)
+        self._source_params, self._unloaded = model._projection(only,
+                                                                exclude)
+        self._loader = self._load_documents if deferred else None
         self._values = self._hits = resp.get(HITS, {}).get(HITS, [])
         self._query = query
         self._es = model.get_es(es)
@@ -17,7 +30,8 @@ class ResultSet(object):
         self._meta = self._extract_meta(resp)
         if meta:
             self._meta.update(meta)
-        self._all_values = []
+        # documents hydrated from self._hits, by index, None if not yet
+        self._docs = [None] * len(self._hits)
 
     def __iter__(self):
         return self.values
@@ -33,60 +47,141 @@ class ResultSet(object):
     def meta(self):
         return self._meta
 
+    def _hydrate(self, index):
+        """
+        Document of the hit at index, each hit is hydrated only once
+        and the same instance is returned by the following reads
+        :param index: positive index of the hit
+        :return: Document instance
+        """
+        doc = self._docs[index]
+        if doc is None:
+            if self._unloaded:
+                doc = self._model.from_es(
+                    hit=self._hits[index],
+                    unloaded=self._unloaded,
+                    loader=self._loader
+                )
+            else:
+                doc = self._model.from_es(hit=self._hits[index])
+            self._docs[index] = doc
+        return doc
+
+    def _load_documents(self, doc):
+        """
+        Loads the fields not loaded by the query of all the documents of
+        the result set with one multi get requesting only the missing
+        fields, the first read of an unloaded field of any document
+        triggers it so loops over the results make no request per document
+        :param doc: Document instance having an unloaded field read
+        """
+        docs = [value for value in self.values if value._unloaded]
+        if not any(value is doc for value in docs):
+            docs.append(doc)
+        by_id = {}
+        fields = set()
+        for value in docs:
+            by_id.setdefault(value._id, []).append(value)
+            fields.update(value._unloaded)
+        found = self._model._mget(
+            list(by_id), es=self._es, _source_include=sorted(fields)
+        )
+        for doc_id, raw in found:
+            if raw.get('found'):
+                for value in by_id[doc_id]:
+                    value._load_source(raw.get('_source', {}))
+
     @property
     def values(self):
-        return (
-            self._model.from_es(hit=hit)
-            for hit in self._hits
-        )
+        return (self._hydrate(i) for i in range(len(self._hits)))
 
     @property
     def all_values(self):
-        if not self._all_values:
-            self._all_values = [i for i in self.values]
-        return self._all_values
+        return list(self.values)
 
     def __getitem__(self, item):
-        return self.all_values[item]
+        """
+        Hydrates only the requested hit or slice of hits
+        """
+        if isinstance(item, slice):
+            return [
+                self._hydrate(i)
+                for i in range(*item.indices(len(self._hits)))
+            ]
+        if item < 0:
+            item += len(self._hits)
+        if not 0 <= item < len(self._hits):
+            raise IndexError('ResultSet index out of range')
+        return self._hydrate(item)
 
     def reload(self, sleep=1):
         time.sleep(sleep)
-        self._all_values = []
-        resp = self._es.search(
+        resp = self._es.search(**self._reload_params())
+        return self._reloaded(resp)
+
+    def _reload_params(self):
+        """
+        :return: params of the search request repeating the query
+        """
+        return dict(
             index=self._model._index,
             doc_type=self._model._doctype,
             body=self._query,
-            size=self._size or len(self._values)
+            size=self._size or len(self._values),
+            **self._source_params
         )
+
+    def _reloaded(self, resp):
+        """
+        Replaces the hits by the ones of a new response of the query
+        :param resp: ES client raw results
+        :return: resp
+        """
         self._hits = self._values = resp.get('hits', {}).pop('hits', [])
+        self._docs = [None] * len(self._hits)
         self._meta = resp
         return resp
 
+    def _actions(self, op_type, **kwargs):
+        """
+        Bulk actions of all the hits
+        :param op_type: update or delete
+        :param kwargs: extra values of each action (e.g: doc)
+        :return: list of dict actions
+        """
+        actions = []
+        for hit in self._hits:
+            action = {
+                '_op_type': op_type,
+                '_index': self._model._index,
+                '_type': self._model._doctype,
+                '_id': hit['_id'],
+            }
+            action.update(kwargs)
+            actions.append(action)
+        return actions
+
+    def _invalidate(self):
+        """
+        Invalidates the hits in the caches of the model, after they are
+        written (see Document._bulk_sent)
+        """
+        self._model._invalidate([hit['_id'] for hit in self._hits])
+
     def update(self, meta=None, **kwargs):
         if kwargs:
-            actions = [
-                {
-                    '_op_type': 'update',
-                    '_index': self._model._index,
-                    '_type': self._model._doctype,
-                    '_id': doc.id,
-                    'doc': kwargs
-                }
-                for doc in self.values
-            ]
-            return eh.bulk(self._es, actions, **meta if meta else {})
+            actions = self._actions('update', doc=kwargs)
+            try:
+                return eh.bulk(self._es, actions, **meta if meta else {})
+            finally:
+                self._invalidate()
 
     def delete(self, meta=None, **kwargs):
-        actions = (
-            {
-                '_op_type': 'delete',
-                '_index': self._model._index,
-                '_type': self._model._doctype,
-                '_id': doc.id,
-            }
-            for doc in self.values
-        )
-        return eh.bulk(self._es, actions, **meta if meta else {})
+        actions = self._actions('delete')
+        try:
+            return eh.bulk(self._es, actions, **meta if meta else {})
+        finally:
+            self._invalidate()
 
     def count(self):
         return min(self._size, self.meta.get('hits', {}).get('total'))
@@ -94,12 +189,13 @@ class ResultSet(object):
     def to_dict(self, *args, **kwargs):
         """
         returns a list of Documents transformed in dicts
-        [{}, {}, ...]
+        [{}, {}, ...] the fields not loaded by the query (see only and
+        exclude of search) are left out
         :param args: passed to item
         :param kwargs: passed to item
         :return:
         """
-        return [item.to_dict(*args, **kwargs) for item in self.values]
+        return [item._loaded_dict(*args, **kwargs) for item in self.values]
 
     def get_values(self, *fields):
         """
@@ -122,6 +218,31 @@ class ResultSet(object):
         else:
             return [getattr(value, fields[0]) for value in self.values]
 
+    def prefetch(self, *fields, **kwargs):
+        """
+        Resolves the ReferenceFields of all the documents with one multi
+        get per referenced class (see Document.prefetch)
+        .prefetch("author", "tags")
+        :param fields: names of ReferenceFields
+        :param kwargs: <see Document.prefetch parameters>
+        :return: self
+        """
+        kwargs.setdefault('default_es', self._es)
+        self._model.prefetch(self.all_values, *fields, **kwargs)
+        return self
+
+    def to_columns(self, *fields):
+        """
+        Typed numpy columns read from the raw hits without building
+        documents, dtypes follow the field classes (see utils.columns)
+        .to_columns("id", "views")
+        OrderedDict([('id', array(...)), ('views', array([...]))])
+        :param fields: names of the fields (default all), _id and _score
+        are also accepted
+        :return: OrderedDict of field name: numpy.ndarray
+        """
+        return to_columns(self._model, self._hits, fields)
+
     def __unicode__(self):
         return text_type(self.__unicode__())
 
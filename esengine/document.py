@@ -1,17 +1,33 @@
 import elasticsearch.helpers as eh
+from functools import partial
 
-from six import iteritems, with_metaclass
+from six import iteritems, text_type, with_metaclass
 from esengine.bases.py3 import *  # noqa
+from esengine.bases.py3 import _HAS_ASYNC
 from esengine.bases.document import BaseDocument
 from esengine.bases.metaclass import ModelMetaclass
 from esengine.bases.result import ResultSet
 from esengine.mapping import Mapping
+from esengine.fields import ReferenceField
 from esengine.utils import validate_client
+from esengine.utils.bulk import BULK_OPTIONS, BulkWriter
+from esengine.utils.bulk import bulk, streaming_bulk, parallel_bulk
+from esengine.utils.scan import scroll_pages
+from esengine.utils.columns import to_columns, source_params
+from esengine.utils.cache import fingerprint
+from esengine.utils.loader import Loader
+from esengine.utils.multisearch import MultiSearch
 from esengine.utils.payload import Payload, Filter
 from esengine.exceptions import ClientError
 
+if _HAS_ASYNC:
+    from esengine.bases.aio import AsyncDocumentMixin
+else:  # pragma: no cover
+    AsyncDocumentMixin = object
 
-class Document(with_metaclass(ModelMetaclass, BaseDocument)):
+
+class Document(with_metaclass(ModelMetaclass, BaseDocument,
+                              AsyncDocumentMixin)):
     """
     Base Document to be extended in your models definitions
 
@@ -29,6 +45,7 @@ class Document(with_metaclass(ModelMetaclass, BaseDocument)):
     >>> MyDoc.filter(name="Gonzo")
 
     """
+    __slots__ = ()
 
     # If _autoid is set to False the id Field will not be automatically
     # included in the Document model and you will need to specify a field
@@ -41,10 +58,28 @@ class Document(with_metaclass(ModelMetaclass, BaseDocument)):
     # to invalidate the callable should raise validationError or return value
     _validators = None
 
+    # _cache is an optional utils.cache.DocumentCache instance caching
+    # the documents read by get, invalidated by the writes of this class
+    _cache = None
+
+    # _search_cache is an optional utils.cache.SearchCache instance
+    # caching search, filter and count responses, invalidated by writes
+    _search_cache = None
+
+    # _single_flight is an optional utils.singleflight.SingleFlight
+    # instance coalescing identical concurrent get, search and count
+    _single_flight = None
+
+    # _batch_window (seconds) if set makes the get calls made by any
+    # thread within the window be sent together as one multi get
+    _batch_window = None
+
     @classmethod
     def having(cls, **kwargs):
         meta_attributes = ['index', 'doctype', 'es', 'autoid', 'validators',
-                           'strict', 'fields']
+                           'strict', 'fields', 'lazy', 'cache',
+                           'search_cache', 'single_flight',
+                           'batch_window']
         for k, v in kwargs.items():
             setattr(cls, "_" + k if k in meta_attributes else k, v)
         return cls
@@ -76,28 +111,75 @@ class Document(with_metaclass(ModelMetaclass, BaseDocument)):
         """
         return cls.get_es(es).indices.refresh()
 
-    def save(self, es=None):
+    def save(self, es=None, partial=False):
         """
         Save current instance of a Document
 
         >>> obj = Document(field='value')
         >>> obj.save()
 
+        Using partial=True a document loaded from E.S sends only the
+        fields changed since it was loaded (see save_changes)
+
+        >>> obj = Document.get(id=123)
+        >>> obj.field = 'other value'
+        >>> obj.save(partial=True)
+
         :param es: ES client or None (if implemented a default in Model)
+        :param partial: If True update only the changed fields
         :return: Es meta data
         """
-        doc = self.to_dict()
-        saved_document = self.get_es(es).index(
+        if partial and self._dirty is not None:
+            return self.save_changes(es=es)
+        saved_document = self.get_es(es).index(**self._index_params())
+        return self._saved(saved_document)
+
+    def _index_params(self):
+        """
+        :return: params of the index request saving the document
+        """
+        return dict(
             index=self._index,
             doc_type=self._doctype,
             id=self.id,  # noqa
-            body=doc
+            body=self.to_dict()
         )
+
+    def _saved(self, saved_document):
+        """
+        Takes the id of a created document, invalidates the caches and
+        tracks the changes from the saved values
+        :param saved_document: response of the index request
+        :return: saved_document
+        """
         created = saved_document.get('created')
         if created:
             self.id = saved_document['_id']
+        self._invalidate([self.id])
+        self.track_changes()
         return saved_document
 
+    def save_changes(self, es=None, meta=None):
+        """
+        Update only the fields changed since the document was loaded
+        from E.S or saved, nothing is sent if no field was changed
+
+        >>> obj = Document.get(id=123)
+        >>> obj.field = 'other value'
+        >>> obj.save_changes()
+
+        :param es: ES client or None (if implemented a default in Model)
+        :param meta: Extra values to be passed to client
+        :return: Update result or None
+        """
+        changes = self.changes()
+        if changes:
+            updated_data = self.update_by_id(
+                self.id, body={'doc': changes}, es=es, meta=meta
+            )
+            self._changes_saved(changes)
+            return updated_data
+
     def update(self, body=None, es=None, meta=None, **kwargs):
         """
         Update a single document
@@ -124,10 +206,19 @@ class Document(with_metaclass(ModelMetaclass, BaseDocument)):
         updated_data = self.update_by_id(
             self.id, body=body, es=es, meta=meta
         )
+        self._updated(body)
+        return updated_data
+
+    def _updated(self, body):
+        """
+        Sets the values sent by update (not tracked as changes)
+        :param body: the body of the update
+        """
         if 'script' not in body:
             for key, value in iteritems(body):
                 setattr(self, key, value)
-        return updated_data
+                if self._dirty:
+                    self._dirty.discard(key)
 
     @classmethod
     def update_by_id(cls, doc_id, body=None, es=None, meta=None, **kwargs):
@@ -152,6 +243,16 @@ class Document(with_metaclass(ModelMetaclass, BaseDocument)):
         :param kwargs: values to change
         :return: Update result
         """
+        params = cls._update_params(doc_id, body, meta, **kwargs)
+        updated_data = cls.get_es(es).update(**params)
+        cls._invalidate([doc_id])
+        return updated_data
+
+    @classmethod
+    def _update_params(cls, doc_id, body=None, meta=None, **kwargs):
+        """
+        :return: params of the update request <see update_by_id>
+        """
         body = body or {}
         body.update(kwargs)
         meta = meta or {}
@@ -159,14 +260,13 @@ class Document(with_metaclass(ModelMetaclass, BaseDocument)):
         if 'script' not in body and 'doc' not in body:
             body = {'doc': body}
 
-        updated_data = cls.get_es(es).update(
+        return dict(
             index=cls._index,
             doc_type=cls._doctype,
             id=doc_id,  # noqa
             body=body,
             **meta
         )
-        return updated_data
 
     def delete(self, es=None):
         """
@@ -178,12 +278,63 @@ class Document(with_metaclass(ModelMetaclass, BaseDocument)):
         :param es: ES client or None (if implemented a default in Model)
         :return: ES meta data
         """
-        return self.get_es(es).delete(
+        deleted = self.get_es(es).delete(**self._delete_params())
+        self._invalidate([self.id])
+        return deleted
+
+    def _delete_params(self):
+        """
+        :return: params of the delete request of the document
+        """
+        return dict(
             index=self._index,
             doc_type=self._doctype,
             id=self.id,  # noqa
         )
 
+    @classmethod
+    def _invalidate(cls, ids):
+        """
+        Removes the written documents from the cache of the class and
+        invalidates its cached searches
+        :param ids: list of _id
+        """
+        if cls._cache is not None:
+            cls._cache.invalidate(cls, ids)
+        if cls._search_cache is not None:
+            cls._search_cache.invalidate(cls, ids)
+
+    @classmethod
+    def _request(cls, method, es, params):
+        """
+        Sends a search or count request, read through the _search_cache
+        of the class if any
+        :param method: search or count
+        :param es: ES client
+        :param params: the params of the request (index, body, size...)
+        :return: E.S response
+        """
+        fetch = partial(cls._send, method, es, params)
+        if cls._search_cache is None:
+            return fetch()
+        return cls._search_cache.get(cls, method, params, fetch)
+
+    @classmethod
+    def _send(cls, method, es, params):
+        """
+        Sends a request to E.S, identical concurrent requests share a
+        single call if the class has a _single_flight
+        :param method: get, search or count
+        :param es: ES client
+        :param params: the params of the request
+        :return: E.S response
+        """
+        fetch = partial(getattr(es, method), **params)
+        if cls._single_flight is None:
+            return fetch()
+        key = (id(es), method, fingerprint(params))
+        return cls._single_flight.do(key, fetch)
+
     @classmethod
     def create(cls, es=None, **kwargs):
         """
@@ -230,6 +381,29 @@ class Document(with_metaclass(ModelMetaclass, BaseDocument)):
             **kwargs
         )
 
+    @classmethod
+    def exists_many(cls, ids, es=None, chunk_size=1000, **kwargs):
+        """
+        Tell which documents exists on index using batched multi get
+        requests without _source
+
+        >>> Document.exists_many([123, 456, 789])
+        {123, 789}
+
+        :param ids: list of _id
+        :param es: ES client or None (if implemented a default in Model)
+        :param chunk_size: max number of ids in one request
+        :param kwargs: extra key=value to be passed to es client
+        :return: set of found ids
+        """
+        kwargs['_source'] = False
+        return set(
+            doc_id
+            for doc_id, doc in cls._mget(ids, es=es, chunk_size=chunk_size,
+                                         **kwargs)
+            if doc.get('found')
+        )
+
     @classmethod
     def get(cls, id, es=None, **kwargs):  # noqa
         """
@@ -237,18 +411,181 @@ class Document(with_metaclass(ModelMetaclass, BaseDocument)):
 
         >>> Document.get(id=123)
 
+        If the class has a _cache (see utils.cache.DocumentCache) gets
+        without extra kwargs are read through it, and if it has a
+        _batch_window they are sent in batches (see loader)
+
         :param id: The _id or _uid of the object
         :param es: ES client or None (if implemented a default in Model)
         :param kwargs: extra key=value to be passed to es client
         :return: A single Doc object
         """
         es = cls.get_es(es)
-        res = es.get(index=cls._index,
-                     doc_type=cls._doctype,
-                     id=id,
-                     **kwargs)
+        if cls._batch_window is not None and not kwargs:
+            fetch = partial(cls._window_loader(es).fetch, id)
+        else:
+            params = dict(index=cls._index, doc_type=cls._doctype, id=id,
+                          **kwargs)
+            fetch = partial(cls._send, 'get', es, params)
+        if cls._cache is not None and not kwargs:
+            res = cls._cache.get(cls, id, fetch)
+        else:
+            res = fetch()
         return cls.from_es(res)
 
+    @classmethod
+    def loader(cls, es=None, window=None, max_batch=1000):
+        """
+        Returns a Loader collecting gets of this class to be sent as one
+        multi get, ids requested more than once are sent once
+
+        >>> with Document.loader() as loader:
+        ...     first, second = loader.load(123), loader.load(456)
+        >>> first.result()
+
+        :param es: ES client or None (if implemented a default in Model)
+        :param window: <see Loader parameters>
+        :param max_batch: max number of ids in one request
+        :return: utils.loader.Loader instance
+        """
+        return Loader(cls, es=es, window=window, max_batch=max_batch)
+
+    @classmethod
+    def _window_loader(cls, es):
+        """
+        The Loader shared by the gets of the class (see _batch_window)
+        :param es: ES client
+        :return: utils.loader.Loader instance
+        """
+        loaders = cls.__dict__.get('_window_loaders')
+        if loaders is None:
+            loaders = cls._window_loaders = {}
+        loader = loaders.get(id(es))
+        if loader is None or loader.window != cls._batch_window:
+            loader = loaders[id(es)] = cls.loader(es=es,
+                                                  window=cls._batch_window)
+        return loader
+
+    @classmethod
+    def _mget(cls, ids, es=None, chunk_size=1000, **kwargs):
+        """
+        Multi get of ids chunked in requests of chunk_size ids
+        :param ids: list of _id
+        :param es: ES client or None (if implemented a default in Model)
+        :param chunk_size: max number of ids in one request
+        :param kwargs: extra key=value to be passed to es client
+        :return: generator of (id, raw doc) pairs in the same order of ids
+        """
+        es = cls.get_es(es)
+        ids = list(ids)
+        for start in range(0, len(ids), chunk_size):
+            chunk = ids[start:start + chunk_size]
+            resp = es.mget(index=cls._index,
+                           doc_type=cls._doctype,
+                           body={'ids': chunk},
+                           **kwargs)
+            for doc_id, doc in zip(chunk, resp['docs']):
+                yield doc_id, doc
+
+    @classmethod
+    def get_many(cls, ids, fields=None, es=None, chunk_size=1000, **kwargs):
+        """
+        Get various documents by _id using multi get (_mget)
+        the results are in the same order of ids and None is returned
+        for missing ids
+
+        >>> Document.get_many([123, 456, 789])
+        [<Document ...>, None, <Document ...>]
+
+        :param ids: list of _id
+        :param fields: Optional list of fields to be included in _source
+        (the other fields are unloaded, see search)
+        :param es: ES client or None (if implemented a default in Model)
+        :param chunk_size: max number of ids in one request
+        :param kwargs: extra key=value to be passed to es client
+        :return: list of Doc objects or None
+        """
+        params, unloaded = cls._projection(only=fields)
+        kwargs.update(params)
+        return [
+            cls.from_es(doc, unloaded=unloaded) if doc.get('found') else None
+            for _, doc in cls._mget(ids, es=es, chunk_size=chunk_size,
+                                    **kwargs)
+        ]
+
+    @classmethod
+    def prefetch(cls, docs, *fields, **kwargs):
+        """
+        Resolves the ReferenceFields of docs: the referenced ids of all
+        the documents are collected and fetched with one multi get per
+        referenced class, the ids are replaced by the hydrated instances
+        (ids not found are kept), changes are not tracked
+
+        >>> books = Book.get_many([1, 2, 3])
+        >>> Book.prefetch(books, 'author', 'tags')
+        >>> books[0].author.name
+
+        :param docs: list of Doc objects
+        :param fields: names of ReferenceFields
+        :param es: ES client or None (if implemented a default in the
+        referenced Models)
+        :param default_es: client of the referenced Models not having a
+        default client (e.g: the client of a ResultSet)
+        :param chunk_size: max number of ids in one request
+        :return: docs
+        """
+        es = kwargs.get('es')
+        default_es = kwargs.get('default_es')
+        chunk_size = kwargs.get('chunk_size', 1000)
+        references = []
+        ids = {}
+        for field_name in fields:
+            field = cls._fields.get(field_name)
+            if not isinstance(field, ReferenceField):
+                raise ValueError(
+                    '`{}` is not a ReferenceField'.format(field_name)
+                )
+            target = field._document
+            target_ids = ids.setdefault(target, {})
+            references.append((field_name, field, target))
+            for doc in docs:
+                value = getattr(doc, field_name)
+                for ref in (value or () if field._multi else (value,)):
+                    if ref is not None and not isinstance(ref, target):
+                        target_ids[ref] = None
+
+        found = {}
+        for target, target_ids in iteritems(ids):
+            found[target] = resolved = {}
+            if not target_ids:
+                continue
+            target_es = es or (
+                None if hasattr(target, '_es') else default_es
+            )
+            for doc_id, raw in target._mget(list(target_ids), es=target_es,
+                                            chunk_size=chunk_size):
+                if raw.get('found'):
+                    resolved[doc_id] = target.from_es(raw)
+
+        for field_name, field, target in references:
+            resolved = found[target]
+            for doc in docs:
+                value = getattr(doc, field_name)
+                if field._multi:
+                    if not value:
+                        continue
+                    value = [
+                        resolved.get(ref, ref)
+                        if not isinstance(ref, target) else ref
+                        for ref in value
+                    ]
+                elif value is None or isinstance(value, target):
+                    continue
+                else:
+                    value = resolved.get(value, value)
+                object.__setattr__(doc, field_name, value)
+        return docs
+
     @classmethod
     def count_by_query(cls, *args, **kwargs):
         """
@@ -284,24 +621,46 @@ class Document(with_metaclass(ModelMetaclass, BaseDocument)):
         return getattr(cls, _method)(*args, **kwargs)
 
     @classmethod
-    def filter(cls, es=None, ids=None,
-               size=None, perform_count=False, **filters):
+    def filter(cls, es=None, ids=None, size=None, perform_count=False,
+               only=None, exclude=None, deferred=False, **filters):
         """
         A match_all query with filters
 
         >>> Document.filter(ids=[123, 456])
         >>> Document.filter(name="Gonzo", city="Tunguska", size=10)
+        >>> Document.filter(city="Tunguska", only=["name"])
 
         :param es: ES client or None (if implemented a default in Model)
         :param ids: Filtering by _id or _uid
         :param size: size of result, default 100
         :param filters: key=value parameters
         :param perform_count: If True, dont return objects, only count
+        :param only: names of the only fields fetched from _source
+        :param exclude: names of the fields not fetched from _source
+        :param deferred: if True the fields not fetched are loaded when
+        read for the first time, else reading them raises UnloadedField
         :return: Iterator of Doc objets
         """
 
         es = cls.get_es(es)
+        query, size = cls._filter_query(ids, size, filters)
 
+        if perform_count:
+            return cls._request('count', es, cls._search_args(query))['count']
+
+        search_args = cls._search_args(query, only, exclude)
+        if size:
+            search_args['size'] = size
+        resp = cls._request('search', es, search_args)
+        return cls.build_result(resp, es=es, query=query, size=size,
+                                only=only, exclude=exclude, deferred=deferred)
+
+    @staticmethod
+    def _filter_query(ids, size, filters):
+        """
+        The query of filter <see filter parameters>
+        :return: tuple (query, size)
+        """
         if ids and filters:
             raise ValueError(
                 "You can't specify ids together with other filters"
@@ -334,24 +693,30 @@ class Document(with_metaclass(ModelMetaclass, BaseDocument)):
                 }
             }
 
-        size = len(ids) if ids else size
+        return query, len(ids) if ids else size
+
+    @classmethod
+    def _search_args(cls, query, only=None, exclude=None, **kwargs):
+        """
+        The params of a search (or count) request of the class
+        :param query: raw query dict
+        :param only: names of the only fields fetched from _source
+        :param exclude: names of the fields not fetched from _source
+        :param kwargs: extra key=value to be passed to es client
+        :return: dict
+        """
         search_args = dict(
             index=cls._index,
             doc_type=cls._doctype,
-            body=query
+            body=query,
+            **kwargs
         )
-
-        if perform_count:
-            return es.count(**search_args)['count']
-
-        if size:
-            search_args['size'] = size
-
-        resp = es.search(**search_args)
-        return cls.build_result(resp, es=es, query=query, size=size)
+        search_args.update(cls._projection(only, exclude)[0])
+        return search_args
 
     @classmethod
-    def search(cls, query, es=None, perform_count=False, **kwargs):
+    def search(cls, query, es=None, perform_count=False, only=None,
+               exclude=None, deferred=False, **kwargs):
         """
         Takes a raw ES query in form of a dict or Payload and
         return Doc instances iterator
@@ -369,6 +734,10 @@ class Document(with_metaclass(ModelMetaclass, BaseDocument)):
         :param query: raw_query(preferable) or Query or Payload instance
         :param es: ES client or None (if implemented a default in Model)
         :param perform_count: If True, dont return objects, only count
+        :param only: names of the only fields fetched from _source
+        :param exclude: names of the fields not fetched from _source
+        :param deferred: if True the fields not fetched are loaded when
+        read for the first time, else reading them raises UnloadedField
         :param kwargs: extra key=value to be passed to es client
         :return: Iterator of Doc objets
 
@@ -377,6 +746,31 @@ class Document(with_metaclass(ModelMetaclass, BaseDocument)):
         Document.search({"query": ...}) || .search(payload_instance.dict)
         """
 
+        query = cls._query_dict(query)
+        es = cls.get_es(es)
+
+        if perform_count:
+            search_args = cls._search_args(query, **kwargs)
+            return cls._request('count', es, search_args)['count']
+
+        search_args = cls._search_args(query, only, exclude, **kwargs)
+        return cls.build_result(
+            cls._request('search', es, search_args),
+            es=es,
+            query=query,
+            size=kwargs.get('size'),
+            only=only,
+            exclude=exclude,
+            deferred=deferred
+        )
+
+    @staticmethod
+    def _query_dict(query):
+        """
+        Turns a Payload, Filter or Query in to a raw query dict
+        :param query: raw_query(preferable) or Query or Payload instance
+        :return: dict
+        """
         if not isinstance(query, dict):
             # if not a raw dict query
             if isinstance(query, Payload):  # must be a Payload instance
@@ -385,27 +779,123 @@ class Document(with_metaclass(ModelMetaclass, BaseDocument)):
                 query = Payload(filter=query).dict
             else:  # or a Query to wrap
                 query = Payload(query=query).dict
+        return query
 
-        es = cls.get_es(es)
-        search_args = dict(
+    @classmethod
+    def msearch(cls, queries, es=None, **kwargs):
+        """
+        Sends various searches as one multi search request (_msearch),
+        queries of other Document classes are given as pairs
+
+        >>> people, gonzos, companies = Person.msearch([
+        ...     {"query": {"match_all": {}}},
+        ...     Payload(query=Query.match("name", "Gonzo")),
+        ...     (Company, {"query": {"match_all": {}}})
+        ... ], size=10)
+
+        A failed search does not fail the others, its result is the
+        SearchError (see utils.multisearch.MultiSearch)
+
+        :param queries: list of raw_query(preferable), Query, Filter or
+        Payload instances or (Document class, query) pairs
+        :param es: ES client or None (if implemented a default in Model)
+        :param kwargs: params of every search <see MultiSearch.add>
+        :return: list of ResultSet or SearchError, one per query
+        """
+        multi = MultiSearch(model=cls, es=es)
+        for query in queries:
+            multi.add(query, **kwargs)
+        return multi.execute()
+
+    @classmethod
+    def scan(cls, query=None, page_size=100, scroll='5m', es=None,
+             prefetch=True, **kwargs):
+        """
+        Iterates over all documents matching a query using scroll,
+        documents are hydrated one page at a time (while the next page
+        is fetched in background) so memory is constant for any number
+        of documents, use it to export or reprocess a whole index
+
+        >>> for doc in Document.scan({"query": {"match_all": {}}}):
+        ...     process(doc)
+
+        The scroll context is cleared when the iteration ends or the
+        generator is closed (e.g: break in a for loop)
+
+        :param query: raw_query(preferable) or Query or Payload instance
+        (default match_all)
+        :param page_size: number of hits per page (per shard if unsorted)
+        :param scroll: how long the scroll context is kept between pages
+        :param es: ES client or None (if implemented a default in Model)
+        :param prefetch: if True fetch the next page in background
+        :param kwargs: extra key=value to be passed to es client
+        (preserve_order=True keeps the sort of the query)
+        :return: generator of Doc objects
+        """
+        if query is None:
+            query = {"query": {"match_all": {}}}
+        pages = scroll_pages(
+            cls.get_es(es),
             index=cls._index,
             doc_type=cls._doctype,
-            body=query,
+            body=cls._query_dict(query),
+            page_size=page_size,
+            scroll=scroll,
+            prefetch=prefetch,
             **kwargs
         )
+        try:
+            for hits in pages:
+                for hit in hits:
+                    yield cls.from_es(hit)
+        finally:
+            pages.close()
 
-        if perform_count:
-            return es.count(**search_args)['count']
+    @classmethod
+    def scan_columns(cls, fields=None, query=None, page_size=100,
+                     scroll='5m', es=None, prefetch=True, **kwargs):
+        """
+        Streaming counterpart of ResultSet.to_columns, iterates over all
+        documents matching a query using scroll yielding typed numpy
+        columns of each page, only the exported fields are fetched
+        from _source and no document is built
 
-        return cls.build_result(
-            es.search(**search_args),
-            es=es,
-            query=query,
-            size=kwargs.get('size')
+        >>> for columns in Document.scan_columns(['views', 'created_at']):
+        ...     total += columns['views'].sum()
+
+        :param fields: names of the fields (default all), _id and _score
+        are also accepted
+        :param query: raw_query(preferable) or Query or Payload instance
+        (default match_all)
+        :param page_size: number of hits per page (per shard if unsorted)
+        :param scroll: how long the scroll context is kept between pages
+        :param es: ES client or None (if implemented a default in Model)
+        :param prefetch: if True fetch the next page in background
+        :param kwargs: extra key=value to be passed to es client
+        :return: generator of OrderedDict of field name: numpy.ndarray
+        """
+        if query is None:
+            query = {"query": {"match_all": {}}}
+        kwargs.update(source_params(fields))
+        pages = scroll_pages(
+            cls.get_es(es),
+            index=cls._index,
+            doc_type=cls._doctype,
+            body=cls._query_dict(query),
+            page_size=page_size,
+            scroll=scroll,
+            prefetch=prefetch,
+            **kwargs
         )
+        try:
+            for hits in pages:
+                yield to_columns(cls, hits, fields)
+        finally:
+            pages.close()
 
     @classmethod
-    def build_result(cls, resp, query=None, es=None, size=None):
+    def build_result(cls, resp, query=None, es=None, size=None,
+                     only=None, exclude=None, deferred=False):
         """
         Takes ES client response having ['hits']['hits']
         and turns it to an generator of Doc objects
@@ -413,6 +903,9 @@ class Document(with_metaclass(ModelMetaclass, BaseDocument)):
         :param query: The query used to build the results
         :param es: Es client
         :param size: size of results
+        :param only: fields fetched by the query (see search)
+        :param exclude: fields not fetched by the query (see search)
+        :param deferred: if True fields not fetched are loaded on access
         :return: ResultSet: a generator of Doc objects
         """
 
@@ -424,36 +917,59 @@ class Document(with_metaclass(ModelMetaclass, BaseDocument)):
             model=cls,
             query=query,
             size=size,
-            es=cls.get_es(es)
+            es=cls.get_es(es),
+            only=only,
+            exclude=exclude,
+            deferred=deferred
         )
 
     @classmethod
-    def save_all(cls, docs, es=None, **kwargs):
+    def save_all(cls, docs, es=None, streaming=False, parallel=None,
+                 **kwargs):
         """
         Save various Doc instances in bulk
 
         >>> docs = (Document(value=value) for value in [1, 2, 3])
         >>> Document.save_all(docs)
 
+        Using streaming=True the docs are consumed lazily, serialized one
+        chunk at a time (by chunk_size and max_chunk_bytes) and per
+        document results are yielded as each chunk is sent, so memory
+        stays flat for any number of documents
+
+        >>> docs = (Document(value=value) for value in range(10 ** 7))
+        >>> for ok, item in Document.save_all(docs, streaming=True):
+        ...     pass
+
+        Using parallel=N documents are serialized and chunks are sent
+        concurrently by N worker threads, the result is the same
+        (success, errors) pair also having per chunk stats
+
+        >>> success, errors = Document.save_all(docs, parallel=4)
+
+        Using max_retries the items rejected by a saturated cluster
+        (status 429) are sent again, only them, waiting an exponential
+        backoff between tries, the permanent failures are reported in
+        the errors of the result
+
+        >>> result = Document.save_all(docs, max_retries=5)
+        >>> result.report()
+        {400: [...]}
+
         :param docs: Iterator of Document instances
         :param es: ES client or None (if implemented a default in Model)
+        :param streaming: If True return a generator of (ok, item)
+        :param parallel: Number of threads sending chunks concurrently
         :param kwargs: Extra params to be passed to streaming_bulk
         :return: ES metadata
         """
-        actions = [
-            {
-                '_op_type': 'index',
-                '_index': cls._index,
-                '_type': cls._doctype,
-                '_id': doc.id,
-                '_source': doc.to_dict()
-            }
-            for doc in docs
-        ]
-        return eh.bulk(cls.get_es(es), actions, **kwargs)
+        build = partial(cls._bulk_action, 'index')
+        return cls._bulk(docs, build, es=es, streaming=streaming,
+                         parallel=parallel, **kwargs)
 
     @classmethod
-    def update_all(cls, docs, es=None, meta=None, **kwargs):
+    def update_all(cls, docs, es=None, meta=None, parallel=None,
+                   streaming=False, doc_as_upsert=False, **kwargs):
         """
         Update various Doc instances in bulk
 
@@ -461,26 +977,78 @@ class Document(with_metaclass(ModelMetaclass, BaseDocument)):
         # change all values to zero
         >>> Document.update_all(docs, value=0)
 
-        :param docs: Iterator of Document instances
+        If no values are given each document loaded from E.S sends only
+        its changed fields (see save_changes)
+
+        >>> for doc in docs:
+        ...     doc.value = doc.value + 1
+        >>> Document.update_all(docs)
+
+        docs can also be (id, body) pairs, body being the values to
+        change of that document or a script with its params. Values given
+        as kwargs are merged into the body of each pair (the values of
+        the pair win), a ValueError is raised if the body is a script.
+        Plain ids require values.
+
+        >>> Document.update_all([
+        ...     (123, {'value': 1}),
+        ...     (456, {'script': 'ctx._source.value += x',
+        ...            'params': {'x': 2}})
+        ... ], doc_as_upsert=True)
+
+        Bulk options (e.g: chunk_size) are passed in meta
+
+        :param docs: Iterator of Document instances, ids or (id, body)
         :param es: ES client or None (if implemented a default in Model)
-        :param meta: Extra values to be passed to client
-        :param kwargs: Extra params to be passed to streaming_bulk
+        :param meta: Extra params to be passed to streaming_bulk
+        :param parallel: Number of threads sending chunks concurrently
+        (see save_all)
+        :param streaming: If True return a generator of (ok, item)
+        (see save_all)
+        :param doc_as_upsert: If True missing documents are created
+        :param kwargs: values to change in all documents
         :return: Es Metadata
         """
-        actions = (
-            {
-                '_op_type': 'update',
-                '_index': cls._index,
-                '_type': cls._doctype,
-                '_id': doc.id,
-                'doc': kwargs
-            }
-            for doc in docs
-        )
-        return eh.bulk(cls.get_es(es), actions, **meta if meta else {})
+        docs, build, tracked = cls._update_actions(docs, kwargs,
+                                                   doc_as_upsert)
+        return cls._bulk(docs, build, es=es, streaming=streaming,
+                         parallel=parallel, tracked=tracked,
+                         **meta if meta else {})
+
+    @classmethod
+    def _update_actions(cls, docs, values, doc_as_upsert=False):
+        """
+        The docs to be updated by update_all and the callable building
+        their bulk actions, documents without changes are skipped if no
+        values are given
+        :param docs: Iterator of Document instances, ids or (id, body)
+        :param values: dict of values to change in all documents
+        :param doc_as_upsert: If True missing documents are created
+        :return: tuple (docs, build, tracked) tracked keeps the documents
+        sending their changes until they are saved (see _bulk_sent)
+        """
+        tracked = None
+        if not values:
+            docs = (
+                doc for doc in docs
+                if not hasattr(doc, '_fields') or doc.dirty_fields
+            )
+            tracked = {}
+
+        def build(doc):
+            action = cls._bulk_action('update', doc, body=values or None,
+                                      doc_as_upsert=doc_as_upsert)
+            if tracked is not None and hasattr(doc, '_fields'):
+                tracked.setdefault(text_type(action['_id']), []).append(
+                    (doc, set(action.get('doc', ())))
+                )
+            return action
+
+        return docs, build, tracked
 
     @classmethod
-    def delete_all(cls, docs, es=None, **kwargs):
+    def delete_all(cls, docs, es=None, streaming=False, parallel=None,
+                   **kwargs):
         """
         Delete various Doc instances in bulk
 
@@ -489,19 +1057,181 @@ class Document(with_metaclass(ModelMetaclass, BaseDocument)):
 
         :param docs: Iterator of Document instances or a list of ids
         :param es: ES client or None (if implemented a default in Model)
+        :param streaming: If True return a generator of (ok, item)
+        (see save_all)
+        :param parallel: Number of threads sending chunks concurrently
+        (see save_all)
         :param kwargs: Extra params to be passed to streaming_bulk
         :return: ES metadata
         """
-        actions = [
-            {
-                '_op_type': 'delete',
-                '_index': cls._index,
-                '_type': cls._doctype,
-                '_id': getattr(doc, 'id', doc),
-            }
-            for doc in docs
-        ]
-        return eh.bulk(cls.get_es(es), actions, **kwargs)
+        build = partial(cls._bulk_action, 'delete')
+        return cls._bulk(docs, build, es=es, streaming=streaming,
+                         parallel=parallel, **kwargs)
+
+    @classmethod
+    def _bulk(cls, docs, build, es=None, streaming=False, parallel=None,
+              tracked=None, **kwargs):
+        """
+        Sends the bulk actions built from docs using the requested mode
+        :param docs: Iterator of Document instances or ids
+        :param build: callable turning a doc in a bulk action
+        :param es: ES client or None (if implemented a default in Model)
+        :param streaming: If True return a generator of (ok, item)
+        :param parallel: Number of threads sending chunks concurrently
+        :param tracked: documents sending their changes by _id
+        (see _update_actions)
+        :param kwargs: Extra params to be passed to the bulk helper
+        :return: ES metadata
+        """
+        es = cls.get_es(es)
+        sent = partial(cls._bulk_sent, tracked)
+        if parallel:
+            return parallel_bulk(es, docs, thread_count=parallel,
+                                 build=build, sent=sent, **kwargs)
+        if streaming:
+            return streaming_bulk(es, (build(doc) for doc in docs),
+                                  sent=sent, **kwargs)
+        if any(option in kwargs for option in BULK_OPTIONS):
+            return bulk(es, (build(doc) for doc in docs), sent=sent,
+                        **kwargs)
+        actions = [build(doc) for doc in docs]
+        ids = [action['_id'] for action in actions]
+        if tracked is not None:
+            return cls._tracked_bulk(es, actions, ids, sent, **kwargs)
+        try:
+            return eh.bulk(es, actions, **kwargs)
+        finally:
+            sent(ids, None)
+
+    @staticmethod
+    def _tracked_bulk(es, actions, ids, sent, stats_only=False, **kwargs):
+        """
+        Same as elasticsearch.helpers.bulk but calling sent with the
+        result of each action, only the actions confirmed by a response
+        are reported as written (a BulkIndexError stops the chunks after
+        the failed one)
+        :param es: ES client
+        :param actions: list of bulk actions
+        :param ids: list of _id of the actions
+        :param sent: callable called with the ids and results
+        (see _bulk_sent)
+        :param stats_only: If True the number of errors is returned
+        instead of the errors
+        :param kwargs: Extra params to be passed to streaming_bulk
+        :return: tuple (success, errors)
+        """
+        success, errors, confirmed = 0, [], set()
+        try:
+            for ok, item in eh.streaming_bulk(es, actions, **kwargs):
+                doc_id = list(item.values())[0].get('_id')
+                confirmed.add(text_type(doc_id))
+                sent([doc_id], [(ok, item)])
+                if ok:
+                    success += 1
+                else:
+                    errors.append(item)
+        finally:
+            sent([doc_id for doc_id in ids
+                  if text_type(doc_id) not in confirmed], None)
+        return success, len(errors) if stats_only else errors
+
+    @classmethod
+    def _bulk_sent(cls, tracked, ids, results):
+        """
+        Called after the request of each chunk sent in bulk, the written
+        ids are invalidated only now so a get made before the writes land
+        can not cache the old documents again, and the changes of the
+        tracked documents written are saved (they are kept if failed)
+        :param tracked: documents sending their changes by _id or None
+        :param ids: list of _id of the chunk
+        :param results: list of (ok, item) or None if the request failed
+        """
+        cls._invalidate(ids)
+        if tracked is None:
+            return
+        if results is None:
+            results = [(False, None)] * len(ids)
+        for doc_id, (ok, _) in zip(ids, results):
+            for doc, fields in tracked.pop(text_type(doc_id), ()):
+                if ok:
+                    doc._changes_saved(fields)
+
+    @classmethod
+    def bulk_writer(cls, es=None, **kwargs):
+        """
+        Returns a BulkWriter bound to this Document class
+
+        >>> with Document.bulk_writer(max_docs=100) as writer:
+        ...     for event in events:
+        ...         writer.save(Document(**event))
+
+        :param es: ES client or None (if implemented a default in Model)
+        :param kwargs: <see BulkWriter parameters>
+        :return: BulkWriter instance
+        """
+        return BulkWriter(cls, es=es, **kwargs)
+
+    @classmethod
+    def _bulk_action(cls, op_type, doc, body=None, doc_as_upsert=False):
+        """
+        Builds a single bulk action for a Document instance
+        :param op_type: index, update or delete
+        :param doc: Document instance, an id (for update and delete)
+        or an (id, body) pair (for update)
+        :param body: values to change (for update) if None the changed
+        fields of doc are sent, required if doc is an id
+        :param doc_as_upsert: If True missing documents are created
+        (for update)
+        :return: dict action
+        """
+        action = {
+            '_op_type': op_type,
+            '_index': cls._index,
+            '_type': cls._doctype,
+        }
+        if op_type == 'delete':
+            action['_id'] = getattr(doc, 'id', doc)
+        elif op_type == 'update':
+            if isinstance(doc, tuple):
+                doc, values = doc
+                body = cls._merge_values(body, values)
+            elif body is None:
+                if not hasattr(doc, '_fields'):
+                    raise ValueError(
+                        'No values to update the document {}'.format(doc)
+                    )
+                body = doc.changes()
+            action['_id'] = getattr(doc, 'id', doc)
+            if 'script' in body or 'doc' in body:
+                action.update(body)
+            else:
+                action['doc'] = body
+            if doc_as_upsert and 'doc' in action:
+                action['doc_as_upsert'] = True
+        else:
+            action['_id'] = doc.id
+            action['_source'] = doc.to_dict()
+        return action
+
+    @staticmethod
+    def _merge_values(values, body):
+        """
+        Body of an (id, body) pair updated by update_all, the values
+        shared by all documents are the defaults of its own values
+        :param values: dict of values to change in all documents or None
+        :param body: values to change of the document, a script or a
+        partial doc
+        :return: dict body
+        """
+        if not values:
+            return body
+        if 'script' in body:
+            raise ValueError('Values can not be merged into a script')
+        merged = dict(values)
+        merged.update(body.get('doc', body))
+        if 'doc' in body:
+            return dict(body, doc=merged)
+        return merged
 
     @classmethod
     def random(cls, size=None):
@@ -538,4 +1268,5 @@ class Document(with_metaclass(ModelMetaclass, BaseDocument)):
         return unicode(self.__str__())
 
     def __str__(self):
-        return "<{0} {1}>".format(self.__class__.__name__, self.to_dict())
+        return "<{0} {1}>".format(self.__class__.__name__,
+                                  self._loaded_dict())
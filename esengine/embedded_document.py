@@ -17,7 +17,7 @@ class EmbeddedDocument(with_metaclass(ModelMetaclass, BaseField)):
             result.update({field_name: field_class.to_dict(value)})
         return result
 
-    def to_dict(self, value):
+    def to_dict(self, value, validate=True):
         if value is not None:
             if self._multi:
                 return [self._to_dict_element(elem) for elem in value]
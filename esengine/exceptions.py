@@ -26,9 +26,26 @@ class StopPagination(Exception):
     pass
 
 
+class UnloadedField(AttributeError):
+
+    def __init__(self, field_name):
+        message = "`{}` was not loaded (see only and exclude)".format(
+            field_name)
+        AttributeError.__init__(self, message)
+
+
 class FieldTypeMismatch(Exception):
 
     def __init__(self, field_name, expected_type, actual_type):
         message = "`{}` expected `{}`, actual `{}`".format(
             field_name, expected_type, actual_type)
         Exception.__init__(self, message)
+
+
+class SearchError(ClientError):
+
+    def __init__(self, error, status=None):
+        self.error = error
+        self.status = status
+        message = "search failed ({}): {}".format(status, error)
+        ClientError.__init__(self, message)
@@ -1,15 +1,15 @@
 # coding: utf-8
 from esengine.bases.py3 import *  # noqa
-from dateutil import parser
 from datetime import datetime
-from six import string_types
 from esengine.bases.field import BaseField
 from esengine.exceptions import ValidationError, FieldTypeMismatch
+from esengine.utils.dates import build_date_parser
 from esengine.utils.validation import FieldValidator
 
 __all__ = [
     'IntegerField', 'LongField', 'StringField', 'FloatField',
-    'DateField', 'BooleanField', 'GeoPointField', 'ArrayField', 'ObjectField'
+    'DateField', 'BooleanField', 'GeoPointField', 'ArrayField', 'ObjectField',
+    'ReferenceField'
 ]
 
 
@@ -282,32 +282,85 @@ class DateField(BaseField):
                 return value.strftime(self._date_format)
             return value.isoformat()
 
+    @property
+    def _date_parser(self):
+        """
+        Parser planned once per field from date_format and the mapping
+        format (see utils.dates.build_date_parser)
+        :return: callable(value) returning a datetime
+        """
+        date_parser = self.__dict__.get('_compiled_date_parser')
+        if date_parser is None:
+            date_parser = self._compiled_date_parser = build_date_parser(
+                self._date_format, self.mapping.get('format')
+            )
+        return date_parser
+
+    def from_dict(self, serialized):
+        # epoch 0 is a date, only None and empty values are missing
+        if serialized is None or serialized == '' or \
+                (self._multi and not serialized):
+            return None
+        date_parser = self._date_parser
+        if self._multi:
+            return [
+                date_parser(elem)
+                for elem in serialized
+                if elem is not None
+            ]
+        return date_parser(serialized)
+
+
+class ReferenceField(BaseField):
+    """
+    Holds the _id (or a list of _id if multi=True) of documents of
+    another Document class, stored in E.S as not analyzed strings
+
+    >>> class Book(Document):
+    ...     author = ReferenceField(Author)
+    ...     tags = ReferenceField(Tag, multi=True)
+
+    Values are the ids as read from E.S until resolved, instances of
+    the referenced class can also be assigned.
+    ResultSet.prefetch('author', 'tags') resolves the references of all
+    the documents with one multi get per referenced class, replacing
+    the ids by the referenced instances (ids not found are kept)
+    """
+    _type = unicode
+    _default_mapping = {'type': 'string', 'index': 'not_analyzed'}
+
+    def __init__(self, document_class, *args, **kwargs):
+        self._document = document_class
+        super(ReferenceField, self).__init__(*args, **kwargs)
+
+    def _to_id(self, value):
+        if isinstance(value, self._document):
+            return value.id
+        return value
+
+    def validate_field_type(self, value):
+        if not isinstance(value, self._document):
+            super(ReferenceField, self).validate_field_type(value)
+
+    def to_dict(self, value, validate=True):
+        """
+        Referenced instances are saved as its ids
+        """
+        if validate:
+            self.validate(value)
+        if self._multi:
+            return [self._to_id(x) for x in value] if value else value
+        return self._to_id(value)
+
     def from_dict(self, serialized):
-        if serialized:
+        if serialized is not None:
             if self._multi:
-                values = []
-                for elem in serialized:
-                    if elem is None:
-                        continue
-                    if isinstance(elem, self._type):
-                        values.append(elem)
-                    elif isinstance(elem, string_types):
-                        date = parser.parse(elem)
-                        values.append(date)
-                    else:
-                        raise ValueError(
-                            'Expected str or date. {} found'.format(
-                                elem.__class__
-                            )
-                        )
-                return values
-            else:
-                if serialized is None:
-                    return None
-                if isinstance(serialized, self._type):
-                    return serialized
-                elif isinstance(serialized, string_types):
-                    return parser.parse(serialized)
-                raise ValueError('Expected str or date. {} found'.format(
-                    serialized.__class__)
-                )
+                return [
+                    x if x is None or isinstance(x, self._document)
+                    else unicode(x)
+                    for x in serialized
+                ]
+            if isinstance(serialized, self._document):
+                return serialized
+            return unicode(serialized)
+        return self._default
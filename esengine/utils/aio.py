@@ -0,0 +1,173 @@
+# coding: utf-8
+"""
+asyncio counterparts of the transport helpers (python >= 3.6), used by
+the async methods of Document and ResultSet (see bases/aio.py)
+"""
+import asyncio
+
+from elasticsearch.exceptions import TransportError
+
+from esengine.utils.bulk import BulkResult, DEFAULT_CHUNK_SIZE
+from esengine.utils.bulk import DEFAULT_MAX_CHUNK_BYTES
+from esengine.utils.bulk import DEFAULT_INITIAL_BACKOFF, DEFAULT_MAX_BACKOFF
+from esengine.utils.bulk import chunk_actions, chunk_body, chunk_results
+from esengine.utils.bulk import get_serializer, notify_sent
+from esengine.utils.bulk import backoff, is_rejected, _adaptive, _observe
+
+
+async def async_scroll_pages(es, index=None, doc_type=None, body=None,
+                             page_size=100, scroll='5m', prefetch=True,
+                             preserve_order=False, **kwargs):
+    """
+    Async version of utils.scan.scroll_pages, while a page is being
+    consumed the next one is fetched by a task (if prefetch), the scroll
+    context is cleared when the iteration ends or the generator is closed
+
+    >>> async for hits in async_scroll_pages(es, 'index', 'doc_type', q):
+    ...     process(hits)
+
+    :param es: async ES client
+    :param kwargs: <see scroll_pages parameters>
+    :return: async generator of lists of hits
+    """
+    if not preserve_order:
+        kwargs['search_type'] = 'scan'
+    resp = await es.search(index=index, doc_type=doc_type, body=body,
+                           size=page_size, scroll=scroll, **kwargs)
+    scroll_id = resp.get('_scroll_id')
+    pending = None
+
+    def fetch(scroll_id):
+        return asyncio.ensure_future(
+            es.scroll(scroll_id=scroll_id, scroll=scroll)
+        )
+
+    try:
+        hits = resp.get('hits', {}).get('hits', [])
+        if hits:
+            yield hits
+        while scroll_id is not None:
+            if pending is None:
+                pending = fetch(scroll_id)
+            resp, pending = await pending, None
+            scroll_id = resp.get('_scroll_id', scroll_id)
+            hits = resp.get('hits', {}).get('hits', [])
+            if not hits:
+                break
+            if prefetch:
+                pending = fetch(scroll_id)
+            yield hits
+    finally:
+        if pending is not None:
+            try:
+                scroll_id = (await pending).get('_scroll_id', scroll_id)
+            except Exception:
+                pass
+        if scroll_id is not None:
+            try:
+                await es.clear_scroll(scroll_id=scroll_id)
+            except TransportError:
+                pass
+
+
+async def async_process_chunk(es, chunk, **kwargs):
+    """
+    Async version of utils.bulk.process_chunk
+    :param es: async ES client
+    :param chunk: list of (action_line, data_line)
+    :param kwargs: extra params passed to es.bulk
+    :return: tuple (results, stats)
+    """
+    body = chunk_body(chunk)
+    loop = asyncio.get_event_loop()
+    start = loop.time()
+    resp = await es.bulk(body, **kwargs)
+    stats = {
+        'count': len(chunk),
+        'bytes': len(body),
+        'took': resp.get('took'),
+        'latency': loop.time() - start
+    }
+    return chunk_results(resp), stats
+
+
+async def async_send_chunk(es, chunk, max_retries=0,
+                           initial_backoff=DEFAULT_INITIAL_BACKOFF,
+                           max_backoff=DEFAULT_MAX_BACKOFF, **kwargs):
+    """
+    Async version of utils.bulk.send_chunk, the backoff between retries
+    is awaited instead of blocking the event loop
+    :param es: async ES client
+    :param kwargs: <see send_chunk parameters>
+    :return: tuple (results, stats, retried)
+    """
+    results = [None] * len(chunk)
+    pending = list(range(len(chunk)))
+    all_stats, retried, attempt = [], 0, 0
+    while True:
+        try:
+            sent, stats = await async_process_chunk(
+                es, [chunk[i] for i in pending], **kwargs
+            )
+            all_stats.append(stats)
+        except TransportError as e:
+            if e.status_code != 429 or attempt >= max_retries:
+                raise
+            sent = None
+
+        if sent is None:
+            retry = pending
+        else:
+            retry = []
+            for i, (ok, item) in zip(pending, sent):
+                if not ok and attempt < max_retries and is_rejected(item):
+                    retry.append(i)
+                else:
+                    results[i] = (ok, item)
+
+        if not retry:
+            return results, all_stats, retried
+        await asyncio.sleep(backoff(attempt, initial_backoff, max_backoff))
+        retried += len(retry)
+        attempt += 1
+        pending = retry
+
+
+async def async_bulk(es, actions, chunk_size=DEFAULT_CHUNK_SIZE,
+                     max_chunk_bytes=DEFAULT_MAX_CHUNK_BYTES,
+                     target_latency=None, sent=None, **kwargs):
+    """
+    Async version of utils.bulk.bulk, actions are consumed lazily and
+    sent in chunks (by chunk_size and max_chunk_bytes) one at a time,
+    errors are reported in the result instead of raised
+
+    >>> success, errors = await async_bulk(es, actions, chunk_size=1000)
+
+    Rejected items are retried (max_retries) and the chunk limits adjusted
+    (target_latency) as in utils.bulk.streaming_bulk
+
+    :param es: async ES client
+    :param actions: iterable (preferably a generator) of bulk actions
+    :param chunk_size: max number of actions sent in one request
+    :param max_chunk_bytes: max size in bytes of one request
+    :param target_latency: seconds each request should take
+    :param sent: callable called after the request of each chunk
+    (see utils.bulk.streaming_bulk)
+    :param kwargs: <see send_chunk parameters>
+    :return: BulkResult
+    """
+    result = BulkResult()
+    serializer = get_serializer(es)
+    adaptive = _adaptive(chunk_size, max_chunk_bytes, target_latency)
+    for chunk in chunk_actions(actions, serializer, chunk_size,
+                               max_chunk_bytes, adaptive=adaptive):
+        try:
+            results, stats, retried = await async_send_chunk(es, chunk,
+                                                             **kwargs)
+        except Exception:
+            notify_sent(sent, chunk, None)
+            raise
+        notify_sent(sent, chunk, results)
+        _observe(adaptive, stats)
+        result.add(results, stats, retried)
+    return result
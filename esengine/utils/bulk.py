@@ -0,0 +1,758 @@
+# coding: utf-8
+import json
+import time
+import random
+import threading
+from itertools import islice
+
+import elasticsearch.helpers as eh
+from elasticsearch.exceptions import TransportError
+from elasticsearch.serializer import JSONSerializer
+from six.moves import queue
+
+DEFAULT_CHUNK_SIZE = 500
+DEFAULT_MAX_CHUNK_BYTES = 100 * 1024 * 1024
+DEFAULT_INITIAL_BACKOFF = 2
+DEFAULT_MAX_BACKOFF = 600
+
+# options handled only by esengine bulk (not by elasticsearch.helpers)
+BULK_OPTIONS = ('max_retries', 'initial_backoff', 'max_backoff',
+                'target_latency')
+
+
+def get_serializer(es):
+    """
+    The serializer used by the client transport, or a plain JSON one
+    for clients without a transport (mocks, custom clients)
+    :param es: ES client
+    :return: object having a dumps method
+    """
+    transport = getattr(es, 'transport', None)
+    return getattr(transport, 'serializer', None) or JSONSerializer()
+
+
+class AdaptiveChunking(object):
+    """
+    Chunk limits (number of actions and bytes) adjusted after each bulk
+    request to keep its latency close to target_latency: limits grow
+    when requests are faster than the target and shrink when slower.
+    The latency of a request is the greater between its wall time and
+    the time E.S took to process it.
+
+    A chunk smaller than the limits (the last one of the actions or of a
+    group of parallel_bulk) only shrinks the current limits if it was
+    slow, its count is not used to set them.
+
+    >>> adaptive = AdaptiveChunking(target_latency=0.5)
+    >>> adaptive.observe({'count': 500, 'bytes': 10 ** 6,
+    ...                   'took': 125, 'latency': 0.25})
+    >>> adaptive.chunk_size, adaptive.max_chunk_bytes
+    (707, 1414213)
+    """
+
+    # max factor applied to limits after a single observation
+    max_step = 2.0
+
+    def __init__(self, target_latency=1.0, chunk_size=DEFAULT_CHUNK_SIZE,
+                 max_chunk_bytes=DEFAULT_MAX_CHUNK_BYTES,
+                 min_chunk_size=10, max_chunk_size=50000,
+                 min_chunk_bytes=64 * 1024):
+        self.target_latency = float(target_latency)
+        self.chunk_size = chunk_size
+        self.max_chunk_bytes = max_chunk_bytes
+        self.min_chunk_size = min_chunk_size
+        self.max_chunk_size = max_chunk_size
+        self.min_chunk_bytes = min_chunk_bytes
+        self.upper_chunk_bytes = max_chunk_bytes
+        self._lock = threading.Lock()
+
+    def observe(self, stats):
+        """
+        Adjust the limits using the stats of a request
+        :param stats: dict having count, bytes, took and latency
+        (see process_chunk)
+        """
+        latency = max(stats['latency'], (stats.get('took') or 0) / 1000.0)
+        if latency <= 0:
+            return
+        # square root damps the oscillation caused by noisy latencies
+        factor = (self.target_latency / latency) ** 0.5
+        factor = max(1 / self.max_step, min(self.max_step, factor))
+        count, size = stats['count'], stats['bytes']
+        with self._lock:
+            # closed by a limit: one more action of the average size
+            # would not fit in the chunk
+            if count < self.chunk_size and \
+                    size + size / count <= self.max_chunk_bytes:
+                if factor >= 1:
+                    return
+                count, size = self.chunk_size, self.max_chunk_bytes
+            self.chunk_size = int(max(
+                self.min_chunk_size,
+                min(self.max_chunk_size, count * factor)
+            ))
+            self.max_chunk_bytes = int(max(
+                self.min_chunk_bytes,
+                min(self.upper_chunk_bytes, size * factor)
+            ))
+
+
+def chunk_actions(actions, serializer, chunk_size=DEFAULT_CHUNK_SIZE,
+                  max_chunk_bytes=DEFAULT_MAX_CHUNK_BYTES, adaptive=None):
+    """
+    Consumes actions lazily and yields chunks of serialized
+    (action_line, data_line) pairs, a chunk is closed when it reaches
+    chunk_size actions or max_chunk_bytes serialized bytes.
+    Only one chunk is held in memory at a time.
+
+    :param actions: iterable of bulk actions (dicts)
+    :param serializer: object having a dumps method
+    :param chunk_size: max number of actions in a chunk
+    :param max_chunk_bytes: max size of a chunk in bytes
+    :param adaptive: AdaptiveChunking instance, if given its current
+    limits are used instead of chunk_size and max_chunk_bytes
+    :return: generator of lists of (action_line, data_line)
+    """
+    chunk, size = [], 0
+    for action in actions:
+        if adaptive is not None:
+            chunk_size = adaptive.chunk_size
+            max_chunk_bytes = adaptive.max_chunk_bytes
+
+        action, data = eh.expand_action(action)
+        action = serializer.dumps(action)
+        current_size = len(action) + 1
+        if data is not None:
+            data = serializer.dumps(data)
+            current_size += len(data) + 1
+
+        if chunk and size + current_size > max_chunk_bytes:
+            yield chunk
+            chunk, size = [], 0
+
+        chunk.append((action, data))
+        size += current_size
+
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk, size = [], 0
+
+    if chunk:
+        yield chunk
+
+
+def chunk_body(chunk):
+    """
+    Joins a chunk of (action_line, data_line) into a bulk request body
+    :param chunk: list of (action_line, data_line)
+    :return: string
+    """
+    lines = []
+    for action, data in chunk:
+        lines.append(action)
+        if data is not None:
+            lines.append(data)
+    return '\n'.join(lines) + '\n'
+
+
+def chunk_ids(chunk):
+    """
+    The _id of each action of a chunk, read from its action lines
+    :param chunk: list of (action_line, data_line)
+    :return: list of _id (None for actions without _id)
+    """
+    return [
+        list(json.loads(action).values())[0].get('_id')
+        for action, _ in chunk
+    ]
+
+
+def notify_sent(sent, chunk, results):
+    """
+    Calls sent(ids, results) after the request of a chunk
+    :param sent: callable or None
+    :param chunk: list of (action_line, data_line)
+    :param results: list of (ok, item) or None if the request failed
+    """
+    if sent is not None:
+        sent(chunk_ids(chunk), results)
+
+
+def process_chunk(es, chunk, **kwargs):
+    """
+    Sends a chunk to the bulk API
+    :param es: ES client
+    :param chunk: list of (action_line, data_line)
+    :param kwargs: extra params passed to es.bulk
+    :return: tuple (results, stats) results is a list of
+    (ok, {op_type: item}) in the same order of chunk and stats is a dict
+    having count, bytes, took (ES time in ms) and latency (wall time in s)
+    """
+    body = chunk_body(chunk)
+    start = time.time()
+    resp = es.bulk(body, **kwargs)
+    stats = {
+        'count': len(chunk),
+        'bytes': len(body),
+        'took': resp.get('took'),
+        'latency': time.time() - start
+    }
+    return chunk_results(resp), stats
+
+
+def chunk_results(resp):
+    """
+    Per action results of a bulk response
+    :param resp: ES bulk response
+    :return: list of (ok, {op_type: item}) in the same order of the actions
+    """
+    results = []
+    for item in resp['items']:
+        op_type, item = item.copy().popitem()
+        ok = 200 <= item.get('status', 500) < 300
+        results.append((ok, {op_type: item}))
+    return results
+
+
+def is_rejected(item):
+    """
+    Tell if a failed bulk item was rejected because the cluster bulk
+    queue is full, those items can be sent again later
+    :param item: {op_type: item} as returned by process_chunk
+    :return: True or False
+    """
+    item = list(item.values())[0]
+    return (item.get('status') == 429 or
+            'EsRejectedExecution' in str(item.get('error', '')))
+
+
+def backoff(attempt, initial_backoff=DEFAULT_INITIAL_BACKOFF,
+            max_backoff=DEFAULT_MAX_BACKOFF):
+    """
+    Exponential backoff with jitter: a random time between half and
+    the whole of initial_backoff * 2 ** attempt, limited to max_backoff
+    :param attempt: number of the retry starting from 0
+    :param initial_backoff: seconds to wait before the first retry
+    :param max_backoff: max seconds to wait
+    :return: seconds to wait
+    """
+    delay = min(max_backoff, initial_backoff * 2 ** attempt)
+    return delay / 2.0 + random.uniform(0, delay / 2.0)
+
+
+def send_chunk(es, chunk, max_retries=0,
+               initial_backoff=DEFAULT_INITIAL_BACKOFF,
+               max_backoff=DEFAULT_MAX_BACKOFF, **kwargs):
+    """
+    Sends a chunk to the bulk API, rejected items (status 429) are sent
+    again (only them) up to max_retries times waiting an exponential
+    backoff between the tries, other errors are returned as they are
+    :param es: ES client
+    :param chunk: list of (action_line, data_line)
+    :param max_retries: max number of times rejected items are retried
+    :param initial_backoff: seconds to wait before the first retry
+    :param max_backoff: max seconds to wait between retries
+    :param kwargs: extra params passed to es.bulk
+    :return: tuple (results, stats, retried) results as in process_chunk,
+    a list of stats of each request sent and the number of items retried
+    """
+    results = [None] * len(chunk)
+    pending = list(range(len(chunk)))
+    all_stats, retried, attempt = [], 0, 0
+    while True:
+        try:
+            sent, stats = process_chunk(
+                es, [chunk[i] for i in pending], **kwargs
+            )
+            all_stats.append(stats)
+        except TransportError as e:
+            if e.status_code != 429 or attempt >= max_retries:
+                raise
+            sent = None
+
+        if sent is None:
+            retry = pending
+        else:
+            retry = []
+            for i, (ok, item) in zip(pending, sent):
+                if not ok and attempt < max_retries and is_rejected(item):
+                    retry.append(i)
+                else:
+                    results[i] = (ok, item)
+
+        if not retry:
+            return results, all_stats, retried
+        time.sleep(backoff(attempt, initial_backoff, max_backoff))
+        retried += len(retry)
+        attempt += 1
+        pending = retry
+
+
+class BulkResult(object):
+    """
+    Behaves as the (success, errors) pair returned by
+    elasticsearch.helpers.bulk also carrying the stats of each chunk sent
+    (see process_chunk) and the number of items retried after being
+    rejected. errors are the items which failed permanently.
+
+    >>> success, errors = Document.save_all(docs, parallel=4)
+    """
+
+    def __init__(self, success=0, errors=None, chunks=None, retried=0):
+        self.success = success
+        self.errors = errors or []
+        self.chunks = chunks or []
+        self.retried = retried
+
+    def __iter__(self):
+        return iter((self.success, self.errors))
+
+    def __getitem__(self, item):
+        return tuple(self)[item]
+
+    def __len__(self):
+        return 2
+
+    def __eq__(self, other):
+        return tuple(self) == tuple(other)
+
+    def __ne__(self, other):
+        return not self == other
+
+    __hash__ = None
+
+    def __repr__(self):
+        return '<BulkResult success={} errors={}>'.format(
+            self.success, self.errors
+        )
+
+    @property
+    def failed(self):
+        return len(self.errors)
+
+    def add(self, results, chunks=None, retried=0):
+        """
+        Adds the results of a chunk
+        :param results: list of (ok, item)
+        :param chunks: list of chunk stats
+        :param retried: number of items retried
+        :return: self
+        """
+        for ok, item in results:
+            if ok:
+                self.success += 1
+            else:
+                self.errors.append(item)
+        self.chunks.extend(chunks or [])
+        self.retried += retried
+        return self
+
+    def report(self):
+        """
+        Summary of the permanent failures grouped by status
+        :return: dict {status: [{op_type: item}, ...]}
+        """
+        report = {}
+        for error in self.errors:
+            item = list(error.values())[0]
+            report.setdefault(item.get('status'), []).append(error)
+        return report
+
+
+def _adaptive(chunk_size, max_chunk_bytes, target_latency):
+    if target_latency:
+        return AdaptiveChunking(target_latency, chunk_size, max_chunk_bytes)
+
+
+def _observe(adaptive, stats):
+    if adaptive is not None:
+        for request_stats in stats:
+            adaptive.observe(request_stats)
+            request_stats['chunk_size'] = adaptive.chunk_size
+            request_stats['max_chunk_bytes'] = adaptive.max_chunk_bytes
+
+
+def _send_chunks(es, actions, chunk_size=DEFAULT_CHUNK_SIZE,
+                 max_chunk_bytes=DEFAULT_MAX_CHUNK_BYTES,
+                 target_latency=None, sent=None, **kwargs):
+    serializer = get_serializer(es)
+    adaptive = _adaptive(chunk_size, max_chunk_bytes, target_latency)
+    for chunk in chunk_actions(actions, serializer, chunk_size,
+                               max_chunk_bytes, adaptive=adaptive):
+        try:
+            results, stats, retried = send_chunk(es, chunk, **kwargs)
+        except Exception:
+            notify_sent(sent, chunk, None)
+            raise
+        notify_sent(sent, chunk, results)
+        _observe(adaptive, stats)
+        yield results, stats, retried
+
+
+def streaming_bulk(es, actions, raise_on_error=True, **kwargs):
+    """
+    Bounded memory bulk: consumes actions lazily, chunking them by number
+    and by serialized size, and yields per action results as each chunk
+    is sent.
+
+    >>> for ok, item in streaming_bulk(es, actions, chunk_size=1000):
+    ...     if not ok:
+    ...         log(item)
+
+    Using max_retries items rejected by a saturated cluster are sent
+    again (only them) waiting an exponential backoff (see send_chunk)
+
+    Using target_latency the chunk limits are adjusted after each request
+    to keep its latency close to the target (see AdaptiveChunking),
+    chunk_size and max_chunk_bytes are the initial limits
+
+    :param es: ES client
+    :param actions: iterable (preferably a generator) of bulk actions
+    :param raise_on_error: raise BulkIndexError if a chunk has errors
+    :param chunk_size: max number of actions sent in one request
+    :param max_chunk_bytes: max size in bytes of one request
+    :param target_latency: seconds each request should take
+    :param max_retries: max number of times rejected items are retried
+    :param initial_backoff: seconds to wait before the first retry
+    :param max_backoff: max seconds to wait between retries
+    :param sent: callable called after the request of each chunk with
+    the ids of its actions and its results (None if the request failed)
+    :param kwargs: extra params passed to es.bulk
+    :return: generator of (ok, {op_type: item})
+    """
+    for results, _, _ in _send_chunks(es, actions, **kwargs):
+        errors = []
+        for ok, item in results:
+            if not ok and raise_on_error:
+                errors.append(item)
+            yield ok, item
+        if errors:
+            raise eh.BulkIndexError(
+                '%i document(s) failed to index.' % len(errors), errors
+            )
+
+
+def bulk(es, actions, raise_on_error=False, stats_only=False, **kwargs):
+    """
+    Same as streaming_bulk but consuming all the results and returning
+    a BulkResult, errors are reported instead of raised unless
+    raise_on_error (unlike elasticsearch.helpers.bulk)
+    :param es: ES client
+    :param actions: iterable (preferably a generator) of bulk actions
+    :param raise_on_error: raise BulkIndexError after the first chunk
+    having errors (the next chunks are not sent)
+    :param stats_only: If True return the (success, failed) numbers
+    :param kwargs: <see streaming_bulk parameters>
+    :return: BulkResult or (success, failed) if stats_only
+    """
+    result = BulkResult()
+    for results, stats, retried in _send_chunks(es, actions, **kwargs):
+        result.add(results, stats, retried)
+        if raise_on_error and result.errors:
+            raise eh.BulkIndexError(
+                '%i document(s) failed to index.' % len(result.errors),
+                result.errors
+            )
+    if stats_only:
+        return result.success, result.failed
+    return result
+
+
+def parallel_bulk(es, items, thread_count=4, build=None,
+                  chunk_size=DEFAULT_CHUNK_SIZE,
+                  max_chunk_bytes=DEFAULT_MAX_CHUNK_BYTES,
+                  target_latency=None, sent=None, raise_on_error=False,
+                  stats_only=False, **kwargs):
+    """
+    Sends bulk chunks concurrently from a pool of worker threads.
+    Items are consumed lazily in groups of chunk_size, each worker
+    builds (using build callable) and serializes its own group so
+    serialization also runs in parallel, only a few groups are held in
+    memory at a time.
+
+    >>> parallel_bulk(es, docs, thread_count=8,
+    ...               build=lambda doc: {'_id': doc.id, ...})
+
+    :param es: ES client
+    :param items: iterable of bulk actions or items to be built
+    :param thread_count: number of worker threads
+    :param build: callable turning an item in a bulk action
+    :param chunk_size: max number of actions sent in one request
+    :param max_chunk_bytes: max size in bytes of one request
+    :param target_latency: seconds each request should take
+    (see streaming_bulk)
+    :param sent: callable called after the request of each chunk
+    (see streaming_bulk)
+    :param raise_on_error: raise BulkIndexError after the first chunk
+    having errors (no more chunks are sent)
+    :param stats_only: If True return the (success, failed) numbers
+    :param kwargs: <see send_chunk parameters>
+    :return: BulkResult or (success, failed) if stats_only
+    """
+    serializer = get_serializer(es)
+    adaptive = _adaptive(chunk_size, max_chunk_bytes, target_latency)
+    tasks = queue.Queue(maxsize=thread_count)
+    lock = threading.Lock()
+    report = {'result': BulkResult(), 'exception': None}
+
+    def work():
+        while True:
+            group = tasks.get()
+            if group is None:
+                return
+            if report['exception'] is not None:
+                continue
+            try:
+                actions = map(build, group) if build else group
+                for chunk in chunk_actions(actions, serializer, chunk_size,
+                                           max_chunk_bytes, adaptive):
+                    try:
+                        done = send_chunk(es, chunk, **kwargs)
+                    except Exception:
+                        notify_sent(sent, chunk, None)
+                        raise
+                    notify_sent(sent, chunk, done[0])
+                    _observe(adaptive, done[1])
+                    with lock:
+                        report['result'].add(*done)
+                    errors = [item for ok, item in done[0] if not ok]
+                    if raise_on_error and errors:
+                        raise eh.BulkIndexError(
+                            '%i document(s) failed to index.' % len(errors),
+                            errors
+                        )
+            except Exception as e:
+                report['exception'] = e
+
+    workers = [threading.Thread(target=work) for _ in range(thread_count)]
+    for worker in workers:
+        worker.daemon = True
+        worker.start()
+
+    items = iter(items)
+    try:
+        while report['exception'] is None:
+            if adaptive is not None:
+                chunk_size = adaptive.chunk_size
+            group = list(islice(items, chunk_size))
+            if not group:
+                break
+            tasks.put(group)
+    finally:
+        for _ in workers:
+            tasks.put(None)
+        for worker in workers:
+            worker.join()
+
+    if report['exception'] is not None:
+        raise report['exception']
+
+    result = report['result']
+    if stats_only:
+        return result.success, result.failed
+    return result
+
+
+class BulkWriter(object):
+    """
+    Buffers index, update and delete operations of Document instances and
+    sends them as bulk requests, the buffer is flushed when it reaches
+    max_docs operations or max_bytes serialized bytes, after max_latency
+    seconds from the first buffered operation, when flush() is called
+    or when leaving the context manager.
+
+    >>> with BulkWriter(Person, Company, max_latency=0.5) as writer:
+    ...     writer.save(Person(name='Gonzo'))
+    ...     writer.update(company, active=True)
+    ...     writer.delete(person_id, model=Person)
+    >>> writer.result
+    (3, [])
+
+    The writer is thread safe and can be shared by request handlers,
+    operations are buffered while a flush is being sent and the flushes
+    are sent one at a time (in the order of the operations).
+
+    If a flush fails its operations are put back in the buffer (to be
+    sent by the next flush) and the exception is raised, by the flush or,
+    if it was sent by the max_latency timer, by the next call to save,
+    update, delete, flush or leaving the context manager.
+    """
+
+    def __init__(self, *models, **kwargs):
+        """
+        :param models: Document classes accepted by this writer
+        :param es: ES client (default the client of the first model)
+        :param max_docs: max number of buffered operations
+        :param max_bytes: max size in bytes of buffered operations
+        :param max_latency: max seconds an operation stays buffered
+        :param kwargs: <see send_chunk parameters>
+        """
+        if not models:
+            raise ValueError('At least one Document class is required')
+        self._models = models
+        self._es = models[0].get_es(kwargs.pop('es', None))
+        self._max_docs = kwargs.pop('max_docs', DEFAULT_CHUNK_SIZE)
+        self._max_bytes = kwargs.pop('max_bytes', 10 * 1024 * 1024)
+        self._max_latency = kwargs.pop('max_latency', None)
+        self._bulk_kwargs = kwargs
+        self._serializer = get_serializer(self._es)
+        self._lock = threading.Lock()
+        self._send_lock = threading.Lock()
+        self._buffer = []
+        # (model, _id, changes) of each buffered operation: the id is
+        # invalidated in the caches of the model once sent and the
+        # changes, (doc, fields) of an update sending the changed fields
+        # of doc, are saved if written
+        self._written = []
+        self._buffer_bytes = 0
+        self._timer = None
+        self._exception = None
+        self.result = BulkResult()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.flush()
+
+    def __len__(self):
+        return len(self._buffer)
+
+    def _model_for(self, doc, model):
+        if model is None:
+            if hasattr(doc, '_fields'):
+                model = doc.__class__
+            elif len(self._models) == 1:
+                model = self._models[0]
+        if model not in self._models:
+            raise ValueError('{} is not bound to this writer'.format(model))
+        return model
+
+    def _add(self, op_type, doc, model=None, body=None):
+        model = self._model_for(doc, model)
+        if op_type == 'update':
+            action = model._bulk_action(op_type, doc, body=body)
+        else:
+            action = model._bulk_action(op_type, doc)
+        doc_id = action['_id']
+        changes = None
+        if op_type == 'update' and body is None and hasattr(doc, '_fields'):
+            changes = (doc, set(action.get('doc', ())))
+
+        action, data = eh.expand_action(action)
+        action = self._serializer.dumps(action)
+        size = len(action) + 1
+        if data is not None:
+            data = self._serializer.dumps(data)
+            size += len(data) + 1
+
+        with self._lock:
+            self._raise_pending_exception()
+            overflow = self._buffer and \
+                self._buffer_bytes + size > self._max_bytes
+        if overflow:
+            self.flush()
+        with self._lock:
+            self._buffer.append((action, data))
+            self._written.append((model, doc_id, changes))
+            self._buffer_bytes += size
+            full = len(self._buffer) >= self._max_docs
+            if not full and self._max_latency and self._timer is None:
+                self._timer = threading.Timer(
+                    self._max_latency, self._flush_on_timer
+                )
+                self._timer.daemon = True
+                self._timer.start()
+        if full:
+            self.flush()
+
+    def save(self, doc):
+        """
+        Buffers the indexing of a Document instance
+        :param doc: Document instance
+        """
+        self._add('index', doc)
+
+    def update(self, doc, body=None, model=None, **kwargs):
+        """
+        Buffers a partial update of a document
+        :param doc: Document instance or an id (model is required if
+        the writer is bound to more than one Document class)
+        :param body: Optional values passed as dict, if no values are
+        given the changed fields of doc are sent
+        :param model: Document class of doc if it is an id
+        :param kwargs: values to change
+        """
+        body = dict(body or {}, **kwargs) or None
+        self._add('update', doc, model=model, body=body)
+
+    def delete(self, doc, model=None):
+        """
+        Buffers the deletion of a document
+        :param doc: Document instance or an id (model is required if
+        the writer is bound to more than one Document class)
+        :param model: Document class of doc if it is an id
+        """
+        self._add('delete', doc, model=model)
+
+    @staticmethod
+    def _sent(written, results):
+        """
+        Invalidates the sent ids in the caches of their models and saves
+        the changes of the documents written
+        :param written: list of (model, _id, changes)
+        :param results: list of (ok, item) or None if the request failed
+        """
+        ids = {}
+        for model, doc_id, _ in written:
+            ids.setdefault(model, []).append(doc_id)
+        for model, model_ids in ids.items():
+            model._invalidate(model_ids)
+        for (_, _, changes), (ok, _) in zip(written, results or ()):
+            if ok and changes is not None:
+                doc, fields = changes
+                doc._changes_saved(fields)
+
+    def _flush_on_timer(self):
+        try:
+            self.flush()
+        except Exception as e:
+            self._exception = e
+
+    def _raise_pending_exception(self):
+        if self._exception is not None:
+            exception, self._exception = self._exception, None
+            raise exception
+
+    def flush(self):
+        """
+        Sends all buffered operations in a single bulk request, the
+        buffer is taken under the lock and sent outside it
+        :return: BulkResult of this flush
+        """
+        with self._send_lock:
+            with self._lock:
+                if self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+                self._raise_pending_exception()
+                chunk, self._buffer = self._buffer, []
+                written, self._written = self._written, []
+                size, self._buffer_bytes = self._buffer_bytes, 0
+            if not chunk:
+                return BulkResult()
+            try:
+                results, stats, retried = send_chunk(
+                    self._es, chunk, **self._bulk_kwargs
+                )
+            except Exception:
+                self._sent(written, None)
+                with self._lock:
+                    self._buffer[:0] = chunk
+                    self._written[:0] = written
+                    self._buffer_bytes += size
+                raise
+            self._sent(written, results)
+            with self._lock:
+                self.result.add(results, stats, retried)
+            return BulkResult().add(results, stats, retried)
@@ -0,0 +1,254 @@
+# coding: utf-8
+import hashlib
+import json
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+
+class CacheBackend(object):
+    """
+    Interface of the stores used by DocumentCache, keys are strings and
+    values the raw E.S responses (JSON serializable dicts) so a backend
+    can keep them out of the process (e.g: a local disk or a shared
+    memory store used by all the worker processes)
+    """
+
+    def get(self, key):
+        """
+        :param key: string
+        :return: the stored value or None if missing or expired
+        """
+        raise NotImplementedError
+
+    def set(self, key, value):
+        """
+        :param key: string
+        :param value: dict
+        """
+        raise NotImplementedError
+
+    def delete(self, key):
+        """
+        :param key: string, missing keys are ignored
+        """
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+
+class LRUBackend(CacheBackend):
+    """
+    In process thread safe store keeping the max_size most recently used
+    values, each one for ttl seconds (or until evicted if ttl is None).
+    Values are kept serialized as JSON so each get returns its own copy,
+    changing a returned value does not change the stored one.
+    """
+
+    def __init__(self, max_size=1000, ttl=None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.pop(key, None)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires is not None and expires < time.time():
+                return None
+            # re inserted as the most recently used
+            self._data[key] = entry
+        return json.loads(value)
+
+    def set(self, key, value):
+        expires = time.time() + self.ttl if self.ttl else None
+        value = json.dumps(value)
+        with self._lock:
+            self._data.pop(key, None)
+            self._data[key] = (expires, value)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+def fingerprint(*values):
+    """
+    Canonical fingerprint of JSON like values, independent of the order
+    of the keys of the dicts
+    :param values: dicts, lists, strings, numbers...
+    :return: hex digest string
+    """
+    canonical = json.dumps(values, sort_keys=True, separators=(',', ':'),
+                           default=repr)
+    return hashlib.sha1(canonical.encode('utf-8')).hexdigest()
+
+
+class BaseCache(object):
+    """
+    Backend and hit/miss statistics of the caches of Document classes
+    :param max_size: max number of responses of the default LRU backend
+    :param ttl: seconds a response is kept by the default LRU backend
+    :param backend: CacheBackend instance (default LRUBackend)
+    """
+
+    def __init__(self, max_size=1000, ttl=60, backend=None):
+        if backend is None:
+            backend = LRUBackend(max_size=max_size, ttl=ttl)
+        self.backend = backend
+        self.hits = self.misses = self.invalidations = 0
+        self._lock = threading.Lock()
+
+    def _count(self, name):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def _lookup(self, key):
+        resp = self.backend.get(key)
+        self._count('misses' if resp is None else 'hits')
+        return resp
+
+    def _store(self, key, resp):
+        if not resp.get('timed_out'):
+            self.backend.set(key, resp)
+
+    def _read_through(self, key, fetch):
+        resp = self._lookup(key)
+        if resp is None:
+            resp = fetch()
+            self._store(key, resp)
+        return resp
+
+    def clear(self):
+        self.backend.clear()
+
+    @property
+    def stats(self):
+        """
+        :return: dict of hits, misses, invalidations and hit_ratio
+        """
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'invalidations': self.invalidations,
+            'hit_ratio': float(self.hits) / total if total else 0.0,
+        }
+
+
+class DocumentCache(BaseCache):
+    """
+    Read-through cache of Document.get, opt-in per Document class
+
+    >>> class Person(Document):
+    ...     _cache = DocumentCache(max_size=10000, ttl=60)
+
+    The raw responses are cached (each get hydrates its own instance)
+    and the ids written through the Document API (save, update,
+    update_by_id, delete and the bulk methods) are invalidated.
+
+    :param max_size: max number of documents of the default LRU backend
+    :param ttl: seconds a document is kept by the default LRU backend
+    :param backend: CacheBackend instance (default LRUBackend)
+    """
+
+    @staticmethod
+    def key(model, doc_id):
+        return u'{}/{}/{}'.format(model._index, model._doctype, doc_id)
+
+    def get(self, model, doc_id, fetch):
+        """
+        The cached response of a document or the one returned by fetch
+        (stored for the next calls)
+        :param model: Document class
+        :param doc_id: _id of the document
+        :param fetch: callable requesting the document to E.S
+        :return: E.S response
+        """
+        return self._read_through(self.key(model, doc_id), fetch)
+
+    def invalidate(self, model, ids):
+        """
+        Removes the documents written to E.S
+        :param model: Document class
+        :param ids: list of _id
+        """
+        for doc_id in ids:
+            self.backend.delete(self.key(model, doc_id))
+            self._count('invalidations')
+
+
+class SearchCache(BaseCache):
+    """
+    Result cache of Document.search, filter and count (and so of
+    Payload.search), opt-in per Document class
+
+    >>> class Person(Document):
+    ...     _search_cache = SearchCache(max_size=500, ttl=30)
+
+    The raw responses are cached by a canonical fingerprint of index,
+    doc_type, body and params (see fingerprint), the results are still
+    built by build_result so each search gets its own ResultSet, built
+    from its own copy of the response (see LRUBackend).
+    Any write through the Document API invalidates all the cached
+    searches of the class: keys have a generation of the class that is
+    replaced, kept in the backend so it is shared with other processes.
+
+    :param max_size: max number of responses of the default LRU backend
+    :param ttl: seconds a response is kept by the default LRU backend
+    :param backend: CacheBackend instance (default LRUBackend)
+    """
+
+    @staticmethod
+    def _prefix(model):
+        return u'{}/{}/search/'.format(model._index, model._doctype)
+
+    def _generation(self, model):
+        key = self._prefix(model) + 'generation'
+        generation = self.backend.get(key)
+        if generation is None:
+            generation = {'id': uuid.uuid4().hex}
+            self.backend.set(key, generation)
+        return generation['id']
+
+    def key(self, model, method, params):
+        return u'{}{}/{}'.format(
+            self._prefix(model), self._generation(model),
+            fingerprint(method, params)
+        )
+
+    def get(self, model, method, params, fetch):
+        """
+        The cached response of a request or the one returned by fetch
+        (stored for the next calls if not timed out)
+        :param model: Document class
+        :param method: search or count
+        :param params: the params of the request (index, body, size...)
+        :param fetch: callable sending the request to E.S
+        :return: E.S response
+        """
+        return self._read_through(self.key(model, method, params), fetch)
+
+    def invalidate(self, model, ids=None):
+        """
+        Invalidates all the cached searches of the class
+        :param model: Document class
+        :param ids: the written ids (unused, all searches are invalidated)
+        """
+        self.backend.set(self._prefix(model) + 'generation',
+                         {'id': uuid.uuid4().hex})
+        self._count('invalidations')
@@ -0,0 +1,117 @@
+# coding: utf-8
+from collections import OrderedDict
+
+from esengine.fields import BooleanField, IntegerField, LongField
+from esengine.fields import FloatField, DateField
+
+try:
+    import numpy
+except ImportError:  # pragma: no cover
+    numpy = None
+
+# dtype of the columns by field class, other fields (and multi fields)
+# give object columns
+DTYPES = (
+    (BooleanField, 'bool'),
+    (IntegerField, 'int64'),
+    (LongField, 'int64'),
+    (FloatField, 'float64'),
+    (DateField, 'datetime64[us]'),
+)
+
+# hit metadata that can be exported as a column
+META_COLUMNS = {'_id': object, '_score': 'float64'}
+
+
+def field_dtype(field):
+    """
+    numpy dtype of a column of the field values
+    :param field: field instance
+    :return: dtype name or object
+    """
+    if not field._multi:
+        for field_class, dtype in DTYPES:
+            if isinstance(field, field_class):
+                return dtype
+    return object
+
+
+def _utc_naive(date):
+    offset = date.utcoffset()
+    if offset is None:
+        return date
+    return (date - offset).replace(tzinfo=None)
+
+
+def make_column(values, dtype, field=None):
+    """
+    Builds a typed array from raw values, missing (None) values of
+    numeric columns become NaN (float64), of date columns NaT and of
+    boolean columns turn it into an object column
+    :param values: list of raw values read from _source
+    :param dtype: dtype of the column (see field_dtype)
+    :param field: field instance used to parse dates
+    :return: numpy.ndarray
+    """
+    if dtype == 'datetime64[us]':
+        parse = field._date_parser
+        values = [
+            None if value is None else _utc_naive(parse(value))
+            for value in values
+        ]
+    elif dtype is not object and any(value is None for value in values):
+        if dtype == 'bool':
+            dtype = object
+        else:
+            dtype = 'float64'
+            values = [float('nan') if v is None else v for v in values]
+    if dtype is object:
+        # filled by item so list values are not taken as a dimension
+        column = numpy.empty(len(values), dtype=object)
+        column[:] = values
+        return column
+    return numpy.array(values, dtype=dtype)
+
+
+def to_columns(model, hits, fields=None):
+    """
+    Exports raw E.S hits to typed columns without building documents,
+    values are read straight from _source (and _id / _score)
+
+    >>> to_columns(Doc, hits, ['name', 'age'])
+    OrderedDict([('name', array(['Gonzo'], dtype=object)),
+                 ('age', array([42]))])
+
+    :param model: Document class
+    :param hits: list of E.S hits
+    :param fields: names of the fields (default all model fields)
+    :return: OrderedDict of field name: numpy.ndarray
+    """
+    if numpy is None:
+        raise ImportError('numpy is required to export columns')
+    columns = OrderedDict()
+    for name in fields or model._fields:
+        if name in META_COLUMNS:
+            values = [hit.get(name) for hit in hits]
+            columns[name] = make_column(values, META_COLUMNS[name])
+            continue
+        field = model._fields.get(name)
+        if field is None:
+            raise KeyError('`{}` is an invalid field'.format(name))
+        values = [hit.get('_source', {}).get(name) for hit in hits]
+        columns[name] = make_column(values, field_dtype(field), field)
+    return columns
+
+
+def source_params(fields):
+    """
+    Search params fetching only the _source of the exported fields
+    :param fields: names of the fields or None for all
+    :return: dict
+    """
+    if not fields:
+        return {}
+    source = [name for name in fields if name not in META_COLUMNS]
+    if not source:
+        return {'_source': False}
+    return {'_source_include': ','.join(source)}
@@ -0,0 +1,161 @@
+# coding: utf-8
+import re
+from datetime import datetime, timedelta
+
+from dateutil import parser, tz
+from six import string_types, integer_types
+
+ISO_DATETIME = re.compile(
+    r'^(\d{4})-(\d{2})-(\d{2})'
+    r'(?:[T ](\d{2}):(\d{2})(?::(\d{2})(?:[.,](\d+))?)?)?'
+    r'(Z|[+-]\d{2}(?::?\d{2})?)?$'
+)
+
+# E.S named formats answered by the ISO-8601 parser
+ISO_FORMATS = (
+    'date_optional_time', 'strict_date_optional_time', 'dateOptionalTime',
+    'date_time', 'strict_date_time', 'dateTime',
+    'date_time_no_millis', 'strict_date_time_no_millis', 'dateTimeNoMillis',
+    'date', 'strict_date', 'date_hour_minute_second',
+    'strict_date_hour_minute_second', 'date_hour_minute_second_millis',
+    'strict_date_hour_minute_second_millis',
+)
+
+# E.S (Joda) date pattern tokens and its strptime equivalent
+JODA_TOKENS = (
+    ('yyyy', '%Y'), ('YYYY', '%Y'), ('yy', '%y'), ('MM', '%m'),
+    ('dd', '%d'), ('HH', '%H'), ('hh', '%I'), ('mm', '%M'), ('ss', '%S'),
+    ('SSS', '%f'), ('a', '%p'), ('Z', '%z'),
+)
+
+EPOCH = datetime(1970, 1, 1, tzinfo=tz.tzutc())
+UTC = tz.tzutc()
+
+
+def parse_iso(value):
+    """
+    Fast parser of the ISO-8601 dates returned by E.S
+    e.g: 2016-01-02, 2016-01-02T03:04:05.123Z, 2016-01-02 03:04+03:00
+    :param value: string
+    :return: datetime or None if value is not ISO-8601
+    """
+    match = ISO_DATETIME.match(value)
+    if match is None:
+        return None
+    year, month, day, hour, minute, second, fraction, offset = \
+        match.groups()
+    tzinfo = None
+    if offset:
+        if offset == 'Z':
+            tzinfo = UTC
+        else:
+            digits = offset[1:].replace(':', '')
+            seconds = int(digits[:2]) * 3600 + int(digits[2:] or 0) * 60
+            if offset[0] == '-':
+                seconds = -seconds
+            tzinfo = tz.tzoffset(None, seconds) if seconds else UTC
+    return datetime(
+        int(year), int(month), int(day),
+        int(hour or 0), int(minute or 0), int(second or 0),
+        int(fraction[:6].ljust(6, '0')) if fraction else 0,
+        tzinfo
+    )
+
+
+def epoch_parser(unit):
+    """
+    Builds a parser of epoch numbers (or numeric strings)
+    :param unit: seconds in one unit (0.001 for epoch_millis)
+    :return: callable returning an UTC datetime or None
+    """
+    def parse_epoch(value):
+        if isinstance(value, string_types):
+            if not value.lstrip('-').isdigit():
+                return None
+            value = int(value)
+        return EPOCH + timedelta(seconds=value * unit)
+    return parse_epoch
+
+
+def strptime_parser(date_format):
+    """
+    Builds a parser of dates in the given strptime format
+    :param date_format: strptime format e.g: %Y-%m-%d %H:%M:%S
+    :return: callable returning a datetime or None
+    """
+    def parse_format(value):
+        try:
+            return datetime.strptime(value, date_format)
+        except ValueError:
+            return None
+    return parse_format
+
+
+def joda_to_strptime(pattern):
+    """
+    Translates a simple E.S (Joda) date pattern to a strptime format
+    :param pattern: e.g: yyyy-MM-dd HH:mm:ss
+    :return: strptime format or None if pattern is not supported
+    """
+    result = []
+    i = 0
+    while i < len(pattern):
+        for token, directive in JODA_TOKENS:
+            if pattern.startswith(token, i):
+                result.append(directive)
+                i += len(token)
+                break
+        else:
+            char = pattern[i]
+            if char.isalpha() or char in "%'":
+                return None
+            result.append(char)
+            i += 1
+    return ''.join(result)
+
+
+def build_date_parser(date_format=None, es_format=None):
+    """
+    Builds the parser of a DateField once, it tries the parsers planned
+    from the date_format (strptime) and E.S mapping format
+    (e.g: "yyyy-MM-dd||epoch_millis"), then the ISO-8601 parser and
+    falls back to dateutil only for unknown shapes.
+
+    :param date_format: strptime format used by the field
+    :param es_format: format of the field in the E.S mapping
+    :return: callable(value) returning a datetime
+    """
+    string_parsers, number_parsers = [], []
+    if date_format:
+        string_parsers.append(strptime_parser(date_format))
+    for name in (es_format or '').split('||'):
+        name = name.strip()
+        if name in ('epoch_millis', 'epoch_second'):
+            parse_epoch = epoch_parser(
+                0.001 if name == 'epoch_millis' else 1
+            )
+            number_parsers.append(parse_epoch)
+            string_parsers.append(parse_epoch)
+        elif name and name not in ISO_FORMATS:
+            strptime_format = joda_to_strptime(name)
+            if strptime_format:
+                string_parsers.append(strptime_parser(strptime_format))
+    string_parsers.insert(len(string_parsers) if date_format else 0,
+                          parse_iso)
+    numbers = integer_types + (float,)
+
+    def parse(value):
+        if isinstance(value, datetime):
+            return value
+        if isinstance(value, string_types):
+            for string_parser in string_parsers:
+                date = string_parser(value)
+                if date is not None:
+                    return date
+            return parser.parse(value)
+        if number_parsers and isinstance(value, numbers):
+            return number_parsers[0](value)
+        raise ValueError(
+            'Expected str or date. {} found'.format(value.__class__)
+        )
+    return parse
@@ -0,0 +1,178 @@
+# coding: utf-8
+import threading
+import time
+
+from elasticsearch.exceptions import NotFoundError
+
+
+class Pending(object):
+    """
+    The future document of an id requested to a Loader
+    """
+
+    def __init__(self, loader, batch, doc_id):
+        self._loader = loader
+        self._batch = batch
+        self.id = doc_id
+        self.event = threading.Event()
+        self.response = self.error = None
+
+    def _set(self, response=None, error=None):
+        self.response, self.error = response, error
+        self.event.set()
+
+    def raw(self):
+        """
+        Waits the batch of the id to be sent (or sends it)
+        :return: raw E.S document
+        """
+        if not self.event.is_set():
+            self._loader._wait(self)
+        if self.error is not None:
+            raise self.error
+        return self.response
+
+    def result(self):
+        """
+        :return: Document instance, each call hydrates its own
+        """
+        return self._loader.model.from_es(self.raw())
+
+
+class _Batch(object):
+    def __init__(self, deadline):
+        self.deadline = deadline
+        self.pending = {}
+        self.sent = False
+
+
+class Loader(object):
+    """
+    Collects the gets of a Document class and sends them as one multi get
+    (_mget), the DataLoader pattern applied to Document.get
+
+    In an explicit scope the ids are sent when a result is read or when
+    the scope ends, an id is requested once per scope
+
+    >>> with Person.loader() as loader:
+    ...     author = loader.load(book.author_id)
+    ...     readers = [loader.load(_id) for _id in book.reader_ids]
+    >>> author.result().name
+
+    With a window the gets made by any thread within window seconds are
+    sent together (see Document._batch_window)
+
+    :param model: Document class
+    :param es: ES client or None (if implemented a default in Model)
+    :param window: seconds to wait for other gets before sending, if
+    None ids are sent when a result is read (explicit scope)
+    :param max_batch: max number of ids in one request, a full batch is
+    sent at once
+    """
+
+    def __init__(self, model, es=None, window=None, max_batch=1000):
+        self.model = model
+        self.es = es
+        self.window = window
+        self.max_batch = max_batch
+        self._lock = threading.Lock()
+        self._batch = None
+        # requested ids of the scope (an explicit scope only)
+        self._requested = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.dispatch()
+
+    def load(self, doc_id):
+        """
+        Requests the document of an id
+        :param doc_id: _id of the document
+        :return: Pending document
+        """
+        full = None
+        with self._lock:
+            pending = self._requested.get(doc_id)
+            if pending is not None:
+                return pending
+            batch = self._batch
+            if batch is None:
+                batch = self._batch = _Batch(time.time() + (self.window or 0))
+            pending = batch.pending.get(doc_id)
+            if pending is not None:
+                return pending
+            pending = batch.pending[doc_id] = Pending(self, batch, doc_id)
+            if self.window is None:
+                self._requested[doc_id] = pending
+            if len(batch.pending) >= self.max_batch:
+                full, self._batch = batch, None
+        if full is not None:
+            self._send(full)
+        return pending
+
+    def load_many(self, ids):
+        """
+        :param ids: list of _id
+        :return: list of Pending documents
+        """
+        return [self.load(doc_id) for doc_id in ids]
+
+    def get(self, doc_id):
+        """
+        Loads the document of an id and waits for it
+        :param doc_id: _id of the document
+        :return: Document instance
+        """
+        return self.load(doc_id).result()
+
+    def fetch(self, doc_id):
+        """
+        Loads the raw document of an id and waits for it
+        :param doc_id: _id of the document
+        :return: raw E.S document
+        """
+        return self.load(doc_id).raw()
+
+    def dispatch(self):
+        """
+        Sends the ids requested and not sent yet
+        """
+        with self._lock:
+            batch, self._batch = self._batch, None
+        if batch is not None:
+            self._send(batch)
+
+    def _wait(self, pending):
+        batch = pending._batch
+        while not pending.event.is_set():
+            remaining = batch.deadline - time.time()
+            if remaining > 0 and not batch.sent:
+                pending.event.wait(remaining)
+                continue
+            with self._lock:
+                if self._batch is batch:
+                    self._batch = None
+            self._send(batch)
+            pending.event.wait()
+
+    def _send(self, batch):
+        with self._lock:
+            if batch.sent:
+                return
+            batch.sent = True
+        ids = list(batch.pending)
+        try:
+            found = dict(self.model._mget(ids, es=self.es,
+                                          chunk_size=self.max_batch))
+        except Exception as e:
+            for pending in batch.pending.values():
+                pending._set(error=e)
+            return
+        for doc_id, pending in batch.pending.items():
+            doc = found.get(doc_id, {})
+            if doc.get('found'):
+                pending._set(response=doc)
+            else:
+                pending._set(error=NotFoundError(404, 'not_found', doc))
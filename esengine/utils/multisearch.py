@@ -0,0 +1,119 @@
+# coding: utf-8
+from esengine.exceptions import ClientError, SearchError
+
+# params of a search sent in its header line, the others go in its body
+HEADER_PARAMS = ('preference', 'routing', 'search_type')
+
+
+class MultiSearch(object):
+    """
+    Collects searches of one or more Document classes and sends them as
+    one multi search request (_msearch), one round trip for all of them
+
+    >>> multi = MultiSearch()
+    >>> multi.add(Payload(model=Person, query=Query.match_all()), size=10)
+    >>> multi.add((Company, {"query": {"match": {"city": "Tunguska"}}}))
+    >>> people, companies = multi.execute()
+
+    The results are in the same order of the searches, each one is a
+    ResultSet built by the model of its search. A failed search does not
+    fail the others: its result is the SearchError (not raised).
+
+    :param model: default Document class of the searches
+    :param es: ES client or None (the default client of the model of
+    the first search)
+    :param kwargs: extra key=value to be passed to es.msearch
+    """
+
+    def __init__(self, model=None, es=None, **kwargs):
+        self._model = model
+        self._es = es
+        self._params = kwargs
+        self._searches = []
+
+    def __len__(self):
+        return len(self._searches)
+
+    def add(self, search, model=None, only=None, exclude=None,
+            deferred=False, **kwargs):
+        """
+        Adds a search
+
+        >>> multi.add({"query": {"match_all": {}}}, model=Person, size=5)
+
+        :param search: raw_query(preferable), Query, Filter or Payload
+        instance or a (Document class, query) pair
+        :param model: Document class of the search (default the model of
+        the pair, of the Payload or of the MultiSearch)
+        :param only: names of the only fields fetched from _source
+        :param exclude: names of the fields not fetched from _source
+        :param deferred: if True the fields not fetched are loaded when
+        read for the first time (see Document.search)
+        :param kwargs: params of the search (size, from, sort,
+        preference, routing...)
+        :return: self
+        """
+        if isinstance(search, tuple):
+            model, search = search
+        model = model or getattr(search, '_model', None) or self._model
+        if model is None:
+            raise ValueError('The Document class of the search is missing')
+        query = model._query_dict(search)
+        header = {'index': model._index, 'type': model._doctype}
+        body = dict(query)
+        for key, value in kwargs.items():
+            if key in HEADER_PARAMS:
+                header[key] = value
+            else:
+                body[key] = value
+        source = model._projection(only, exclude)[0]
+        if source:
+            # _source_include / _source_exclude in the body
+            body['_source'] = {
+                key[len('_source_'):]: value
+                for key, value in source.items()
+            }
+        self._searches.append((model, query, header, body, {
+            'size': kwargs.get('size'),
+            'only': only,
+            'exclude': exclude,
+            'deferred': deferred
+        }))
+        return self
+
+    def execute(self, es=None):
+        """
+        Sends all the searches as one multi search request
+        :param es: ES client (default the client of the MultiSearch)
+        :return: list of ResultSet or SearchError, one per search
+        """
+        if not self._searches:
+            return []
+        es = self._searches[0][0].get_es(es or self._es)
+        body = []
+        for _, _, header, search_body, _ in self._searches:
+            body.append(header)
+            body.append(search_body)
+        resp = es.msearch(body=body, **self._params)
+        return [
+            self._result(search, response, es)
+            for search, response in zip(self._searches, resp['responses'])
+        ]
+
+    @staticmethod
+    def _result(search, response, es):
+        """
+        :param search: a search added to the MultiSearch
+        :param response: its response in the multi search response
+        :param es: ES client
+        :return: ResultSet or SearchError
+        """
+        model, query, _, _, options = search
+        if 'error' in response:
+            return SearchError(response['error'], response.get('status'))
+        try:
+            return model.build_result(response, query=query, es=es,
+                                      **options)
+        except ClientError as e:
+            # timed out
+            return SearchError(str(e))
@@ -2,6 +2,7 @@ from esengine.exceptions import PayloadError
 from esengine.utils.payload.queries import Query
 from esengine.utils.payload.meta_util import unroll_struct
 from esengine.utils.pagination import Pagination
+from esengine.utils.multisearch import MultiSearch
 
 
 class Payload(object):
@@ -134,6 +135,61 @@ class Payload(object):
             )
         return model.search(query=query, **kwargs)
 
+    @staticmethod
+    def msearch(payloads, es=None, **kwargs):
+        """
+        Sends the payloads as one multi search request (_msearch), each
+        one searching its model, payloads without a model are given as
+        (Document class, payload) pairs
+
+        >>> results, facets = Payload.msearch([
+        ...     Payload(model=Person, query=Query.match_all()).size(10),
+        ...     (Company, Payload(aggregate=aggregates).size(0))
+        ... ])
+
+        :param payloads: list of Payload instances or pairs
+        :param es: ES client or None (the default of the first model)
+        :param kwargs: params of every search <see MultiSearch.add>
+        :return: list of ResultSet or SearchError, one per payload
+        """
+        multi = MultiSearch(es=es)
+        for payload in payloads:
+            multi.add(payload, **kwargs)
+        return multi.execute()
+
+    def scan(self, model=None, **kwargs):
+        """
+        Iterates over all documents matching the payload using scroll
+        (see Document.scan)
+        :param model: Document class (default is self._model)
+        :param kwargs: <see Document.scan parameters>
+        :return: generator of Doc objects
+        """
+        model = model or self._model
+        query = self.dict
+        if not query:
+            raise PayloadError(
+                "query, filter, aggregate or suggest should be specified!"
+            )
+        return model.scan(query=query, **kwargs)
+
+    def scan_columns(self, fields=None, model=None, **kwargs):
+        """
+        Iterates over all documents matching the payload using scroll
+        yielding typed columns of each page (see Document.scan_columns)
+        :param fields: names of the fields (default all)
+        :param model: Document class (default is self._model)
+        :param kwargs: <see Document.scan_columns parameters>
+        :return: generator of OrderedDict of field name: numpy.ndarray
+        """
+        model = model or self._model
+        query = self.dict
+        if not query:
+            raise PayloadError(
+                "query, filter, aggregate or suggest should be specified!"
+            )
+        return model.scan_columns(fields, query=query, **kwargs)
+
     def count(self, model=None, **kwargs):
         model = model or self._model
         query = self.dict.get('query')
@@ -0,0 +1,94 @@
+# coding: utf-8
+import threading
+
+from elasticsearch.exceptions import TransportError
+
+
+class Prefetch(object):
+    """
+    Runs a callable in a background thread, result() waits for it
+    and returns its value (or raises its exception)
+    """
+
+    def __init__(self, func, *args, **kwargs):
+        self._value = self._exception = None
+        self._thread = threading.Thread(
+            target=self._run, args=(func, args, kwargs)
+        )
+        self._thread.daemon = True
+        self._thread.start()
+
+    def _run(self, func, args, kwargs):
+        try:
+            self._value = func(*args, **kwargs)
+        except Exception as e:
+            self._exception = e
+
+    def result(self):
+        self._thread.join()
+        if self._exception is not None:
+            raise self._exception
+        return self._value
+
+
+def scroll_pages(es, index=None, doc_type=None, body=None, page_size=100,
+                 scroll='5m', prefetch=True, preserve_order=False, **kwargs):
+    """
+    Iterates over all hits matching body using the scroll API, yielding
+    one page (a list of raw hits) at a time so memory is constant.
+    While a page is being consumed the next one is fetched in background
+    (if prefetch) and the scroll context is cleared when the iteration
+    ends or the generator is closed (e.g: break in a for loop).
+
+    >>> for hits in scroll_pages(es, 'index', 'doc_type', query):
+    ...     process(hits)
+
+    :param es: ES client
+    :param index: index name
+    :param doc_type: doc_type name
+    :param body: the query
+    :param page_size: number of hits per page (per shard in scan mode)
+    :param scroll: how long the scroll context is kept between pages
+    :param prefetch: if True fetch the next page in background
+    :param preserve_order: if False use search_type=scan (unsorted
+    and cheaper), else keep the sort of the query
+    :param kwargs: extra key=value to be passed to es.search
+    :return: generator of lists of hits
+    """
+    if not preserve_order:
+        kwargs['search_type'] = 'scan'
+    resp = es.search(index=index, doc_type=doc_type, body=body,
+                     size=page_size, scroll=scroll, **kwargs)
+    scroll_id = resp.get('_scroll_id')
+    pending = None
+
+    def fetch(scroll_id):
+        return es.scroll(scroll_id=scroll_id, scroll=scroll)
+
+    try:
+        hits = resp.get('hits', {}).get('hits', [])
+        if hits:
+            yield hits
+        while scroll_id is not None:
+            if pending is not None:
+                resp, pending = pending.result(), None
+            else:
+                resp = fetch(scroll_id)
+            scroll_id = resp.get('_scroll_id', scroll_id)
+            hits = resp.get('hits', {}).get('hits', [])
+            if not hits:
+                break
+            if prefetch:
+                pending = Prefetch(fetch, scroll_id)
+            yield hits
+    finally:
+        if pending is not None:
+            try:
+                scroll_id = pending.result().get('_scroll_id', scroll_id)
+            except Exception:
+                pass
+        if scroll_id is not None:
+            try:
+                es.clear_scroll(scroll_id=scroll_id)
+            except TransportError:
+                pass
@@ -0,0 +1,125 @@
+# coding: utf-8
+import copy
+import threading
+
+try:
+    import asyncio
+except ImportError:  # pragma: no cover
+    asyncio = None
+
+
+class _Call(object):
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = self.error = None
+
+    def wait(self):
+        self.event.wait()
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+class SingleFlight(object):
+    """
+    Coalesces identical concurrent requests: while a call of a key is
+    in flight the other callers of the same key wait for it and share
+    its response instead of sending their own request.
+
+    >>> class Person(Document):
+    ...     _single_flight = SingleFlight()
+
+    Document.get, search, filter and count of classes having a
+    _single_flight send their requests through do (threads), the async
+    methods through do_async (asyncio). The callers waiting for a call
+    get their own copy of its response (copy.deepcopy) so the documents
+    each caller hydrates do not share nested values.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._tasks = {}
+        self.calls = self.coalesced = 0
+
+    def do(self, key, func):
+        """
+        Calls func, or waits for the call of the same key in flight
+        :param key: hashable identifying the request
+        :param func: callable sending the request
+        :return: the result of func, a copy of it for the callers
+        waiting (the exception of func is raised to all the callers)
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.calls += 1
+            else:
+                self.coalesced += 1
+        if not leader:
+            return copy.deepcopy(call.wait())
+        try:
+            call.result = func()
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.event.set()
+        return call.result
+
+    def do_async(self, key, func):
+        """
+        asyncio version of do, must be called from a running event loop
+        :param key: hashable identifying the request
+        :param func: callable returning an awaitable sending the request
+        :return: awaitable of the result of func (a copy of it for the
+        callers waiting), cancelling it does not cancel the call shared
+        with the other callers
+        """
+        loop = asyncio.get_event_loop()
+        task_key = (id(loop), key)
+        with self._lock:
+            task = self._tasks.get(task_key)
+            if task is not None:
+                self.coalesced += 1
+                return self._copy_of(task, loop)
+            task = self._tasks[task_key] = asyncio.ensure_future(func())
+            self.calls += 1
+            task.add_done_callback(
+                lambda done: self._finish(task_key, done)
+            )
+        return asyncio.shield(task)
+
+    @staticmethod
+    def _copy_of(task, loop):
+        """
+        Future of a copy of the result of task
+        :param task: the task of the call in flight
+        :param loop: running event loop
+        :return: future
+        """
+        future = loop.create_future()
+
+        def done(task):
+            if future.cancelled():
+                return
+            if task.cancelled():
+                future.cancel()
+            elif task.exception() is not None:
+                future.set_exception(task.exception())
+            else:
+                future.set_result(copy.deepcopy(task.result()))
+
+        task.add_done_callback(done)
+        return future
+
+    def _finish(self, task_key, task):
+        with self._lock:
+            self._tasks.pop(task_key, None)
+        if not task.cancelled():
+            # retrieved so it is not logged when every caller is gone
+            task.exception()
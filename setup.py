@@ -47,7 +47,8 @@ setup(
     extras_require={
         "es0": ["elasticsearch<1.0.0"],
         "es1": ["elasticsearch>=1.0.0,<2.0.0"],
-        "es2": ["elasticsearch>=2.0.0,<3.0.0"]
+        "es2": ["elasticsearch>=2.0.0,<3.0.0"],
+        "numpy": ["numpy"]
     },
     install_requires=["python-dateutil", "six==1.10.0"],
     tests_require=[
@@ -1,9 +1,21 @@
 # content of conftest.py
+import sys
+import json
 import pytest
 import elasticsearch.helpers as eh_original
 from esengine import Document
 from esengine.fields import IntegerField, StringField, FloatField
 
+try:
+    import asyncio
+except ImportError:  # pragma: no cover
+    asyncio = None
+
+# tests using async / await syntax
+collect_ignore = []
+if sys.version_info < (3, 6):
+    collect_ignore += ['test_aio.py']
+
 DOUBLE_ID_FIELD = "double_id"
 
 _INDEX = 'index'
@@ -53,6 +65,29 @@ class ES(object):
             }
         }
 
+    def mget(self, *args, **kwargs):
+        assert kwargs['index'] == _INDEX
+        assert kwargs['doc_type'] == _DOC_TYPE
+        docs = []
+        for _id in kwargs['body']['ids']:
+            doc = {'_id': str(_id), 'found': _id in self.test_ids}
+            if doc['found'] and kwargs.get('_source', True):
+                doc['_source'] = {'id': _id}
+            docs.append(doc)
+        return {'docs': docs}
+
+    def bulk(self, body, **kwargs):
+        lines = iter(body.splitlines())
+        items = []
+        for line in lines:
+            op_type, action = json.loads(line).popitem()
+            assert action['_index'] == _INDEX
+            assert action['_type'] == _DOC_TYPE
+            if op_type != 'delete':
+                next(lines)
+            items.append({op_type: {'_id': action['_id'], 'status': 200}})
+        return {'took': 1, 'errors': False, 'items': items}
+
 
 class ES_fields(object):
     test_id = 100
@@ -102,6 +137,147 @@ class ES_fields(object):
         }
 
 
+class ScrollES(ES):
+    """Serves test_total documents in pages through the scroll API"""
+    test_total = 25
+
+    def __init__(self):
+        self.scrolls = []
+        self.cleared = []
+
+    def _page(self, start, size):
+        ids = range(start, min(start + size, self.test_total))
+        return {
+            '_scroll_id': 'scroll-{}-{}'.format(start + size, size),
+            'hits': {
+                'total': self.test_total,
+                'hits': [
+                    {'_id': _id, '_source': {'id': _id}, '_score': 1.0}
+                    for _id in ids
+                ]
+            }
+        }
+
+    def search(self, *args, **kwargs):
+        assert kwargs['index'] == _INDEX
+        assert kwargs['doc_type'] == _DOC_TYPE
+        assert kwargs['scroll']
+        self.search_kwargs = kwargs
+        if kwargs.get('search_type') == 'scan':
+            resp = self._page(0, kwargs['size'])
+            resp['hits']['hits'] = []
+            resp['_scroll_id'] = 'scroll-0-{}'.format(kwargs['size'])
+            return resp
+        return self._page(0, kwargs['size'])
+
+    def scroll(self, scroll_id, scroll):
+        self.scrolls.append(scroll_id)
+        _, start, size = scroll_id.split('-')
+        return self._page(int(start), int(size))
+
+    def clear_scroll(self, scroll_id):
+        self.cleared.append(scroll_id)
+
+
+class SourceES(ES):
+    """Serves test_docs applying the _source filtering params"""
+    test_docs = {
+        '1': {'name': 'Gonzo', 'age': 42, 'bio': 'Muppet'},
+        '2': {'name': 'Kermit', 'age': 60, 'bio': 'Frog'},
+        '3': {'name': 'Piggy', 'age': 50, 'bio': 'Pig'},
+    }
+
+    def __init__(self):
+        self.calls = []
+
+    def _source(self, doc_id, kwargs):
+        source = self.test_docs[doc_id]
+        include = kwargs.get('_source_include')
+        exclude = kwargs.get('_source_exclude') or ()
+        return {
+            key: value for key, value in source.items()
+            if (include is None or key in include) and key not in exclude
+        }
+
+    def _hit(self, doc_id, kwargs):
+        return {'_id': doc_id, '_score': 1.0, 'found': True,
+                '_source': self._source(doc_id, kwargs)}
+
+    def search(self, *args, **kwargs):
+        self.calls.append(('search', kwargs))
+        return {'hits': {
+            'total': len(self.test_docs),
+            'hits': [self._hit(doc_id, kwargs)
+                     for doc_id in sorted(self.test_docs)]
+        }}
+
+    def get(self, *args, **kwargs):
+        self.calls.append(('get', kwargs))
+        return self._hit(kwargs['id'], kwargs)
+
+    def msearch(self, body, **kwargs):
+        self.calls.append(('msearch', body))
+        responses = []
+        for header, search in zip(body[::2], body[1::2]):
+            source = search.get('_source') or {}
+            responses.append(self.search(
+                index=header['index'],
+                doc_type=header['type'],
+                _source_include=source.get('include'),
+                _source_exclude=source.get('exclude')
+            ))
+        # the searches are not recorded as calls
+        del self.calls[-len(responses):]
+        return {'responses': responses}
+
+    def mget(self, *args, **kwargs):
+        self.calls.append(('mget', kwargs))
+        return {'docs': [
+            self._hit(doc_id, kwargs) if doc_id in self.test_docs
+            else {'_id': doc_id, 'found': False}
+            for doc_id in kwargs['body']['ids']
+        ]}
+
+
+class AsyncES(object):
+    """
+    Async client serving the responses of a sync mock client, each call
+    returns a future completed on a later iteration of the event loop
+    """
+
+    def __init__(self, es):
+        self.es = es
+
+    def __getattr__(self, name):
+        attribute = getattr(self.es, name)
+        if not callable(attribute):
+            # namespaces as indices
+            return AsyncES(attribute)
+
+        def call(*args, **kwargs):
+            loop = asyncio.get_event_loop()
+            future = loop.create_future()
+
+            def complete():
+                try:
+                    future.set_result(attribute(*args, **kwargs))
+                except Exception as e:
+                    future.set_exception(e)
+
+            loop.call_soon(complete)
+            return future
+
+        return call
+
+
+class P(Document):
+    _index = _INDEX
+    _doctype = _DOC_TYPE
+    name = StringField()
+    age = IntegerField()
+    bio = StringField()
+
+
 class D(Document):
     _index = _INDEX
     _doctype = _DOC_TYPE
@@ -166,6 +342,26 @@ def MockES():
     return ES
 
 
+@pytest.fixture(scope="module")
+def MockScrollES():
+    return ScrollES
+
+
+@pytest.fixture(scope="module")
+def MockSourceES():
+    return SourceES
+
+
+@pytest.fixture(scope="module")
+def MockAsyncES():
+    return AsyncES
+
+
+@pytest.fixture(scope="module")
+def Person():
+    return P
+
+
 @pytest.fixture(scope="module")
 def MockESf():
     return ES_fields
@@ -0,0 +1,219 @@
+import pytest
+
+from esengine import DocumentCache, SingleFlight
+from esengine.utils.bulk import BulkResult
+
+asyncio = pytest.importorskip('asyncio')
+
+
+def run(coroutine):
+    loop = asyncio.new_event_loop()
+    try:
+        asyncio.set_event_loop(loop)
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.close()
+        asyncio.set_event_loop(None)
+
+
+@pytest.fixture
+def WriteES(MockSourceES):
+    class WriteES(MockSourceES):
+        class Indices(object):
+            def refresh(self):
+                return {'refreshed': True}
+
+        indices = Indices()
+
+        def index(self, **kwargs):
+            self.calls.append(('index', kwargs))
+            return {'_id': kwargs['id'] or 'new', 'created': True}
+
+        def update(self, **kwargs):
+            self.calls.append(('update', kwargs))
+            return {'_id': kwargs['id']}
+
+        def delete(self, **kwargs):
+            self.calls.append(('delete', kwargs))
+            return {'found': True}
+
+    return WriteES
+
+
+def test_aget_uses_the_async_client_of_the_class(Person, MockSourceES,
+                                                 MockAsyncES):
+    class AsyncPerson(Person):
+        _es = MockAsyncES(MockSourceES())
+
+    doc = run(AsyncPerson.aget('2'))
+    assert isinstance(doc, AsyncPerson)
+    assert (doc.id, doc.name, doc.age) == ('2', 'Kermit', 60)
+    assert doc.dirty_fields == set()
+    many = run(AsyncPerson.aget_many(['3', '9'], fields=['name']))
+    assert many[0].name == 'Piggy' and many[1] is None
+    assert many[0].unloaded_fields == {'age', 'bio'}
+
+
+def test_asearch_afilter_and_acount(Person, MockSourceES, MockAsyncES):
+    source_es = MockSourceES()
+    es = MockAsyncES(source_es)
+    results = run(Person.asearch({'query': {'match_all': {}}}, es=es,
+                                 only=['name'], size=3))
+    assert [doc.name for doc in results] == ['Gonzo', 'Kermit', 'Piggy']
+    assert results[0].unloaded_fields == {'age', 'bio'}
+    assert source_es.calls[-1][1]['_source_include'] == ['name']
+    assert results._es is es
+
+    results = run(Person.afilter(es=es, ids=['1', '2']))
+    assert source_es.calls[-1][1]['size'] == 2
+    assert results[1].bio == 'Frog'
+
+    source_es.count = lambda **kwargs: {'count': 3}
+    assert run(Person.acount(es=es, name='Gonzo')) == 3
+    assert run(Person.acount('search', {'query': {}}, es=es)) == 3
+
+
+def test_ascan_iterates_over_all_pages(Doc, MockScrollES, MockAsyncES):
+    scroll_es = MockScrollES()
+
+    async def scan():
+        return [doc.id async for doc in
+                Doc.ascan(es=MockAsyncES(scroll_es), page_size=10)]
+
+    assert run(scan()) == list(range(25))
+    assert scroll_es.search_kwargs['search_type'] == 'scan'
+    assert scroll_es.cleared == ['scroll-40-10']
+
+
+def test_ascan_clears_scroll_when_closed(Doc, MockScrollES, MockAsyncES):
+    scroll_es = MockScrollES()
+
+    async def scan():
+        docs = Doc.ascan(es=MockAsyncES(scroll_es), page_size=10,
+                         prefetch=False)
+        async for doc in docs:
+            break
+        await docs.aclose()
+        return doc
+
+    assert run(scan()).id == 0
+    assert scroll_es.cleared == ['scroll-10-10']
+
+
+def test_writes(Person, WriteES, MockAsyncES):
+    source_es = WriteES()
+    es = MockAsyncES(source_es)
+    doc = Person(id='7', name='Gonzo', age=42)
+    assert run(doc.asave(es=es))['created']
+    assert source_es.calls[-1][1]['body']['name'] == 'Gonzo'
+    assert doc.dirty_fields == set()
+
+    doc.age = 43
+    run(doc.asave(es=es, partial=True))
+    assert source_es.calls[-1] == ('update', {
+        'index': 'index', 'doc_type': 'doc_type', 'id': '7',
+        'body': {'doc': {'age': 43}}
+    })
+    run(doc.aupdate(es=es, bio='Muppet'))
+    assert doc.bio == 'Muppet' and doc.dirty_fields == set()
+    assert run(doc.adelete(es=es)) == {'found': True}
+    assert source_es.calls[-1][0] == 'delete'
+    assert run(Person.arefresh(es=es)) == {'refreshed': True}
+
+
+def test_async_bulk(Person, MockSourceES, MockAsyncES):
+    es = MockAsyncES(MockSourceES())
+    docs = [Person(id=str(i), name='Gonzo') for i in range(5)]
+    result = run(Person.asave_all(docs, es=es, chunk_size=2))
+    assert isinstance(result, BulkResult)
+    assert result == (5, [])
+    assert [chunk['count'] for chunk in result.chunks] == [2, 2, 1]
+    assert run(Person.aupdate_all(['1', '2'], es=es, age=1)) == (2, [])
+    assert run(Person.adelete_all(['1'], es=es)) == (1, [])
+
+    results = run(Person.asearch({}, es=es))
+    assert run(results.aupdate(age=2)) == (3, [])
+    assert run(results.adelete()) == (3, [])
+
+
+def test_async_bulk_retries_and_adapts(Person, MockSourceES, MockAsyncES):
+    class RejectingES(MockSourceES):
+        """Rejects the first item of the first request"""
+        rejected = False
+
+        def bulk(self, body, **kwargs):
+            resp = super(RejectingES, self).bulk(body, **kwargs)
+            if not self.rejected:
+                self.rejected = True
+                resp['items'][0]['index'].update(
+                    status=429, error='EsRejectedExecutionException[...]'
+                )
+            return resp
+
+    es = MockAsyncES(RejectingES())
+    docs = [Person(id=str(i), name='Gonzo') for i in range(5)]
+    result = run(Person.asave_all(docs, es=es, chunk_size=5, max_retries=1,
+                                  initial_backoff=0))
+    assert result == (5, [])
+    assert result.retried == 1
+    assert [chunk['count'] for chunk in result.chunks] == [5, 1]
+
+    result = run(Person.asave_all(docs, es=es, chunk_size=2,
+                                  target_latency=0.5))
+    assert result == (5, [])
+    assert all('chunk_size' in chunk for chunk in result.chunks)
+
+
+def test_aget_cache_and_single_flight(Person, MockSourceES, MockAsyncES):
+    class Cached(Person):
+        _cache = DocumentCache()
+        _single_flight = SingleFlight()
+
+    source_es = MockSourceES()
+    es = MockAsyncES(source_es)
+
+    async def gets():
+        return await asyncio.gather(*[Cached.aget('1', es=es)
+                                      for _ in range(3)])
+
+    docs = run(gets())
+    assert len(set(map(id, docs))) == 3
+    assert Cached._single_flight.coalesced == 2
+    run(Cached.aget('1', es=es))
+    assert Cached._cache.stats['hits'] == 1
+    assert len(source_es.calls) == 1
+
+
+def test_do_async_coalesces_concurrent_calls():
+    flight = SingleFlight()
+    calls = []
+
+    async def slow():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return {'value': 42}
+
+    async def main():
+        callers = [flight.do_async('k', slow) for _ in range(5)]
+        callers[0].cancel()
+        return await asyncio.gather(*callers[1:])
+
+    results = run(main())
+    assert results == [{'value': 42}] * 4
+    assert len(set(map(id, results))) == 4
+    assert calls == [1]
+
+
+def test_do_async_raises_to_all_callers():
+    flight = SingleFlight()
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise ValueError('failed')
+
+    async def main():
+        callers = [flight.do_async('k', fail) for _ in range(3)]
+        return await asyncio.gather(*callers, return_exceptions=True)
+
+    errors = run(main())
+    assert [type(error) for error in errors] == [ValueError] * 3
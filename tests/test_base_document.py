@@ -156,3 +156,110 @@ def test_doc_from_dict():
     doc = Doc.from_dict(dict_doc)
     assert doc.multiple == [1, 2]
     assert doc.simple == 10
+
+
+def test_from_es_compiled_matches_generic_path():
+    from esengine.document import Document
+    from esengine.fields import DateField, ObjectField
+
+    class Compiled(Document):
+        _doctype = 'test'
+        _index = 'test'
+        name = StringField()
+        number = IntegerField(default=10)
+        tags = StringField(multi=True)
+        date = DateField()
+        extra = ObjectField()
+
+    class Generic(Compiled):
+        def __init__(self, *args, **kwargs):
+            super(Generic, self).__init__(*args, **kwargs)
+
+    assert Compiled._codecs()
+    assert Generic._codecs() is None
+
+    hit = {'_id': '1', '_score': 2.0, '_source': {
+        'name': 'Gonzo', 'tags': ['a', 1], 'date': '2016-01-02T03:04:05'
+    }}
+    compiled, generic = Compiled.from_es(hit), Generic.from_es(hit)
+    assert compiled.to_dict() == generic.to_dict()
+    assert compiled._score == generic._score == 2.0
+    assert compiled.dirty_fields == generic.dirty_fields == set()
+    assert compiled.number == 10
+    assert compiled.tags == ['a', '1']
+
+    # mutable defaults are not shared between instances
+    other = Compiled.from_es(hit)
+    assert other.extra is not compiled.extra
+
+
+def test_from_es_recompiles_when_fields_change():
+    from esengine.document import Document
+
+    class Doc(Document):
+        _doctype = 'test'
+        _index = 'test'
+        name = StringField()
+
+    assert Doc.from_es({'_source': {'name': 'a'}}).name == 'a'
+    Doc.having(fields=dict(Doc._fields, number=IntegerField()))
+    doc = Doc.from_es({'_source': {'name': 'a', 'number': '1'}})
+    assert doc.number == 1
+
+
+def test_from_es_with_embedded_document():
+    from esengine.document import Document
+    from esengine.embedded_document import EmbeddedDocument
+
+    class Point(EmbeddedDocument):
+        x = IntegerField()
+        y = IntegerField()
+
+    class Doc(Document):
+        _doctype = 'test'
+        _index = 'test'
+        point = Point()
+
+    doc = Doc.from_es({'_id': '1', '_source': {'point': {'x': 1, 'y': 2}}})
+    assert (doc.point.x, doc.point.y) == (1, 2)
+    assert doc.to_dict()['point'] == {'x': 1, 'y': 2}
+
+
+def test_from_es_lazy_decodes_on_first_access():
+    from esengine.document import Document
+
+    decoded = []
+
+    class TrackedField(IntegerField):
+        def from_dict(self, serialized):
+            decoded.append(self._field_name)
+            return super(TrackedField, self).from_dict(serialized)
+
+    class Doc(Document):
+        _doctype = 'test'
+        _index = 'test'
+        _lazy = True
+        title = StringField()
+        number = TrackedField()
+        other = TrackedField(default=7)
+
+    Doc._codecs()  # compiling checks the defaults
+    del decoded[:]
+
+    hit = {'_id': '1', '_source': {'title': 'x', 'number': '10'}}
+    doc = Doc.from_es(hit)
+    assert decoded == []
+    assert doc.number == 10
+    assert doc.number == 10
+    assert decoded == ['number']
+    assert doc.dirty_fields == set()
+
+    doc.title = 'y'
+    assert doc.dirty_fields == {'title'}
+    assert doc.to_dict() == {
+        'id': '1', 'title': 'y', 'number': 10, 'other': 7
+    }
+    assert doc.pop_changes() == {'title': 'y'}
+
+    assert not hasattr(Doc.from_es(hit, lazy=False), '_lazy_source')
+    assert isinstance(Doc.number, IntegerField)
@@ -0,0 +1,373 @@
+import time
+import pytest
+import elasticsearch.helpers as eh
+from elasticsearch.exceptions import TransportError
+
+from esengine.utils.bulk import chunk_actions, get_serializer
+from esengine.utils.bulk import streaming_bulk, parallel_bulk, BulkWriter
+from esengine.utils.bulk import bulk, send_chunk, backoff, is_rejected
+from esengine.utils.bulk import AdaptiveChunking
+
+
+def actions(n, padding=''):
+    for i in range(n):
+        yield {
+            '_op_type': 'index',
+            '_index': 'index',
+            '_type': 'doc_type',
+            '_id': i,
+            '_source': {'id': i, 'padding': padding}
+        }
+
+
+def test_chunk_actions_by_count():
+    chunks = list(chunk_actions(actions(7), get_serializer(None),
+                                chunk_size=3))
+    assert [len(chunk) for chunk in chunks] == [3, 3, 1]
+
+
+def test_chunk_actions_by_bytes():
+    chunks = list(chunk_actions(actions(4, padding='x' * 100),
+                                get_serializer(None),
+                                chunk_size=100, max_chunk_bytes=200))
+    assert len(chunks) == 4
+    for chunk in chunks:
+        assert len(chunk) == 1
+
+
+def test_chunk_actions_delete_has_no_data():
+    action = {'_op_type': 'delete', '_index': 'i', '_type': 't', '_id': 1}
+    chunk, = chunk_actions([action], get_serializer(None))
+    assert chunk[0][1] is None
+
+
+def test_streaming_bulk_is_lazy(MockES):
+    consumed = []
+
+    def tracked():
+        for action in actions(10):
+            consumed.append(action['_id'])
+            yield action
+
+    results = streaming_bulk(MockES(), tracked(), chunk_size=4)
+    assert consumed == []
+    first = next(results)
+    assert first == (True, {'index': {'_id': 0, 'status': 200}})
+    assert len(consumed) == 4
+    assert len(list(results)) == 9
+
+
+def test_streaming_bulk_raise_on_error(MockES):
+    class FailingES(MockES):
+        def bulk(self, body, **kwargs):
+            resp = super(FailingES, self).bulk(body, **kwargs)
+            resp['items'][0]['index']['status'] = 400
+            return resp
+
+    with pytest.raises(eh.BulkIndexError):
+        list(streaming_bulk(FailingES(), actions(2)))
+
+    results = list(streaming_bulk(FailingES(), actions(2),
+                                  raise_on_error=False))
+    assert [ok for ok, _ in results] == [False, True]
+
+
+def test_parallel_bulk(MockES):
+    result = parallel_bulk(MockES(), actions(25), thread_count=3,
+                           chunk_size=10)
+    success, errors = result
+    assert success == 25
+    assert errors == []
+    assert sorted(chunk['count'] for chunk in result.chunks) == [5, 10, 10]
+    for chunk in result.chunks:
+        assert chunk['took'] == 1
+        assert chunk['latency'] >= 0
+
+
+def test_parallel_bulk_builds_in_workers(MockES):
+    def build(i):
+        return next(actions(i + 1))
+
+    result = parallel_bulk(MockES(), range(4), thread_count=2,
+                           build=build, chunk_size=2)
+    assert result.success == 4
+
+
+def test_parallel_bulk_raises_worker_exception(MockES):
+    class BrokenES(MockES):
+        def bulk(self, body, **kwargs):
+            raise RuntimeError('broken')
+
+    with pytest.raises(RuntimeError):
+        parallel_bulk(BrokenES(), actions(10), thread_count=2, chunk_size=2)
+
+
+@pytest.fixture
+def CountingES(MockES):
+    class CountingES(MockES):
+        def __init__(self):
+            self.calls = []
+
+        def bulk(self, body, **kwargs):
+            self.calls.append(body.count('\n'))
+            return super(CountingES, self).bulk(body, **kwargs)
+    return CountingES
+
+
+def test_bulk_writer_flushes_on_exit(Doc, CountingES):
+    es = CountingES()
+    with BulkWriter(Doc, es=es) as writer:
+        writer.save(Doc(id=1))
+        writer.update(Doc(id=2), id=3)
+        writer.delete(4)
+        assert len(writer) == 3
+        assert es.calls == []
+    assert es.calls == [5]
+    assert writer.result == (3, [])
+    assert len(writer) == 0
+
+
+def test_bulk_writer_flushes_on_max_docs(Doc, CountingES):
+    es = CountingES()
+    writer = Doc.bulk_writer(es=es, max_docs=2)
+    for i in range(5):
+        writer.save(Doc(id=i))
+    assert es.calls == [4, 4]
+    writer.flush()
+    assert es.calls == [4, 4, 2]
+    assert writer.result.success == 5
+
+
+def test_bulk_writer_flushes_on_max_bytes(Doc, CountingES):
+    es = CountingES()
+    writer = BulkWriter(Doc, es=es, max_bytes=100)
+    writer.save(Doc(id=1))
+    writer.save(Doc(id=2))
+    assert es.calls == [2]
+
+
+def test_bulk_writer_flushes_on_max_latency(Doc, CountingES):
+    es = CountingES()
+    writer = BulkWriter(Doc, es=es, max_latency=0.01)
+    writer.save(Doc(id=1))
+    time.sleep(0.2)
+    assert es.calls == [2]
+    assert len(writer) == 0
+
+
+def test_bulk_writer_rejects_unbound_models(Doc, DocWithDefaultClient,
+                                            MockES):
+    writer = BulkWriter(Doc, DocWithDefaultClient, es=MockES())
+    with pytest.raises(ValueError):
+        writer.delete(1)
+    writer.delete(1, model=Doc)
+
+    with pytest.raises(ValueError):
+        BulkWriter(Doc, es=MockES()).save(DocWithDefaultClient(id=1))
+
+
+def test_bulk_writer_keeps_the_operations_of_a_failed_flush(Doc,
+                                                            CountingES):
+    class FailingES(CountingES):
+        down = True
+
+        def bulk(self, body, **kwargs):
+            if self.down:
+                raise TransportError(503, 'unavailable')
+            return super(FailingES, self).bulk(body, **kwargs)
+
+    es = FailingES()
+    writer = BulkWriter(Doc, es=es, max_latency=0.01)
+    writer.save(Doc(id=1))
+    time.sleep(0.2)
+    assert len(writer) == 1
+    # the exception of the timer is raised by the next call
+    with pytest.raises(TransportError):
+        with writer:
+            writer.save(Doc(id=2))
+    assert len(writer) == 1
+    with pytest.raises(TransportError):
+        with writer:
+            pass
+    es.down = False
+    with writer:
+        writer.save(Doc(id=2))
+    assert es.calls == [4]
+    assert writer.result == (2, [])
+
+
+def test_bulk_writer_buffers_while_sending(Doc, CountingES):
+    class SlowES(CountingES):
+        def bulk(self, body, **kwargs):
+            writer.save(Doc(id=len(self.calls) + 10))
+            return super(SlowES, self).bulk(body, **kwargs)
+
+    writer = BulkWriter(Doc, es=SlowES())
+    writer.save(Doc(id=1))
+    writer.flush()
+    assert len(writer) == 1
+    writer.flush()
+    assert writer.result.success == 2
+
+
+@pytest.fixture
+def RejectingES(MockES):
+    class RejectingES(MockES):
+        """Rejects the first item of the first request and
+        fails permanently the item having _id 3"""
+        def __init__(self):
+            self.calls = []
+
+        def bulk(self, body, **kwargs):
+            self.calls.append(body)
+            resp = super(RejectingES, self).bulk(body, **kwargs)
+            for item in resp['items']:
+                item = item['index']
+                if item['_id'] == 3:
+                    item.update(status=400, error='MapperParsingException')
+            if len(self.calls) == 1:
+                resp['items'][0]['index'].update(
+                    status=429, error='EsRejectedExecutionException[...]'
+                )
+            return resp
+    return RejectingES
+
+
+def test_backoff_is_exponential_and_limited():
+    for attempt in range(5):
+        delay = backoff(attempt, initial_backoff=1, max_backoff=10)
+        limit = min(10, 2 ** attempt)
+        assert limit / 2.0 <= delay <= limit
+
+
+def test_send_chunk_retries_only_rejected_items(RejectingES):
+    es = RejectingES()
+    chunk, = chunk_actions(actions(5), get_serializer(es))
+    results, stats, retried = send_chunk(es, chunk, max_retries=2,
+                                         initial_backoff=0)
+    assert retried == 1
+    assert len(es.calls) == 2
+    assert len(stats) == 2
+    assert es.calls[1].count('\n') == 2
+    assert [ok for ok, _ in results] == [True, True, True, False, True]
+
+
+def test_send_chunk_without_retries_reports_rejected(RejectingES):
+    es = RejectingES()
+    chunk, = chunk_actions(actions(2), get_serializer(es))
+    results, _, retried = send_chunk(es, chunk)
+    assert retried == 0
+    assert is_rejected(results[0][1])
+
+
+def test_bulk_reports_permanent_failures(RejectingES):
+    es = RejectingES()
+    result = bulk(es, actions(5), max_retries=1, initial_backoff=0)
+    success, errors = result
+    assert success == 4
+    assert result.retried == 1
+    assert list(result.report()) == [400]
+    assert result.report()[400][0]['index']['_id'] == 3
+
+
+def test_send_chunk_retries_rejected_requests(MockES):
+    class OverloadedES(MockES):
+        calls = 0
+
+        def bulk(self, body, **kwargs):
+            self.calls += 1
+            if self.calls == 1:
+                raise TransportError(429, 'rejected')
+            return super(OverloadedES, self).bulk(body, **kwargs)
+
+    es = OverloadedES()
+    chunk, = chunk_actions(actions(3), get_serializer(es))
+    results, _, retried = send_chunk(es, chunk, max_retries=1,
+                                     initial_backoff=0)
+    assert retried == 3
+    assert all(ok for ok, _ in results)
+
+    with pytest.raises(TransportError):
+        send_chunk(OverloadedES(), chunk)
+
+
+def test_bulk_accepts_the_options_of_the_helpers_bulk(RejectingES):
+    result = bulk(RejectingES(), actions(5), max_retries=1,
+                  initial_backoff=0, raise_on_error=False)
+    assert result.failed == 1
+    assert bulk(RejectingES(), actions(5), max_retries=1, initial_backoff=0,
+                stats_only=True) == (4, 1)
+    es = RejectingES()
+    with pytest.raises(eh.BulkIndexError):
+        bulk(es, actions(5), max_retries=1, initial_backoff=0,
+             raise_on_error=True, chunk_size=2)
+    # the chunk having the failed item is the last sent
+    assert len(es.calls) == 3
+
+
+def test_parallel_bulk_accepts_the_options_of_the_helpers_bulk(
+        RejectingES):
+    result = parallel_bulk(RejectingES(), actions(5), thread_count=2,
+                           chunk_size=2, raise_on_error=False)
+    assert (result.success, result.failed) == (3, 2)
+    assert parallel_bulk(RejectingES(), actions(5), thread_count=2,
+                         max_retries=1, initial_backoff=0,
+                         stats_only=True) == (4, 1)
+    with pytest.raises(eh.BulkIndexError):
+        parallel_bulk(RejectingES(), actions(5), thread_count=2,
+                      max_retries=1, initial_backoff=0, raise_on_error=True)
+
+
+def test_adaptive_chunking_grows_and_shrinks():
+    adaptive = AdaptiveChunking(target_latency=1, chunk_size=100,
+                                max_chunk_bytes=10 ** 6, min_chunk_size=10)
+    adaptive.observe({'count': 100, 'bytes': 1000, 'took': 10,
+                      'latency': 0.25})
+    assert adaptive.chunk_size == 200
+    assert adaptive.max_chunk_bytes == adaptive.min_chunk_bytes
+
+    # took is used when greater than the wall time
+    adaptive.observe({'count': 200, 'bytes': 10 ** 6, 'took': 4000,
+                      'latency': 0.5})
+    assert adaptive.chunk_size == 100
+    assert adaptive.max_chunk_bytes == 5 * 10 ** 5
+
+    # limited by the initial max_chunk_bytes and min_chunk_size
+    adaptive.observe({'count': 10, 'bytes': 10 ** 6, 'took': 1,
+                      'latency': 0.01})
+    assert adaptive.chunk_size == 20
+    assert adaptive.max_chunk_bytes == 10 ** 6
+    adaptive.observe({'count': 10, 'bytes': 10 ** 6, 'took': 1,
+                      'latency': 100})
+    assert adaptive.chunk_size == 10
+
+
+def test_adaptive_chunking_ignores_small_fast_chunks():
+    adaptive = AdaptiveChunking(target_latency=1, chunk_size=500,
+                                max_chunk_bytes=10 ** 7)
+    # the leftovers of a group are faster but do not lower the limits
+    adaptive.observe({'count': 3, 'bytes': 300, 'took': 1,
+                      'latency': 0.01})
+    assert (adaptive.chunk_size, adaptive.max_chunk_bytes) == (500, 10 ** 7)
+    # slow ones shrink the current limits
+    adaptive.observe({'count': 3, 'bytes': 300, 'took': 1,
+                      'latency': 4})
+    assert adaptive.chunk_size == 250
+    assert adaptive.max_chunk_bytes == 5 * 10 ** 6
+
+
+def test_bulk_with_target_latency_exposes_chunk_sizes(MockES):
+    result = bulk(MockES(), actions(100), chunk_size=10,
+                  target_latency=10)
+    assert result.success == 100
+    counts = [chunk['count'] for chunk in result.chunks]
+    assert counts[:3] == [10, 20, 40]
+    assert [chunk['chunk_size'] for chunk in result.chunks[:2]] == [20, 40]
+    assert all('max_chunk_bytes' in chunk for chunk in result.chunks)
+
+
+def test_parallel_bulk_with_target_latency(MockES):
+    result = parallel_bulk(MockES(), actions(100), thread_count=2,
+                           chunk_size=10, target_latency=10)
+    assert result.success == 100
+    assert max(chunk['chunk_size'] for chunk in result.chunks) > 10
@@ -0,0 +1,199 @@
+import time
+
+import pytest
+
+from esengine.fields import ObjectField
+from esengine.utils.cache import LRUBackend, DocumentCache, SearchCache
+from esengine.utils.cache import fingerprint
+
+
+def test_lru_backend_evicts_least_recently_used():
+    backend = LRUBackend(max_size=2)
+    backend.set('a', 1)
+    backend.set('b', 2)
+    assert backend.get('a') == 1
+    backend.set('c', 3)
+    assert backend.get('b') is None
+    assert (backend.get('a'), backend.get('c')) == (1, 3)
+    backend.delete('a')
+    assert len(backend) == 1
+    backend.clear()
+    assert len(backend) == 0
+
+
+def test_lru_backend_ttl():
+    backend = LRUBackend(ttl=0.01)
+    backend.set('a', 1)
+    assert backend.get('a') == 1
+    time.sleep(0.02)
+    assert backend.get('a') is None
+    assert len(backend) == 0
+
+
+def test_lru_backend_returns_copies():
+    backend = LRUBackend()
+    value = {'tags': ['a']}
+    backend.set('a', value)
+    value['tags'].append('b')
+    backend.get('a')['tags'].append('c')
+    assert backend.get('a') == {'tags': ['a']}
+
+
+@pytest.fixture
+def CachedPerson(Person, MockSourceES):
+    class ES(MockSourceES):
+        def index(self, **kwargs):
+            self.calls.append(('index', kwargs))
+            return {'_id': kwargs['id'], 'created': False}
+
+        def update(self, **kwargs):
+            self.calls.append(('update', kwargs))
+            return {}
+
+        def delete(self, **kwargs):
+            self.calls.append(('delete', kwargs))
+            return {}
+
+        def count(self, **kwargs):
+            self.calls.append(('count', kwargs))
+            return {'count': len(self.test_docs)}
+
+        def bulk(self, body, **kwargs):
+            self.calls.append(('bulk', kwargs))
+            return super(ES, self).bulk(body, **kwargs)
+
+    class CachedPerson(Person):
+        _es = ES()
+        _cache = DocumentCache(max_size=10, ttl=60)
+        _search_cache = SearchCache(max_size=10, ttl=60)
+
+    return CachedPerson
+
+
+@pytest.fixture
+def Tagged(Person, MockSourceES):
+    class ES(MockSourceES):
+        def _hit(self, doc_id, kwargs):
+            hit = super(ES, self)._hit(doc_id, kwargs)
+            hit['_source']['extra'] = {'tags': ['a']}
+            return hit
+
+    class Tagged(Person):
+        _es = ES()
+        _cache = DocumentCache(max_size=10, ttl=60)
+        _search_cache = SearchCache(max_size=10, ttl=60)
+        extra = ObjectField()
+
+    return Tagged
+
+
+def gets(model, method='get'):
+    return len([call for call in model._es.calls if call[0] == method])
+
+
+def test_get_reads_through_the_cache(CachedPerson):
+    first = CachedPerson.get('1')
+    second = CachedPerson.get('1')
+    assert gets(CachedPerson) == 1
+    assert first is not second
+    assert second.name == 'Gonzo'
+    # gets having extra params are not cached
+    CachedPerson.get('1', _source_include=['name'])
+    assert gets(CachedPerson) == 2
+    assert CachedPerson._cache.stats == {
+        'hits': 1, 'misses': 1, 'invalidations': 0, 'hit_ratio': 0.5
+    }
+
+
+def test_writes_invalidate_the_cache(CachedPerson):
+    doc = CachedPerson.get('1')
+    doc.save()
+    CachedPerson.get('1')
+    assert gets(CachedPerson) == 2
+
+    CachedPerson.update_by_id('1', name='Animal')
+    CachedPerson.get('1').delete()
+    CachedPerson.get('1')
+    assert gets(CachedPerson) == 4
+
+    CachedPerson.get('2')
+    CachedPerson.update_all([('2', {'age': 1})], meta={'max_retries': 0})
+    CachedPerson.get('2')
+    assert gets(CachedPerson) == 6
+    assert CachedPerson._cache.stats['invalidations'] == 4
+
+
+def test_bulk_writes_are_invalidated_after_they_are_sent(CachedPerson):
+    with CachedPerson.bulk_writer() as writer:
+        writer.update('1', name='Animal')
+        # read while the write is still buffered caches the old document
+        assert CachedPerson.get('1').name == 'Gonzo'
+        assert CachedPerson._cache.stats['invalidations'] == 0
+    CachedPerson.get('1')
+    assert gets(CachedPerson) == 2
+
+    CachedPerson.get('2')
+    CachedPerson.save_all([CachedPerson.get('2')], max_retries=0)
+    CachedPerson.get('2')
+    assert gets(CachedPerson) == 4
+
+
+def test_cached_documents_do_not_share_nested_values(Tagged):
+    Tagged.get('1').extra['tags'].append('LEAK')
+    Tagged.get('1').extra['tags'].append('LEAK')
+    assert Tagged.get('1').extra == {'tags': ['a']}
+    assert gets(Tagged) == 1
+
+
+def test_fingerprint_is_independent_of_keys_order():
+    first = {'query': {'match': {'a': 1}}, 'size': 10, 'sort': ['a', 'b']}
+    second = {'sort': ['a', 'b'], 'size': 10, 'query': {'match': {'a': 1}}}
+    assert fingerprint('search', first) == fingerprint('search', second)
+    assert fingerprint('search', first) != fingerprint('count', first)
+    second['sort'].reverse()
+    assert fingerprint('search', first) != fingerprint('search', second)
+
+
+def test_search_filter_and_count_are_cached(CachedPerson):
+    query = {'query': {'match_all': {}}}
+    first = CachedPerson.search(query, size=2)
+    second = CachedPerson.search({'query': {'match_all': {}}}, size=2)
+    assert gets(CachedPerson, 'search') == 1
+    assert first is not second
+    assert first[0] is not second[0]
+    assert second[0].name == 'Gonzo'
+    CachedPerson.search(query, size=3)
+    assert gets(CachedPerson, 'search') == 2
+
+    CachedPerson.filter(name='Gonzo')
+    CachedPerson.filter(name='Gonzo')
+    assert gets(CachedPerson, 'search') == 3
+    assert CachedPerson.count() == CachedPerson.count() == 3
+    assert gets(CachedPerson, 'count') == 1
+    assert CachedPerson._search_cache.stats['hits'] == 3
+
+
+def test_writes_invalidate_cached_searches(CachedPerson):
+    CachedPerson.search({}, size=2)
+    CachedPerson.update_by_id('1', name='Animal')
+    CachedPerson.search({}, size=2)
+    assert gets(CachedPerson, 'search') == 2
+    CachedPerson._search_cache.invalidate(CachedPerson)
+    CachedPerson.search({}, size=2)
+    assert gets(CachedPerson, 'search') == 3
+
+
+def test_cached_searches_do_not_share_nested_values(Tagged):
+    query = {'query': {'match_all': {}}}
+    Tagged.search(query)[0].extra['tags'].append('LEAK')
+    Tagged.search(query)[0].extra['tags'].append('LEAK')
+    assert Tagged.search(query)[0].extra == {'tags': ['a']}
+    assert gets(Tagged, 'search') == 1
+
+
+def test_timed_out_searches_are_not_cached(CachedPerson):
+    from esengine.exceptions import ClientError
+    CachedPerson._es.search = lambda **kwargs: {'timed_out': True}
+    with pytest.raises(ClientError):
+        CachedPerson.search({})
+    assert len(CachedPerson._search_cache.backend) == 1  # the generation
@@ -0,0 +1,86 @@
+import pytest
+
+from esengine import Document, StringField, IntegerField, FloatField
+from esengine import BooleanField, DateField
+from esengine.bases.result import ResultSet
+from esengine.utils.columns import to_columns, source_params
+
+numpy = pytest.importorskip('numpy')
+
+
+class Event(Document):
+    _index = 'index'
+    _doctype = 'doc_type'
+    id = StringField()
+    name = StringField()
+    views = IntegerField()
+    rating = FloatField()
+    published = BooleanField()
+    created_at = DateField()
+    tags = StringField(multi=True)
+
+
+HITS = [
+    {'_id': '1', '_score': 1.5, '_source': {
+        'name': 'a', 'views': 10, 'rating': 4.5, 'published': True,
+        'created_at': '2016-01-02T03:04:05Z', 'tags': ['x', 'y']}},
+    {'_id': '2', '_score': None, '_source': {
+        'name': 'b', 'views': '20', 'rating': None,
+        'created_at': '2016-01-02T03:04:05+01:00', 'tags': ['z']}},
+]
+
+
+def test_to_columns_dtypes():
+    columns = to_columns(Event, HITS, ['_id', '_score', 'name', 'views',
+                                       'rating', 'published', 'created_at',
+                                       'tags'])
+    assert list(columns) == ['_id', '_score', 'name', 'views', 'rating',
+                             'published', 'created_at', 'tags']
+    assert columns['_id'].tolist() == ['1', '2']
+    assert columns['views'].dtype == numpy.int64
+    assert columns['views'].tolist() == [10, 20]
+    assert columns['rating'].dtype == numpy.float64
+    assert numpy.isnan(columns['rating'][1])
+    assert numpy.isnan(columns['_score'][1])
+    # missing booleans can't be represented by a bool column
+    assert columns['published'].tolist() == [True, None]
+    assert columns['created_at'].dtype == numpy.dtype('datetime64[us]')
+    assert columns['created_at'].tolist()[1].hour == 2
+    assert columns['tags'].dtype == object
+    assert columns['tags'].tolist() == [['x', 'y'], ['z']]
+
+    complete = to_columns(Event, HITS[:1], ['published', 'created_at'])
+    assert complete['published'].dtype == numpy.bool_
+
+
+def test_to_columns_invalid_field():
+    with pytest.raises(KeyError):
+        to_columns(Event, HITS, ['missing'])
+
+
+def test_resultset_to_columns_builds_no_documents(MockES):
+    results = ResultSet({'hits': {'hits': HITS}}, Event, es=MockES())
+    Event.from_es = None
+    try:
+        columns = results.to_columns('views')
+    finally:
+        del Event.from_es
+    assert list(columns) == ['views']
+    assert len(results.to_columns()) == len(Event._fields)
+
+
+def test_source_params():
+    assert source_params(None) == {}
+    assert source_params(['_id']) == {'_source': False}
+    assert source_params(['_id', 'a', 'b']) == {'_source_include': 'a,b'}
+
+
+def test_scan_columns(Doc, MockScrollES):
+    es = MockScrollES()
+    pages = list(Doc.scan_columns(['_id', 'id'], es=es, page_size=10))
+    assert es.search_kwargs['_source_include'] == 'id'
+    assert [len(page['id']) for page in pages] == [10, 10, 5]
+    assert pages[0]['id'].dtype == numpy.int64
+    assert numpy.concatenate([p['id'] for p in pages]).tolist() == \
+        list(range(25))
+    assert es.cleared
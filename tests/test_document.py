@@ -1,3 +1,4 @@
+import json
 import pytest
 from esengine.bases.py3 import *  # noqa
 from esengine.document import Document
@@ -218,4 +219,348 @@ def test_validators(MockES):
         city="London",
         state="WestMinster",
         number=22
-    )
\ No newline at end of file
+    )
+
+
+def test_save_all_streaming(Doc, MockES):
+    docs = (Doc(id=doc) for doc in MockES.test_ids)
+    results = Doc.save_all(docs, es=MockES(), streaming=True, chunk_size=1)
+    assert [item['index']['_id'] for _, item in results] == MockES.test_ids
+
+
+def test_delete_all_streaming(Doc, MockES):
+    results = Doc.delete_all(iter(MockES.test_ids), es=MockES(),
+                             streaming=True)
+    assert all(ok for ok, _ in results)
+
+
+def test_save_all_parallel(Doc, MockES):
+    docs = [Doc(id=doc) for doc in MockES.test_ids]
+    success, errors = Doc.save_all(docs, es=MockES(), parallel=2,
+                                   chunk_size=1)
+    assert success == len(MockES.test_ids)
+    assert errors == []
+
+
+def test_update_and_delete_all_parallel(Doc, MockES):
+    docs = [Doc(id=doc) for doc in MockES.test_ids]
+    result = Doc.update_all(docs, es=MockES(), parallel=2, id=1)
+    assert result.success == len(docs)
+    result = Doc.delete_all(docs, es=MockES(), parallel=2)
+    assert result.success == len(docs)
+    assert len(result.chunks) == 1
+
+
+def test_get_many(Doc, MockES):
+    ids = [MockES.test_ids[1], 999, MockES.test_ids[0]]
+    docs = Doc.get_many(ids, es=MockES(), chunk_size=2)
+    assert docs[0].id == MockES.test_ids[1]
+    assert docs[1] is None
+    assert docs[2].id == MockES.test_ids[0]
+
+
+def test_get_many_chunks_and_fields(Doc, MockES):
+    calls = []
+
+    class ES(MockES):
+        def mget(self, *args, **kwargs):
+            calls.append(kwargs)
+            return super(ES, self).mget(*args, **kwargs)
+
+    Doc.get_many(range(5), fields=['id'], es=ES(), chunk_size=2)
+    assert [call['body']['ids'] for call in calls] == [[0, 1], [2, 3], [4]]
+    assert calls[0]['_source_include'] == ['id']
+
+
+def test_exists_many(Doc, MockES):
+    calls = []
+
+    class ES(MockES):
+        def mget(self, *args, **kwargs):
+            calls.append(kwargs)
+            return super(ES, self).mget(*args, **kwargs)
+
+    ids = MockES.test_ids + [999]
+    assert Doc.exists_many(ids, es=ES(), chunk_size=2) == set(MockES.test_ids)
+    assert len(calls) == 2
+    assert all(call['_source'] is False for call in calls)
+
+
+def test_dirty_fields_tracked_after_load(DocWithDefaultClient, MockES):
+    doc = DocWithDefaultClient(id=MockES.test_id)
+    doc.height = 1.5
+    assert doc.dirty_fields == set()
+
+    doc = DocWithDefaultClient.get(id=MockES.test_id)
+    assert doc.dirty_fields == set()
+    doc.height = 1.5
+    doc.house_number = "42"
+    assert doc.dirty_fields == {'height', 'house_number'}
+
+
+def test_save_changes_sends_only_changed_fields(DocWithDefaultClient,
+                                                MockES):
+    calls = []
+
+    class ES(MockES):
+        def update(self, *args, **kwargs):
+            calls.append(kwargs)
+            return {'_id': kwargs['id']}
+
+    doc = DocWithDefaultClient.get(id=MockES.test_id)
+    assert doc.save_changes(es=ES()) is None
+    doc.height = 1.5
+    doc.save(es=ES(), partial=True)
+    assert calls[0]['id'] == MockES.test_id
+    assert calls[0]['body'] == {'doc': {'height': 1.5}}
+    assert doc.dirty_fields == set()
+
+
+def test_failed_updates_keep_the_changes(DocWithDefaultClient, MockES):
+    from elasticsearch.exceptions import TransportError
+    from esengine.bases.document import UNCHANGED
+
+    class FailingES(MockES):
+        def update(self, *args, **kwargs):
+            raise TransportError(503, 'unavailable')
+
+        def bulk(self, body, **kwargs):
+            raise TransportError(503, 'unavailable')
+
+    docs = list(DocWithDefaultClient.search({}))
+    # loaded documents share the empty changes until changed
+    assert docs[0]._dirty is docs[1]._dirty is UNCHANGED
+    docs[0].height = 1.5
+    docs[1].height = 2.5
+    with pytest.raises(TransportError):
+        docs[0].save_changes(es=FailingES())
+    assert docs[0].dirty_fields == {'height'}
+    with pytest.raises(TransportError):
+        DocWithDefaultClient.update_all(docs, es=FailingES(),
+                                        meta={'max_retries': 0})
+    assert docs[1].dirty_fields == {'height'}
+    result = DocWithDefaultClient.update_all(docs, es=MockES(),
+                                             meta={'max_retries': 0})
+    assert result == (2, [])
+    assert docs[0].dirty_fields == docs[1].dirty_fields == set()
+
+
+def test_update_all_keeps_the_changes_not_sent(DocWithDefaultClient,
+                                               MockES):
+    from elasticsearch.helpers import BulkIndexError
+    from elasticsearch.serializer import JSONSerializer
+
+    class Transport(object):
+        serializer = JSONSerializer()
+
+    class FailingES(MockES):
+        """Fails the update of the document having _id 1"""
+        transport = Transport()
+        requests = 0
+
+        def bulk(self, body, **kwargs):
+            self.requests += 1
+            resp = super(FailingES, self).bulk(body, **kwargs)
+            for item in resp['items']:
+                if str(item['update']['_id']) == '1':
+                    item['update'].update(status=400, error='failed')
+            return resp
+
+    es = FailingES()
+    docs = [DocWithDefaultClient.from_es({'_id': str(i), '_source': {}})
+            for i in range(4)]
+    for doc in docs:
+        doc.height = 1.5
+    with pytest.raises(BulkIndexError):
+        DocWithDefaultClient.update_all(docs, es=es, meta={'chunk_size': 1})
+    assert es.requests == 2
+    assert [doc.dirty_fields for doc in docs] == [
+        set(), {'height'}, {'height'}, {'height'}
+    ]
+    result = DocWithDefaultClient.update_all(
+        docs[1:], es=es, meta={'raise_on_error': False, 'stats_only': True}
+    )
+    assert result == (2, 1)
+    assert [doc.dirty_fields for doc in docs] == [
+        set(), {'height'}, set(), set()
+    ]
+
+
+def test_save_starts_tracking(Doc, MockES):
+    doc = Doc(id=MockES.test_id)
+    doc.save(es=MockES())
+    doc.id = MockES.test_id
+    assert doc.dirty_fields == {'id'}
+
+
+def test_update_all_sends_changed_fields(DocWithDefaultClient, MockES):
+    bodies = []
+
+    class ES(MockES):
+        def bulk(self, body, **kwargs):
+            bodies.append(body)
+            return super(ES, self).bulk(body, **kwargs)
+
+    docs = list(DocWithDefaultClient.search({}))
+    docs[0].height = 2.0
+    DocWithDefaultClient.update_all(docs, es=ES(), parallel=1)
+    lines = bodies[0].splitlines()
+    assert len(lines) == 2
+    assert json.loads(lines[1]) == {'doc': {'height': 2.0}}
+    assert docs[0].dirty_fields == set()
+
+
+def test_update_all_with_bodies_and_scripts(Doc, MockES):
+    bodies = []
+
+    class ES(MockES):
+        def bulk(self, body, **kwargs):
+            bodies.append(body)
+            return super(ES, self).bulk(body, **kwargs)
+
+    results = Doc.update_all([
+        (1, {'id': 10}),
+        (2, {'script': 'ctx._source.id += x', 'params': {'x': 1}}),
+    ], es=ES(), streaming=True, doc_as_upsert=True, meta={'chunk_size': 1})
+    assert [ok for ok, _ in results] == [True, True]
+    assert len(bodies) == 2
+    action, data = [json.loads(line) for line in bodies[0].splitlines()]
+    assert action == {'update': {'_id': 1, '_index': 'index',
+                                 '_type': 'doc_type'}}
+    assert data == {'doc': {'id': 10}, 'doc_as_upsert': True}
+    action, data = [json.loads(line) for line in bodies[1].splitlines()]
+    assert data == {'script': 'ctx._source.id += x', 'params': {'x': 1}}
+
+
+def test_update_all_merges_values_into_bodies(Doc, MockES):
+    bodies = []
+
+    class ES(MockES):
+        def bulk(self, body, **kwargs):
+            bodies.extend(json.loads(line)
+                          for line in body.splitlines()[1::2])
+            return super(ES, self).bulk(body, **kwargs)
+
+    Doc.update_all([(1, {'id': 10}), (2, {'doc': {'name': 'b'}}), 3],
+                   es=ES(), meta={'max_retries': 0}, id=5, name='a')
+    assert bodies == [{'doc': {'id': 10, 'name': 'a'}},
+                      {'doc': {'id': 5, 'name': 'b'}},
+                      {'doc': {'id': 5, 'name': 'a'}}]
+    with pytest.raises(ValueError):
+        Doc.update_all([(1, {'script': 'ctx._source.id += 1'})], es=ES(),
+                       meta={'max_retries': 0}, id=5)
+    with pytest.raises(ValueError):
+        Doc.update_all(['1', '2'], es=ES(), meta={'max_retries': 0})
+
+
+def test_save_all_with_retries_returns_bulk_result(Doc, MockES):
+    docs = [Doc(id=doc) for doc in MockES.test_ids]
+    result = Doc.save_all(docs, es=MockES(), max_retries=3)
+    assert result == (len(docs), [])
+    assert result.retried == 0
+
+
+def test_search_only_fetches_partial_documents(Person, MockSourceES):
+    from esengine.exceptions import UnloadedField
+    es = MockSourceES()
+    results = Person.search({'query': {'match_all': {}}}, es=es,
+                            only=['name'])
+    assert es.calls[0][1]['_source_include'] == ['name']
+    doc = results[0]
+    assert doc.name == 'Gonzo'
+    assert doc.id == '1'
+    assert doc.unloaded_fields == {'age', 'bio'}
+    with pytest.raises(UnloadedField):
+        doc.bio
+    assert getattr(doc, 'age', None) is None
+    # printed without the fields not loaded
+    assert str(doc).startswith('<P {') and 'bio' not in str(doc)
+    assert results.to_dict()[1] == {'id': '2', 'name': 'Kermit'}
+    assert results.to_dict(only=['age']) == [{}] * 3
+    # assigned fields are loaded
+    doc.age = 43
+    assert doc.age == 43
+    assert doc.unloaded_fields == {'bio'}
+    assert doc.pop_changes() == {'age': 43}
+
+
+def test_filter_exclude_deferred_fetches_unloaded(Person, MockSourceES):
+    es = MockSourceES()
+    results = Person.filter(es=es, exclude=['bio'], deferred=True)
+    assert es.calls[0][1]['_source_exclude'] == ['bio']
+    doc = results[1]
+    assert doc.unloaded_fields == {'bio'}
+    assert doc.name == 'Kermit'
+    assert doc.bio == 'Frog'
+    assert doc.unloaded_fields == set()
+    assert doc.dirty_fields == set()
+    # all the documents were loaded by one multi get
+    assert len(es.calls) == 2
+    assert es.calls[1] == ('mget', {
+        'index': 'index', 'doc_type': 'doc_type',
+        'body': {'ids': ['1', '2', '3']}, '_source_include': ['bio']
+    })
+    assert [person.bio for person in results] == ['Muppet', 'Frog', 'Pig']
+    assert len(es.calls) == 2
+
+
+def test_deferred_loads_only_missing_fields(Person, MockSourceES):
+    es = MockSourceES()
+    results = Person.search({}, es=es, only=['name'], deferred=True)
+    first, second = results[0], results[1]
+    second.age = 1
+    assert first.bio == 'Muppet'
+    assert es.calls[1][1]['_source_include'] == ['age', 'bio']
+    assert (first.age, second.age, second.bio) == (42, 1, 'Frog')
+    assert results[2].age == 50
+    assert len(es.calls) == 2
+
+
+def test_projection_rejects_invalid_fields(Person):
+    with pytest.raises(KeyError):
+        Person._projection(only=['missing'])
+    assert Person._projection() == ({}, None)
+
+
+def test_get_many_fields_returns_partial_documents(Person, MockSourceES):
+    doc, missing = Person.get_many(['3', '4'], fields=['age'],
+                                   es=MockSourceES())
+    assert missing is None
+    assert doc.age == 50
+    assert doc.unloaded_fields == {'name', 'bio'}
+
+
+def test_prefetch_resolves_references_with_one_mget(Person, MockSourceES):
+    from esengine import ReferenceField
+    from esengine.bases.result import ResultSet
+
+    class Book(Document):
+        _index = 'index'
+        _doctype = 'book'
+        author = ReferenceField(Person)
+        readers = ReferenceField(Person, multi=True)
+
+    es = MockSourceES()
+    resp = {'hits': {'hits': [
+        {'_id': 'a', '_source': {'author': '1', 'readers': ['2', '9']}},
+        {'_id': 'b', '_source': {'author': '1', 'readers': ['3']}},
+        {'_id': 'c', '_source': {'author': None}},
+    ]}}
+    results = ResultSet(resp, Book, es=es)
+    assert results.prefetch('author', 'readers') is results
+    assert len(es.calls) == 1
+    assert es.calls[0][1]['body'] == {'ids': ['1', '2', '9', '3']}
+    first, second, third = results
+    assert first.author.name == 'Gonzo'
+    assert first.author is second.author
+    assert [r.name for r in second.readers] == ['Piggy']
+    # ids not found are kept
+    assert first.readers[0].name == 'Kermit'
+    assert first.readers[1] == '9'
+    assert third.author is None and third.readers == []
+    assert first.dirty_fields == set()
+    assert first.to_dict() == {'id': 'a', 'author': '1',
+                               'readers': ['2', '9']}
+
+    with pytest.raises(ValueError):
+        results.prefetch('id')
@@ -3,7 +3,8 @@ from esengine.bases.py3 import *  # noqa
 from datetime import datetime
 from esengine import Document
 from esengine.fields import (
-    DateField, GeoPointField, ArrayField, LongField, StringField
+    DateField, GeoPointField, ArrayField, LongField, StringField,
+    ReferenceField
 )
 from esengine.exceptions import ValidationError, FieldTypeMismatch
 
@@ -255,3 +256,79 @@ def test_date_field_from_dict_accept_none():
     field = DateField(multi=True)
     serialized = [None]
     assert field.from_dict(serialized) == []
+
+
+@pytest.mark.parametrize('value', [
+    '2016-01-02',
+    '2016-01-02T03:04',
+    '2016-01-02T03:04:05',
+    '2016-01-02 03:04:05',
+    '2016-01-02T03:04:05.1234567',
+    '2016-01-02T03:04:05.5Z',
+    '2016-01-02T03:04:05+00:00',
+    '2016-01-02T03:04:05-0300',
+    '2016-01-02T03:04:05+05:30',
+    '2016-01-02T03:04:05+05',
+])
+def test_date_field_fast_path_matches_dateutil(value):
+    from dateutil import parser
+    from esengine.utils.dates import parse_iso
+    date = parse_iso(value)
+    assert date is not None
+    assert date == parser.parse(value)
+    assert date.utcoffset() == parser.parse(value).utcoffset()
+    assert DateField().from_dict(value) == date
+
+
+def test_date_field_falls_back_to_dateutil():
+    from esengine.utils.dates import parse_iso
+    assert parse_iso('Jan 2 2016') is None
+    assert DateField().from_dict('Jan 2 2016') == datetime(2016, 1, 2)
+
+
+def test_date_field_epoch_millis_from_mapping_format():
+    from dateutil.tz import tzutc
+    field = DateField(mapping={'format': 'date_optional_time||epoch_millis'})
+    expected = datetime(2015, 1, 1, tzinfo=tzutc())
+    assert field.from_dict(1420070400000) == expected
+    assert field.from_dict('1420070400000') == expected
+    assert field.from_dict('2015-01-01T00:00:00Z') == expected
+    # epoch 0 is not a missing value
+    assert field.from_dict(0) == datetime(1970, 1, 1, tzinfo=tzutc())
+    assert field.from_dict(None) is None
+    assert field.from_dict('') is None
+    with pytest.raises(ValueError):
+        DateField().from_dict(1420070400000)
+
+
+def test_date_field_joda_mapping_format():
+    field = DateField(mapping={'format': 'dd/MM/yyyy HH:mm'})
+    assert field.from_dict('02/01/2016 03:04') == datetime(2016, 1, 2, 3, 4)
+
+
+def test_date_field_multi_decoded_in_batch():
+    field = DateField(multi=True, date_format='%d/%m/%Y')
+    assert field.from_dict(['02/01/2016', None, '2016-01-03']) == [
+        datetime(2016, 1, 2), datetime(2016, 1, 3)
+    ]
+
+
+def test_reference_field_stores_ids():
+    class Author(Document):
+        _index = 'index'
+        _doctype = 'author'
+        name = StringField()
+
+    single = ReferenceField(Author)
+    multi = ReferenceField(Author, multi=True)
+    author = Author(id='1', name='Gonzo')
+    assert single.mapping == {'type': 'string', 'index': 'not_analyzed'}
+    assert single.from_dict(1) == '1'
+    assert single.from_dict(author) is author
+    assert single.to_dict(author) == '1'
+    assert single.to_dict('2') == '2'
+    assert multi.from_dict(['1', author]) == ['1', author]
+    assert multi.to_dict(['3', author]) == ['3', '1']
+    assert multi.from_dict(None) == []
+    with pytest.raises(FieldTypeMismatch):
+        single.validate(1)
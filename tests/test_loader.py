@@ -0,0 +1,72 @@
+import threading
+
+import pytest
+from elasticsearch.exceptions import NotFoundError
+
+from esengine.utils.loader import Loader
+
+
+def mgets(es):
+    return [call[1]['body']['ids'] for call in es.calls if call[0] == 'mget']
+
+
+def test_scope_sends_one_mget_with_unique_ids(Person, MockSourceES):
+    es = MockSourceES()
+    with Person.loader(es=es) as loader:
+        first = loader.load('1')
+        others = loader.load_many(['2', '1', '9'])
+        assert es.calls == []
+    assert mgets(es) == [['1', '2', '9']]
+    assert others[1] is first
+    assert first.result().name == 'Gonzo'
+    assert first.result() is not first.result()
+    assert others[0].result().name == 'Kermit'
+    with pytest.raises(NotFoundError):
+        others[2].result()
+    # already loaded in the scope
+    assert loader.get('2').name == 'Kermit'
+    assert len(mgets(es)) == 1
+
+
+def test_reading_a_result_sends_the_pending_ids(Person, MockSourceES):
+    es = MockSourceES()
+    loader = Loader(Person, es=es, max_batch=2)
+    first = loader.load('1')
+    assert first.result().age == 42
+    loader.load('2')
+    loader.load('3')  # a full batch is sent at once
+    loader.load('1')
+    assert mgets(es) == [['1'], ['2', '3']]
+
+
+def test_batch_window_collects_gets_of_threads(Person, MockSourceES):
+    class Batched(Person):
+        _es = MockSourceES()
+        _batch_window = 0.05
+
+    results = {}
+
+    def get(doc_id):
+        results[doc_id] = Batched.get(doc_id)
+
+    threads = [threading.Thread(target=get, args=(doc_id,))
+               for doc_id in ['1', '2', '3', '2']]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert [sorted(ids) for ids in mgets(Batched._es)] == [['1', '2', '3']]
+    assert results['3'].name == 'Piggy'
+    Batched.get('1')
+    assert len(mgets(Batched._es)) == 2
+
+
+def test_loader_errors_are_raised_to_callers(Person, MockSourceES):
+    class BrokenES(MockSourceES):
+        def mget(self, *args, **kwargs):
+            raise RuntimeError('broken')
+
+    with Person.loader(es=BrokenES()) as loader:
+        pending = loader.load('1')
+    with pytest.raises(RuntimeError):
+        pending.result()
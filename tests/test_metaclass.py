@@ -52,3 +52,73 @@ def test_id_not_injected_when_not_autoid():
         pass
 
     assert not hasattr(Derived, 'id')
+
+
+def test_compile_codecs_hydrates_and_serializes():
+    from esengine.bases.metaclass import compile_codecs
+    from esengine.document import Document
+    from esengine.fields import StringField, IntegerField
+
+    class Doc(Document):
+        _index = 'index'
+        _doctype = 'doc_type'
+        name = StringField()
+        age = IntegerField()
+        tags = StringField(multi=True)
+
+    codecs = compile_codecs(Doc)
+    assert codecs['fields'] is Doc._fields
+    doc = codecs['from_dict']({'name': 'Gonzo', 'age': '42'})
+    assert isinstance(doc, Doc)
+    assert doc.age == 42
+    assert doc.tags == []
+    assert doc.id is None
+    assert codecs['to_dict'](doc) == {
+        'id': None, 'name': 'Gonzo', 'age': 42, 'tags': []
+    }
+
+
+def test_compile_codecs_checks_class_once():
+    import pytest
+    from esengine.bases.metaclass import compile_codecs
+    from esengine.document import Document
+
+    class NoDocType(Document):
+        _index = 'index'
+
+    with pytest.raises(ValueError):
+        compile_codecs(NoDocType)
+
+
+def test_slotted_document_has_no_instance_dict():
+    import pytest
+    from esengine.document import Document
+    from esengine.fields import StringField, IntegerField
+
+    class Compact(Document):
+        _index = 'index'
+        _doctype = 'doc_type'
+        _slots = True
+        name = StringField()
+        age = IntegerField(default=1)
+
+    class Derived(Compact):
+        extra = StringField()
+
+    assert set(Compact.__slots__) >= {'id', 'name', 'age', '_id', '_dirty'}
+    assert Derived.__slots__ == ('extra',)
+    assert sorted(Derived._fields) == ['age', 'extra', 'id', 'name']
+
+    doc = Derived(name='Gonzo')
+    assert not hasattr(doc, '__dict__')
+    assert (doc.name, doc.age, doc.extra, doc._dirty) == ('Gonzo', 1, None,
+                                                          None)
+    with pytest.raises(AttributeError):
+        doc._other = 1
+
+    hit = {'_id': '1', '_score': 2, '_source': {'name': 'a', 'age': '3'}}
+    doc = Derived.from_es(hit, lazy=True)
+    assert (doc.id, doc._id, doc._score) == ('1', '1', 2)
+    assert (doc.name, doc.age, doc.extra) == ('a', 3, None)
+    doc.name = 'b'
+    assert doc.pop_changes() == {'name': 'b'}
@@ -0,0 +1,66 @@
+import pytest
+
+from esengine import MultiSearch, Payload, Query, SearchError
+
+
+def test_document_msearch_sends_one_request(Person, MockSourceES):
+    es = MockSourceES()
+    results = Person.msearch([
+        {'query': {'match_all': {}}},
+        Payload(query=Query.match_all()).size(2),
+    ], es=es, only=['name'])
+    assert len(es.calls) == 1
+    method, body = es.calls[0]
+    assert method == 'msearch'
+    assert body[0] == {'index': 'index', 'type': 'doc_type'}
+    assert body[1] == {'query': {'match_all': {}},
+                       '_source': {'include': ['name']}}
+    assert body[3]['size'] == 2
+    assert len(results) == 2
+    assert [doc.name for doc in results[0]] == ['Gonzo', 'Kermit', 'Piggy']
+    assert results[1][0].unloaded_fields == {'age', 'bio'}
+    assert results[1]._es is es
+
+
+def test_each_search_is_built_by_its_model(Person, MockSourceES):
+    class Other(Person):
+        _index = 'other'
+
+    es = MockSourceES()
+    multi = MultiSearch(es=es, search_type='count')
+    multi.add(Payload(model=Person, query=Query.match_all()),
+              size=1, preference='_local')
+    multi.add((Other, {'query': {'match_all': {}}}))
+    with pytest.raises(ValueError):
+        multi.add({'query': {}})
+    assert len(multi) == 2
+    people, others = multi.execute()
+    body = es.calls[0][1]
+    assert body[0] == {'index': 'index', 'type': 'doc_type',
+                       'preference': '_local'}
+    assert body[1]['size'] == 1
+    assert body[2]['index'] == 'other'
+    assert type(people[0]) is Person and type(others[0]) is Other
+    assert people._size == 1
+
+
+def test_failed_searches_do_not_fail_the_others(Person, MockSourceES):
+    class ES(MockSourceES):
+        def msearch(self, body, **kwargs):
+            resp = MockSourceES.msearch(self, body, **kwargs)
+            resp['responses'][0] = {'error': 'SearchPhaseExecutionException',
+                                    'status': 400}
+            resp['responses'][2]['timed_out'] = True
+            return resp
+
+    first, second, third = Payload.msearch([
+        (Person, Payload(query=Query.match_all())),
+        Payload(model=Person, query=Query.match_all()),
+        (Person, {}),
+    ], es=ES())
+    assert isinstance(first, SearchError)
+    assert (first.status, first.error) == (400,
+                                           'SearchPhaseExecutionException')
+    assert second[2].name == 'Piggy'
+    assert isinstance(third, SearchError)
+    assert MultiSearch(es=ES()).execute() == []
@@ -45,3 +45,43 @@ def test_resultset_extract_meta(Doc):
         'b': 'c',
         HITS: {'c': 'd'}
     }
+
+
+def test_resultset_hydrates_each_hit_once(MockES, INDEX, DOC_TYPE, Doc):
+    resp = MockES().search(index=INDEX, doc_type=DOC_TYPE, size=2)
+    results = ResultSet(resp=resp, model=Doc, es=MockES())
+    calls = []
+    from_es = Doc.from_es
+
+    def tracked(hit):
+        calls.append(hit['_id'])
+        return from_es(hit)
+
+    Doc.from_es = staticmethod(tracked)
+    try:
+        assert results[1] is results[1]
+        assert calls == [results._hits[1]['_id']]
+        assert results[-1] is results[1]
+        assert len(calls) == 1
+        assert len(results[:1]) == 1
+        assert len(calls) == 2
+        docs = list(results)
+        assert docs == list(results) == results.all_values
+        assert results.to_dict() == [doc.to_dict() for doc in docs]
+        assert len(calls) == 2
+        with pytest.raises(IndexError):
+            results[2]
+    finally:
+        del Doc.from_es
+
+
+def test_resultset_update_and_delete_use_raw_ids(MockES, INDEX, DOC_TYPE,
+                                                 Doc, eh):
+    resp = MockES().search(index=INDEX, doc_type=DOC_TYPE, size=2)
+    results = ResultSet(resp=resp, model=Doc, es=MockES())
+    Doc.from_es = None  # documents are not built
+    try:
+        results.update(name='x')
+        results.delete()
+    finally:
+        del Doc.from_es
@@ -0,0 +1,52 @@
+import pytest
+
+from esengine.utils.scan import scroll_pages, Prefetch
+from esengine.utils.payload import Payload, Query
+
+
+def test_prefetch_result_and_exception():
+    assert Prefetch(lambda x: x * 2, 21).result() == 42
+
+    def fail():
+        raise ValueError('failed')
+
+    with pytest.raises(ValueError):
+        Prefetch(fail).result()
+
+
+@pytest.mark.parametrize('prefetch', [True, False])
+def test_scroll_pages(MockScrollES, prefetch):
+    es = MockScrollES()
+    pages = list(scroll_pages(es, 'index', 'doc_type', {}, page_size=10,
+                              prefetch=prefetch))
+    assert [len(page) for page in pages] == [10, 10, 5]
+    assert es.cleared == ['scroll-40-10']
+
+
+def test_scroll_pages_preserve_order(MockScrollES):
+    es = MockScrollES()
+    pages = list(scroll_pages(es, 'index', 'doc_type', {}, page_size=10,
+                              preserve_order=True))
+    assert [hit['_id'] for hit in pages[0]] == list(range(10))
+    assert sum(len(page) for page in pages) == 25
+
+
+def test_document_scan(Doc, MockScrollES):
+    docs = list(Doc.scan(es=MockScrollES(), page_size=7))
+    assert [doc.id for doc in docs] == list(range(25))
+
+
+def test_document_scan_clears_scroll_on_early_exit(Doc, MockScrollES):
+    es = MockScrollES()
+    for doc in Doc.scan(es=es, page_size=10):
+        if doc.id == 3:
+            break
+    # the generator is closed when garbage collected
+    assert es.cleared == ['scroll-20-10']
+    assert es.scrolls == ['scroll-0-10', 'scroll-10-10']
+
+
+def test_payload_scan(Doc, MockScrollES):
+    payload = Payload(model=Doc, query=Query.match_all())
+    docs = list(payload.scan(es=MockScrollES(), page_size=10))
+    assert len(docs) == 25
@@ -0,0 +1,85 @@
+import threading
+import time
+
+from esengine.utils.singleflight import SingleFlight
+
+
+def test_do_coalesces_concurrent_calls():
+    flight = SingleFlight()
+    calls = []
+
+    def slow():
+        calls.append(1)
+        time.sleep(0.05)
+        return {'value': 42}
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(flight.do('k', slow)))
+        for _ in range(5)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert calls == [1]
+    assert results == [{'value': 42}] * 5
+    # each caller gets its own copy of the response
+    assert len(set(map(id, results))) == 5
+    assert (flight.calls, flight.coalesced) == (1, 4)
+    # calls after the one in flight are sent again
+    assert flight.do('k', slow) == {'value': 42}
+    assert len(calls) == 2
+
+
+def test_do_raises_to_all_callers():
+    flight = SingleFlight()
+    started = threading.Event()
+    errors = []
+
+    def fail():
+        started.set()
+        time.sleep(0.05)
+        raise ValueError('failed')
+
+    def call():
+        try:
+            flight.do('k', fail)
+        except ValueError as e:
+            errors.append(e)
+
+    leader = threading.Thread(target=call)
+    leader.start()
+    started.wait()
+    follower = threading.Thread(target=call)
+    follower.start()
+    leader.join()
+    follower.join()
+    assert len(errors) == 2
+
+
+def test_document_requests_are_coalesced(Person, MockSourceES):
+    class ES(MockSourceES):
+        def search(self, *args, **kwargs):
+            time.sleep(0.05)
+            return super(ES, self).search(*args, **kwargs)
+
+    class Coalesced(Person):
+        _es = ES()
+        _single_flight = SingleFlight()
+
+    results = []
+
+    def search():
+        results.append(Coalesced.search({'query': {'match_all': {}}}))
+
+    threads = [threading.Thread(target=search) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(Coalesced._es.calls) == 1
+    # each caller gets its own hydrated documents
+    docs = [result[0] for result in results]
+    assert len(set(map(id, docs))) == 4
+    assert all(doc.name == 'Gonzo' for doc in docs)